@@ -0,0 +1,67 @@
+# benchmark для сравнения бэкендов подсчета: iscc (подпроцесс) и islpy (в процессе)
+import os
+import sys
+import time
+from pathlib import Path
+from statistics import median
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from loop_analyzer.core.enumerator import count_points
+from loop_analyzer.core.loop_extractor import CppLoopExtractor
+from loop_analyzer.core.pattern_recognizer import PatternRecognizer
+from loop_analyzer.utils.parameter_selection import get_parameters, to_source_parameters
+from loop_analyzer.wrappers.backends import get_backend
+
+# islpy без barvinok считает точки перебором, поэтому множества небольшие
+N_POINTS = int(os.environ.get('BACKEND_BENCHMARK_POINTS', 10 ** 4))
+REPEATS = int(os.environ.get('BACKEND_BENCHMARK_REPEATS', 50))
+BACKENDS = ("iscc", "islpy")
+
+
+def _available_backends() -> dict:
+    backends = {}
+    for name in BACKENDS:
+        try:
+            backend = get_backend(name)
+        except RuntimeError as e:
+            print(f'{name}: unavailable ({e})')
+            continue
+        if not backend.is_available():
+            print(f'{name}: unavailable')
+            continue
+        backends[name] = backend
+    return backends
+
+
+def main():
+    data_directory = Path(__file__).parent.parent / 'data'
+    last_loops = {}
+    for filepath, loop_structure in CppLoopExtractor().iter_loops(str(data_directory)):
+        last_loops[filepath] = loop_structure
+
+    backends = _available_backends()
+    if not backends:
+        return
+
+    pattern_recognizer = PatternRecognizer()
+    for filepath, loop_structure in sorted(last_loops.items()):
+        pattern = pattern_recognizer.recognize_pattern(loop_structure)
+        params = to_source_parameters(loop_structure, get_parameters(N_POINTS, pattern))
+        expected = count_points(loop_structure, params)
+        print(f'{os.path.basename(filepath)} ({pattern.name}, {params}): {expected} points')
+
+        for name, backend in backends.items():
+            wall_times, count_times = [], []
+            for _ in range(REPEATS):
+                start = time.perf_counter_ns()
+                count, time_ms = backend.count(loop_structure, params)
+                wall_times.append((time.perf_counter_ns() - start) / 1_000_000)
+                count_times.append(time_ms)
+            status = 'ok' if count == expected else f'MISMATCH ({count})'
+            print(f'  {name}: wall (ms): {round(median(wall_times), 4)}, '
+                  f'count (ms): {round(median(count_times), 4)}, {status}')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# benchmark пропускной способности и точности на синтетическом корпусе (corpus_generator.py)
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from corpus_generator import generate_corpus, load_manifest
+from loop_analyzer.core.counter import LatticeCounter
+from loop_analyzer.core.loop_extractor import CppLoopExtractor
+from loop_analyzer.core.pattern_recognizer import PatternRecognizer
+
+
+def measure_extraction(corpus_dir: str, jobs: int) -> dict:
+    """Файлы и гнезда в секунду при извлечении в jobs процессов"""
+    extractor = CppLoopExtractor()
+    loops = {}
+    start = time.perf_counter()
+    for filepath, loop_structure in extractor.iter_loops(corpus_dir, jobs=jobs):
+        loops.setdefault(os.path.basename(filepath), []).append(loop_structure)
+    elapsed = time.perf_counter() - start
+    num_loops = sum(len(file_loops) for file_loops in loops.values())
+    return {"jobs": jobs, "seconds": elapsed, "files_per_sec": len(loops) / elapsed,
+            "loops_per_sec": num_loops / elapsed, "loops": num_loops, "_loops": loops}
+
+
+def measure_accuracy(manifest: dict, loops: dict) -> dict:
+    """Доля гнезд манифеста, которые найдены, распознаны и посчитаны верно"""
+    recognizer = PatternRecognizer()
+    counter = LatticeCounter()
+    expected = found = recognized = counted = 0
+    per_pattern = {}
+    start = time.perf_counter()
+    for filename, entries in manifest["files"].items():
+        by_variables = {tuple(bound.variable for bound in loop_structure.bounds): loop_structure
+                        for loop_structure in loops.get(filename, [])}
+        for entry in entries:
+            expected += 1
+            stats = per_pattern.setdefault(entry["pattern"], {"expected": 0, "recognized": 0})
+            stats["expected"] += 1
+            loop_structure = by_variables.get(tuple(entry["variables"]))
+            if loop_structure is None:
+                continue
+            found += 1
+            pattern = recognizer.recognize_pattern(loop_structure)
+            if pattern is not None and pattern.name == entry["pattern"]:
+                recognized += 1
+                stats["recognized"] += 1
+            try:
+                if counter.count(loop_structure, entry["params"]).value == entry["count"]:
+                    counted += 1
+            except RuntimeError:
+                pass
+    elapsed = time.perf_counter() - start
+    return {
+        "expected": expected,
+        "found": found / expected if expected else 0.0,
+        "recognition_accuracy": recognized / expected if expected else 0.0,
+        "count_accuracy": counted / expected if expected else 0.0,
+        "analysis_nests_per_sec": expected / elapsed if elapsed else 0.0,
+        "per_pattern": {label: stats["recognized"] / stats["expected"] for label, stats in sorted(per_pattern.items())},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пропускная способность и точность на синтетическом корпусе")
+    parser.add_argument("--corpus", help="готовый корпус; по умолчанию генерируется во временную директорию")
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, os.cpu_count() or 1],
+                        help="числа процессов извлечения для замера масштабирования")
+    parser.add_argument("--output", help="файл для результата в JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus_dir = args.corpus or tmp
+        if args.corpus is None:
+            start = time.perf_counter()
+            generate_corpus(corpus_dir, args.files, args.seed)
+            print(f"generated {args.files} files in {time.perf_counter() - start:.2f} s")
+        manifest = load_manifest(corpus_dir)
+
+        extraction = []
+        loops = None
+        for jobs in dict.fromkeys(args.jobs):
+            result = measure_extraction(corpus_dir, jobs)
+            loops = result.pop("_loops")
+            extraction.append(result)
+            print(f"jobs={jobs}: {result['files_per_sec']:.1f} files/s, {result['loops_per_sec']:.1f} loops/s "
+                  f"({result['loops']} loops in {result['seconds']:.2f} s)")
+
+        accuracy = measure_accuracy(manifest, loops)
+        print(f"found: {accuracy['found']:.4f}, recognition: {accuracy['recognition_accuracy']:.4f}, "
+              f"count: {accuracy['count_accuracy']:.4f} ({accuracy['expected']} nests, "
+              f"{accuracy['analysis_nests_per_sec']:.1f} nests/s)")
+        for label, value in accuracy["per_pattern"].items():
+            print(f"  {label}: {value:.4f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"files": len(manifest["files"]), "seed": manifest["seed"],
+                       "extraction": extraction, "accuracy": accuracy}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
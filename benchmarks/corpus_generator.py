@@ -0,0 +1,225 @@
+# Генератор синтетического корпуса C++ для замеров производительности на большом числе файлов.
+# Каждый файл содержит несколько гнезд шести паттернов из data/ с переименованными
+# переменными, вспомогательными переменными границ, более глубокой вложенностью
+# и посторонним кодом. manifest.json хранит ожидаемые паттерны и число точек.
+import argparse
+import json
+import random
+from pathlib import Path
+
+MANIFEST_NAME = "manifest.json"
+
+_LOOP_NAMES = ("i", "j", "t", "x", "y", "u", "v", "p", "q", "r", "c", "s",
+               "row", "col", "idx", "jdx", "ii", "jj", "diag", "step", "pos", "cell")
+_PARAM_NAMES = ("n", "m", "N", "M", "size", "len", "dim", "rows", "cols", "width",
+                "T", "steps", "k", "rad", "radius", "halo", "span", "extent")
+_BOUND_NAMES = ("start", "end", "lo", "hi", "first", "last", "begin", "stop", "from_", "to_")
+# имена, занятые посторонним кодом
+_RESERVED = {"acc", "total", "tmp", "value", "max", "min"}
+
+_INCREMENTS = ("{v}++", "++{v}", "{v} += 1")
+
+
+class _Names:
+    """Уникальные в пределах файла идентификаторы"""
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.used = set(_RESERVED)
+
+    def take(self, pool) -> str:
+        name = self.rng.choice(pool)
+        suffix = 1
+        candidate = name
+        while candidate in self.used:
+            suffix += 1
+            candidate = f"{name}{suffix}"
+        self.used.add(candidate)
+        return candidate
+
+
+def _pattern_nest(label: str, rng: random.Random, names: _Names):
+    """Гнездо паттерна: (имена параметров, значения, внешний цикл, границы внутреннего цикла, функция числа точек)"""
+    outer = names.take(_LOOP_NAMES)
+    inner = names.take(_LOOP_NAMES)
+    n = names.take(_PARAM_NAMES)
+    n_value = rng.randint(8, 64)
+
+    if label == "LOWER_TRIANGLE":
+        params = {n: n_value}
+        outer_end = n
+        inner_bounds = ("0", outer)
+        ranges = lambda p: (range(p[n]), lambda a: range(0, a))
+    elif label == "UPPER_TRIANGLE":
+        params = {n: n_value}
+        outer_end = n
+        inner_bounds = (outer, n)
+        ranges = lambda p: (range(p[n]), lambda a: range(a, p[n]))
+    elif label == "TRAPEZOID":
+        steps, k = names.take(_PARAM_NAMES), names.take(_PARAM_NAMES)
+        params = {steps: rng.randint(1, 2 * n_value), n: n_value, k: rng.randint(1, 8)}
+        outer_end = steps
+        inner_bounds = (f"max(0, {outer} - {k})", f"min({n}, {outer} + {k} + 1)")
+        ranges = lambda p: (range(p[steps]), lambda a: range(max(0, a - p[k]), min(p[n], a + p[k] + 1)))
+    elif label == "DIAGONAL":
+        m = names.take(_PARAM_NAMES)
+        params = {n: n_value, m: rng.randint(1, 64)}
+        outer_end = f"{n} + {m} - 1"
+        inner_bounds = (f"max(0, {outer} - {m} + 1)", f"min({outer} + 1, {n})")
+        ranges = lambda p: (range(p[n] + p[m] - 1), lambda a: range(max(0, a - p[m] + 1), min(a + 1, p[n])))
+    elif label == "PARALLELOGRAM":
+        # полоса, сдвинутая относительно диагонали: ширины ниже и выше различаются
+        # (символ и 0, два символа или две разные константы)
+        kind = rng.choice(("lower", "upper", "symbols", "constants"))
+        if kind == "constants":
+            below, above = rng.sample(range(0, 7), 2)
+            below, above = str(below), str(above)
+        else:
+            below = names.take(_PARAM_NAMES) if kind != "upper" else "0"
+            above = names.take(_PARAM_NAMES) if kind in ("upper", "symbols") else "0"
+        params = {n: n_value}
+        params.update({name: rng.randint(1, 8) for name in (below, above) if not name.isdigit()})
+        width_of = lambda p, width: int(width) if width.isdigit() else p[width]
+        outer_end = n
+        inner_bounds = (f"max(0, {outer} - {below})", f"min({n}, {outer} + {above} + 1)")
+        ranges = lambda p: (range(p[n]), lambda a: range(max(0, a - width_of(p, below)),
+                                                         min(p[n], a + width_of(p, above) + 1)))
+    elif label == "BAND_MATRIX":
+        # симметричная полоса: ширина - константа в коде или символ с любым именем
+        if rng.random() < 0.5:
+            width = str(rng.randint(1, 6))
+            params = {n: n_value}
+            width_of = lambda p: int(width)
+        else:
+            width = names.take(_PARAM_NAMES)
+            params = {n: n_value, width: rng.randint(1, 8)}
+            width_of = lambda p: p[width]
+        outer_end = n
+        inner_bounds = (f"max(0, {outer} - {width})", f"min({n}, {outer} + {width} + 1)")
+        ranges = lambda p: (range(p[n]), lambda a: range(max(0, a - width_of(p)), min(p[n], a + width_of(p) + 1)))
+    else:
+        raise ValueError(f"Unknown pattern label: {label}")
+
+    outer_range, inner_range = ranges(params)
+    count = sum(len(inner_range(a)) for a in outer_range)
+    return outer, inner, params, outer_end, inner_bounds, count
+
+
+def _render_nest(rng: random.Random, names: _Names, outer: str, inner: str, outer_end: str,
+                 inner_bounds: tuple, deeper: bool) -> list:
+    lines = []
+    increment = rng.choice(_INCREMENTS)
+    lines.append(f"    for (int {outer} = 0; {outer} < {outer_end}; {increment.format(v=outer)}) {{")
+    start, end = inner_bounds
+    # вспомогательные переменные границ, как в pattern3.cpp
+    if rng.random() < 0.5 and (start.startswith("max") or end.startswith("min")):
+        start_name, end_name = names.take(_BOUND_NAMES), names.take(_BOUND_NAMES)
+        lines.append(f"        int {start_name} = {start};")
+        lines.append(f"        int {end_name} = {end};")
+        start, end = start_name, end_name
+    increment = rng.choice(_INCREMENTS)
+    lines.append(f"        for (int {inner} = {start}; {inner} < {end}; {increment.format(v=inner)}) {{")
+    lines.append(f"            total += {outer} * {inner};")
+    if deeper:
+        extra = names.take(_LOOP_NAMES)
+        lines.append(f"            for (int {extra} = 0; {extra} < {rng.randint(2, 5)}; {extra}++) {{")
+        lines.append(f"                total ^= {extra};")
+        lines.append("            }")
+    lines.append("        }")
+    lines.append("    }")
+    return lines
+
+
+def _distractor(rng: random.Random, names: _Names, index: int) -> list:
+    kind = rng.randrange(3)
+    if kind == 0:
+        return [f"static int helper_{index}(int value) {{",
+                "    int tmp = value * 3 + 1;",
+                "    if (tmp % 2 == 0) {",
+                "        tmp /= 2;",
+                "    }",
+                "    while (tmp > 100) {",
+                "        tmp -= 7;",
+                "    }",
+                "    return tmp;",
+                "}"]
+    if kind == 1:
+        variable = names.take(_LOOP_NAMES)
+        return [f"// накопление без зависимости от параметров",
+                f"static long reduce_{index}(const int *data) {{",
+                "    long acc = 0;",
+                f"    for (int {variable} = 0; {variable} < {rng.randint(4, 32)}; {variable}++) {{",
+                f"        acc += data[{variable}];",
+                "    }",
+                "    return acc;",
+                "}"]
+    return [f"struct Point{index} {{",
+            "    int x;",
+            "    int y;",
+            "};",
+            "",
+            f"static int norm_{index}(struct Point{index} p) {{",
+            "    return p.x * p.x + p.y * p.y;",
+            "}"]
+
+
+def generate_file(rng: random.Random, labels=None, max_nests: int = 3):
+    """Текст одного файла и записи манифеста его гнезд"""
+    names = _Names(rng)
+    labels = labels or ("LOWER_TRIANGLE", "UPPER_TRIANGLE", "TRAPEZOID", "DIAGONAL", "PARALLELOGRAM", "BAND_MATRIX")
+    lines = []
+    entries = []
+    for index in range(rng.randint(1, max_nests)):
+        if rng.random() < 0.5:
+            lines.extend(_distractor(rng, names, index))
+            lines.append("")
+
+        label = rng.choice(labels)
+        outer, inner, params, outer_end, inner_bounds, count = _pattern_nest(label, rng, names)
+        function = f"kernel_{index}_{label.lower()}"
+        lines.append(f"void {function}({', '.join(f'int {name}' for name in params)}) {{")
+        lines.append("    long total = 0;")
+        lines.extend(_render_nest(rng, names, outer, inner, outer_end, inner_bounds, deeper=rng.random() < 0.3))
+        lines.append("}")
+        lines.append("")
+        entries.append({"function": function, "variables": [outer, inner], "pattern": label,
+                        "params": params, "count": count})
+    return "\n".join(lines), entries
+
+
+def generate_corpus(output_dir: str, files: int = 1000, seed: int = 0, max_nests: int = 3) -> dict:
+    """Пишет files файлов и manifest.json в output_dir; один seed - один и тот же корпус"""
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    manifest = {"seed": seed, "files": {}}
+    width = len(str(max(files - 1, 0)))
+    for index in range(files):
+        name = f"unit_{index:0{width}d}.cpp"
+        source, entries = generate_file(rng, max_nests=max_nests)
+        (output / name).write_text(source)
+        manifest["files"][name] = entries
+    with open(output / MANIFEST_NAME, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+
+def load_manifest(corpus_dir: str) -> dict:
+    with open(Path(corpus_dir) / MANIFEST_NAME) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Генерация синтетического корпуса C++")
+    parser.add_argument("output", help="директория для корпуса")
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-nests", type=int, default=3, help="наибольшее число гнезд паттернов в файле")
+    args = parser.parse_args(argv)
+
+    manifest = generate_corpus(args.output, args.files, args.seed, args.max_nests)
+    nests = sum(len(entries) for entries in manifest["files"].values())
+    print(f"{args.files} files, {nests} pattern nests -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
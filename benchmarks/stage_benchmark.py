@@ -0,0 +1,238 @@
+# benchmark отдельных стадий конвейера с выводом в JSON и сравнением с базовой линией
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from loop_analyzer.core.canonicalize import clear_canonicalization_cache
+from loop_analyzer.core.counter import LatticeCounter
+from loop_analyzer.core.loop_extractor import CppLoopExtractor, _collect_source_files
+from loop_analyzer.core.pattern_recognizer import PatternRecognizer
+from loop_analyzer.core.polyhedron_utils import loop_structure_to_parametric_isl_string, parametric_isl_template
+from loop_analyzer.utils.parameter_selection import get_parameters, to_source_parameters
+from loop_analyzer.wrappers.barvinok_wrapper import count_integer_points, get_default_pool
+
+# Стадии в порядке конвейера:
+#   parse        - разбор файла clang
+#   extract      - обход AST и разбор выражений границ (кэш канонизации сброшен)
+#   simplify     - канонизация сырых (еще не канонизированных) границ гнезда с холодным кэшем
+#   recognize    - распознавание паттерна без кэша отпечатков
+#   parameters   - подбор параметров под число точек
+#   formula      - вычисление скомпилированной формулы
+#   isl_build    - построение текста ISL по структуре
+#   isl_bind     - подстановка параметров в закэшированный шаблон ISL
+#   iscc_spawn   - запрос к iscc с запуском нового процесса
+#   iscc_compute - счет card в долгоживущем iscc (от записи запроса до ответа)
+#   iscc_pool    - запрос к долгоживущему iscc целиком
+# Разница iscc_spawn и iscc_pool - стоимость запуска процесса.
+# Стоимость стадий гнезда сильно зависит от его формы, поэтому кроме общих
+# процентилей они считаются отдельно по паттернам (NONE - паттерн не распознан)
+STAGES = ("parse", "extract", "simplify", "recognize", "parameters", "formula",
+          "isl_build", "isl_bind", "iscc_spawn", "iscc_compute", "iscc_pool")
+PERCENTILES = (50, 90, 99)
+
+
+def _timed(function, repeats: int, warmup: int = 1) -> list:
+    """Времена вызовов в миллисекундах; сборщик мусора отключен на время серии"""
+    for _ in range(warmup):
+        function()
+    samples = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            start = time.perf_counter_ns()
+            function()
+            samples.append((time.perf_counter_ns() - start) / 1_000_000)
+    finally:
+        gc.enable()
+    return samples
+
+
+def _summary(samples: list) -> dict:
+    values = np.asarray(samples, dtype=float)
+    summary = {f"p{q}": float(np.percentile(values, q)) for q in PERCENTILES}
+    summary.update(mean=float(values.mean()), min=float(values.min()), samples=len(samples))
+    return summary
+
+
+class _RawBoundsExtractor(CppLoopExtractor):
+    """Извлекает гнезда без канонизации границ - вход стадии simplify"""
+    def validate_and_simplify_bounds(self, loop_structure):
+        return loop_structure
+
+
+class _Samples:
+    """Замеры по стадиям: общие и по паттернам гнезд"""
+    def __init__(self):
+        self.stages = {stage: [] for stage in STAGES}
+        self.by_pattern = {}
+
+    def add(self, stage: str, values: list, pattern: str = None):
+        self.stages[stage].extend(values)
+        if pattern is not None:
+            self.by_pattern.setdefault(stage, {}).setdefault(pattern, []).extend(values)
+
+
+def _iscc_samples(samples: _Samples, isl_strings: list, repeats: int):
+    """Времена iscc: запрос с запуском процесса, запрос к пулу и счет внутри пула"""
+    pool = get_default_pool()
+    for pattern, isl_str in isl_strings:
+        samples.add("iscc_spawn", _timed(lambda: count_integer_points(isl_str), repeats, warmup=0), pattern)
+        count_integer_points(isl_str, pool=pool)
+        pool_ms, compute_ms = [], []
+        for _ in range(repeats):
+            start = time.perf_counter_ns()
+            _, time_ms = count_integer_points(isl_str, pool=pool)
+            pool_ms.append((time.perf_counter_ns() - start) / 1_000_000)
+            compute_ms.append(time_ms)
+        samples.add("iscc_pool", pool_ms, pattern)
+        samples.add("iscc_compute", compute_ms, pattern)
+
+
+def run(data_path: str, repeats: int, n_points: int, with_iscc: bool = True) -> dict:
+    samples = _Samples()
+    extractor = CppLoopExtractor()
+    raw_extractor = _RawBoundsExtractor()
+    recognizer = PatternRecognizer()
+    counter = LatticeCounter()
+    isl_strings = []
+
+    for filepath in _collect_source_files(data_path):
+        samples.add("parse", _timed(lambda: extractor.parse_file(filepath), repeats))
+        tu = extractor.parse_file(filepath)
+
+        def extract():
+            clear_canonicalization_cache()
+            return extractor.extract_loops_from_cursor(tu.cursor)
+        samples.add("extract", _timed(extract, repeats))
+        loops = extract()
+        # те же гнезда в том же порядке, но с границами в виде, полученном из исходника
+        raw_loops = raw_extractor.extract_loops_from_cursor(tu.cursor)
+
+        for loop_structure, raw_structure in zip(loops, raw_loops):
+            pattern = recognizer.recognize_pattern(loop_structure)
+            label = pattern.name if pattern is not None else "NONE"
+
+            def simplify():
+                clear_canonicalization_cache()
+                return extractor.validate_and_simplify_bounds(raw_structure)
+            samples.add("simplify", _timed(simplify, repeats), label)
+
+            def recognize():
+                recognizer.cache.clear()
+                return recognizer.recognize_pattern(loop_structure)
+            samples.add("recognize", _timed(recognize, repeats), label)
+
+            if pattern is None:
+                continue
+
+            def select_parameters():
+                return to_source_parameters(loop_structure, get_parameters(n_points, pattern))
+            samples.add("parameters", _timed(select_parameters, repeats), label)
+            params = select_parameters()
+
+            compiled = counter.compile(loop_structure)
+            if compiled is not None:
+                samples.add("formula", _timed(lambda: compiled(params), repeats), label)
+
+            try:
+                template = parametric_isl_template(loop_structure)
+                samples.add("isl_build", _timed(lambda: loop_structure_to_parametric_isl_string(loop_structure),
+                                                repeats), label)
+            except ValueError:
+                continue
+            if template is not None:
+                samples.add("isl_bind", _timed(lambda: template.bind(params), repeats), label)
+                isl_strings.append((label, template.bind(params)))
+
+    if with_iscc and isl_strings:
+        try:
+            _iscc_samples(samples, isl_strings, repeats)
+        except RuntimeError as e:
+            print(f"iscc stages skipped: {e}", file=sys.stderr)
+
+    return {
+        "meta": {"python": platform.python_version(), "machine": platform.machine(),
+                 "repeats": repeats, "n_points": n_points, "data": str(data_path)},
+        "stages": {stage: _summary(stage_samples) for stage, stage_samples in samples.stages.items() if stage_samples},
+        "by_pattern": {stage: {pattern: _summary(pattern_samples) for pattern, pattern_samples in sorted(groups.items())}
+                       for stage, groups in samples.by_pattern.items()},
+    }
+
+
+def compare(result: dict, baseline: dict, threshold: float, metric: str = "p50") -> list:
+    """Стадии, у которых metric вырос больше чем в (1 + threshold) раз относительно baseline.
+
+    Стадии гнезд сравниваются по паттернам, если они есть в обоих запусках:
+    общие процентили смешивают гнезда разной стоимости и зависят от состава данных.
+    Имя в результате - "стадия" или "стадия/ПАТТЕРН".
+    """
+    pairs = []
+    for stage, summary in result["stages"].items():
+        patterns = result.get("by_pattern", {}).get(stage)
+        reference_patterns = baseline.get("by_pattern", {}).get(stage)
+        if patterns and reference_patterns:
+            pairs.extend((f"{stage}/{pattern}", pattern_summary, reference_patterns.get(pattern))
+                         for pattern, pattern_summary in patterns.items())
+        else:
+            pairs.append((stage, summary, baseline.get("stages", {}).get(stage)))
+
+    regressions = []
+    for name, summary, reference in pairs:
+        if reference is None or reference[metric] <= 0:
+            continue
+        ratio = summary[metric] / reference[metric]
+        if ratio > 1 + threshold:
+            regressions.append((name, reference[metric], summary[metric], ratio))
+    return regressions
+
+
+def main(argv=None) -> int:
+    default_data = Path(__file__).parent.parent / 'data'
+    parser = argparse.ArgumentParser(description="Время отдельных стадий конвейера")
+    parser.add_argument("--data", default=str(default_data), help="файл или директория с исходниками")
+    parser.add_argument("--repeats", type=int, default=50, help="замеров на стадию и гнездо")
+    parser.add_argument("--points", type=int, default=2 ** 30, help="число точек для подбора параметров")
+    parser.add_argument("--output", help="файл для результата в JSON")
+    parser.add_argument("--baseline", help="JSON предыдущего запуска для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустимый относительный рост метрики")
+    parser.add_argument("--metric", default="p50", choices=[f"p{q}" for q in PERCENTILES] + ["mean", "min"])
+    parser.add_argument("--no-iscc", action="store_true", help="не замерять стадии iscc")
+    args = parser.parse_args(argv)
+
+    result = run(args.data, args.repeats, args.points, with_iscc=not args.no_iscc)
+
+    def row(name: str, summary: dict):
+        print(f"{name:<28}" + "".join(f"{summary[f'p{q}']:>14.4f}" for q in PERCENTILES) + f"{summary['samples']:>10}")
+
+    print(f"{'stage':<28}" + "".join(f"{f'p{q} (ms)':>14}" for q in PERCENTILES) + f"{'samples':>10}")
+    for stage, summary in result["stages"].items():
+        row(stage, summary)
+        for pattern, pattern_summary in result["by_pattern"].get(stage, {}).items():
+            row(f"  {pattern}", pattern_summary)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.threshold, args.metric)
+        for name, before, after, ratio in regressions:
+            print(f"REGRESSION {name}: {args.metric} {before:.4f} -> {after:.4f} ms (x{ratio:.2f})")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
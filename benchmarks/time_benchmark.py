@@ -14,7 +14,7 @@ sys.path.insert(0, str(src_path))
 from loop_analyzer.core.counter import LatticeCounter
 from loop_analyzer.core.loop_extractor import CppLoopExtractor
 from loop_analyzer.core.pattern_recognizer import PatternRecognizer
-from loop_analyzer.utils.parameter_selection import get_parameters
+from loop_analyzer.utils.parameter_selection import get_parameters, to_source_parameters
 
 # Очистка памяти перед каждым измерением
 def clean_measurement():
@@ -26,14 +26,18 @@ def main():
     
     try:
         loop_extractor = CppLoopExtractor()
-        results = loop_extractor.process_directory(data_directory)
-        loops_structure = [results[key][-1] for key in results.keys()]
+        # из каждого файла нужно только последнее гнездо - остальные не храним
+        last_loops = {}
+        for filepath, loop_structure in loop_extractor.iter_loops(data_directory):
+            last_loops[filepath] = loop_structure
+        loops_structure = list(last_loops.values())
 
         if not loops_structure:
             return
 
         optimized_time_arr = []
         barvinok_time_arr = []
+        barvinok_parametric_time_arr = []
         
         # прогрев
         for i in range(1000):
@@ -57,7 +61,8 @@ def main():
                 if pattern is None:
                     continue
 
-                concrete_parameters = get_parameters(n_points, pattern)
+                # параметры формулы под именами символов исходника (b -> bandwidth)
+                concrete_parameters = to_source_parameters(loop_structure, get_parameters(n_points, pattern))
 
                 hybrid_count = lattice_counter.count_hybrid(loop_structure, concrete_parameters)
                 end = time.perf_counter_ns()
@@ -66,12 +71,23 @@ def main():
 
                 clean_measurement()
 
-                barvinok_count = lattice_counter.count_barvinok(loop_structure, concrete_parameters)
+                try:
+                    barvinok_count = lattice_counter.count_barvinok(loop_structure, concrete_parameters)
 
-                barvinok_time = barvinok_count[1]
+                    barvinok_time = barvinok_count[1]
+
+                    clean_measurement()
+
+                    # квазиполином card считается один раз на структуру, дальше только вычисление
+                    barvinok_parametric_count = lattice_counter.count_barvinok_parametric(loop_structure, concrete_parameters)
+                except RuntimeError as e:
+                    # без iscc сравнивать не с чем
+                    print(f"Barvinok counting failed: {e}")
+                    return
 
                 optimized_time_arr.append(hybrid_time)
                 barvinok_time_arr.append(barvinok_time)
+                barvinok_parametric_time_arr.append(barvinok_parametric_count[1])
 
         if optimized_time_arr and barvinok_time_arr:
             optimized_algo_median = median(optimized_time_arr)
@@ -79,6 +95,7 @@ def main():
 
             print(f'optimized_algo_time (ms): {round(optimized_algo_median,2)}')
             print(f'barvinok_algo_time (ms): {round(barvinok_algo_median,2)}')
+            print(f'barvinok_parametric_algo_time (ms): {round(median(barvinok_parametric_time_arr),4)}')
         else:
             print("No valid measurements collected.")
             
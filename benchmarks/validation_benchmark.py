@@ -1,55 +1,68 @@
 # benchmark для валидации формул
+import os
 import random
+import sys
+from pathlib import Path
+
+import sympy as sp
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from loop_analyzer.core.affine import AffineExpr
+from loop_analyzer.core.enumerator import Enumerator
+from loop_analyzer.core.loop import LoopBound, LoopStructure
+
+# обход векторизован, поэтому проверять можно на n порядка миллиона
+MAX_N = int(os.environ.get('VALIDATION_MAX_N', 10 ** 6))
+
+def _loop(*bounds) -> LoopStructure:
+    return LoopStructure(bounds=[LoopBound(start, end, 1, variable) for variable, start, end in bounds],
+                         nesting_depth=len(bounds))
+
+
+_n, _m, _i = (AffineExpr.symbol(name) for name in ('n', 'm', 'i'))
+
+# Гнезда паттернов в том виде, в котором их выдает экстрактор
+_NESTS = {
+    1: _loop(('i', 0, _n), ('j', 0, _i)),
+    2: _loop(('i', 0, _n), ('j', _i, _n)),
+    3: _loop(('t', 0, _n), ('i', sp.Max(0, sp.Symbol('t') - sp.Symbol('k')),
+                            sp.Min(sp.Symbol('n'), sp.Symbol('t') + sp.Symbol('k') + 1))),
+    4: _loop(('diag', 0, _n + _m - 1), ('i', sp.Max(0, sp.Symbol('diag') - sp.Symbol('m') + 1),
+                                         sp.Min(sp.Symbol('diag') + 1, sp.Symbol('n')))),
+    5: _loop(('i', 0, _n), ('j', sp.Max(0, sp.Symbol('i') - sp.Symbol('k')),
+                            sp.Min(sp.Symbol('n'), sp.Symbol('i') + 1))),
+    6: _loop(('i', 0, _n), ('j', sp.Max(0, sp.Symbol('i') - sp.Symbol('b')),
+                            sp.Min(sp.Symbol('n'), sp.Symbol('i') + sp.Symbol('b') + 1))),
+}
+_ENUMERATORS = {pattern: Enumerator(nest) for pattern, nest in _NESTS.items()}
+
 
 class DirectCount:
+    """Точный подсчет векторизованным обходом гнезда (core/enumerator.py)"""
     @staticmethod
     def pattern_1(n: int):
-        count = 0
-        for i in range(n):
-            for j in range(i):
-                count += 1
-        return count
+        return _ENUMERATORS[1].count({'n': n})
 
     @staticmethod
     def pattern_2(n: int):
-        count = 0
-        for i in range(n):
-            for j in range(i,n):
-                count += 1
-        return count
+        return _ENUMERATORS[2].count({'n': n})
 
     @staticmethod
     def pattern_3(n: int, k: int):
-        count = 0
-        T = n
-        for t in range(T):
-            for i in range(max(0, t-k), min(n, t+k+1)):
-                count = count + 1
-        return count
+        return _ENUMERATORS[3].count({'n': n, 'k': k})
 
     @staticmethod
     def pattern_4(n: int, m: int):
-        count = 0
-        for diag in range(n + m - 1):
-            for i in range(max(0, diag-m+1), min(diag+1, n)):
-                count = count + 1
-        return count
+        return _ENUMERATORS[4].count({'n': n, 'm': m})
 
     @staticmethod
     def pattern_5(n: int, k: int):
-        count = 0
-        for i in range(n):
-            for j in range(max(0, i-k), min(n, i+k+1)):
-                count = count + 1
-        return count
+        return _ENUMERATORS[5].count({'n': n, 'k': k})
 
     @staticmethod
     def pattern_6(n: int, b: int):
-        count = 0
-        for i in range(n):
-            for j in range(max(0, i-b), min(n, i+b+1)):
-                count = count + 1
-        return count
+        return _ENUMERATORS[6].count({'n': n, 'b': b})
 
 
 class Formulas:
@@ -71,7 +84,7 @@ class Formulas:
 
     @staticmethod
     def pattern_5(n: int, k: int):
-        return n * (2 * k + 1) - k * (k + 1)
+        return n * (k + 1) - k * (k + 1) / 2
 
     @staticmethod
     def pattern_6(n: int, b: int):
@@ -86,8 +99,8 @@ class Benchmark:
 
         samples = 33
         for i in range(samples):
-            n = random.randint(1,100)
-            m = n + random.randint(1, 100)
+            n = random.randint(1, MAX_N)
+            m = n + random.randint(1, MAX_N)
 
             #паттерн 1
             c1 = Formulas.pattern_1(n)
@@ -0,0 +1,288 @@
+import numbers
+import re
+import sys
+from typing import TYPE_CHECKING, Dict, Mapping, Optional, Tuple, Union
+
+if TYPE_CHECKING:
+    import sympy as sp
+
+
+class AffineExpr:
+    """Аффинное выражение: целая константа плюс сумма coeff * symbol.
+
+    Покрывает границы, которые встречаются в циклах почти всегда (n, i + 1,
+    n + m - 1, 2*k), без обращения к sympy. Члены хранятся отсортированными по
+    имени символа с ненулевыми коэффициентами, поэтому равные выражения имеют
+    одинаковое представление. Выражение без символов всегда представляется
+    обычным int (см. make_affine).
+    """
+    __slots__ = ('constant', 'terms')
+
+    def __init__(self, constant: int = 0, terms: Tuple[Tuple[str, int], ...] = ()):
+        self.constant = constant
+        self.terms = terms
+
+    @classmethod
+    def symbol(cls, name: str) -> 'AffineExpr':
+        return cls(0, ((name, 1),))
+
+    # --- интерфейс, который распознаватель проверяет у выражений sympy ---
+
+    @property
+    def is_number(self) -> bool:
+        return False
+
+    @property
+    def is_symbol(self) -> bool:
+        return self.constant == 0 and len(self.terms) == 1 and self.terms[0][1] == 1
+
+    @property
+    def name(self) -> Optional[str]:
+        return self.terms[0][0] if self.is_symbol else None
+
+    @property
+    def symbols(self) -> Tuple[str, ...]:
+        return tuple(name for name, _ in self.terms)
+
+    def coeff(self, name: str) -> int:
+        for term_name, coeff in self.terms:
+            if term_name == name:
+                return coeff
+        return 0
+
+    # --- арифметика ---
+
+    def _coefficients(self) -> Dict[str, int]:
+        return dict(self.terms)
+
+    def __add__(self, other):
+        if isinstance(other, int):
+            return make_affine(self.constant + other, self._coefficients())
+        if isinstance(other, AffineExpr):
+            coeffs = self._coefficients()
+            for name, coeff in other.terms:
+                coeffs[name] = coeffs.get(name, 0) + coeff
+            return make_affine(self.constant + other.constant, coeffs)
+        return NotImplemented
+
+    __radd__ = __add__
+
+    def __neg__(self):
+        return AffineExpr(-self.constant, tuple((name, -coeff) for name, coeff in self.terms))
+
+    def __sub__(self, other):
+        if isinstance(other, (int, AffineExpr)):
+            return self + (-other)
+        return NotImplemented
+
+    def __rsub__(self, other):
+        if isinstance(other, int):
+            return (-self) + other
+        return NotImplemented
+
+    def __mul__(self, other):
+        if isinstance(other, int):
+            if other == 0:
+                return 0
+            return AffineExpr(self.constant * other, tuple((name, coeff * other) for name, coeff in self.terms))
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __eq__(self, other):
+        if isinstance(other, AffineExpr):
+            return self.constant == other.constant and self.terms == other.terms
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((self.constant, self.terms))
+
+    # --- подстановка и вычисление ---
+
+    def substitute(self, values: Mapping[str, object]):
+        """Подставляет значения символов; целые и аффинные значения не требуют sympy"""
+        result = self.constant
+        rest = []
+        for name, coeff in self.terms:
+            if name not in values:
+                rest.append((name, coeff))
+                continue
+            value = values[name]
+            if not isinstance(value, (int, AffineExpr)) and (isinstance(value, numbers.Integral)
+                                                             or getattr(value, 'is_Integer', False)):
+                # целые NumPy и sympy - в int Python, как _normalize в formulas.py
+                value = int(value)
+            if not isinstance(value, (int, AffineExpr)):
+                # нецелое значение (float, выражение sympy) - считаем через sympy
+                expr = self.to_sympy()
+                return expr.subs({symbol: values[symbol.name]
+                                  for symbol in expr.free_symbols if symbol.name in values})
+            result = result + coeff * value
+        if rest:
+            result = result + AffineExpr(0, tuple(rest))
+        return result
+
+    def evaluate(self, values: Mapping[str, object]):
+        """Вычисляет выражение; значения могут быть и массивами NumPy"""
+        result = self.constant
+        for name, coeff in self.terms:
+            result = result + coeff * values[name]
+        return result
+
+    def to_sympy(self) -> 'sp.Expr':
+        import sympy as sp
+        return sp.Integer(self.constant) + sp.Add(*[coeff * sp.Symbol(name) for name, coeff in self.terms])
+
+    def __str__(self):
+        # формат совпадает с str() sympy для линейных выражений: "-k + t", "m + n - 1"
+        result = ""
+        for name, coeff in self.terms:
+            text = name if abs(coeff) == 1 else f"{abs(coeff)}*{name}"
+            if not result:
+                result = text if coeff > 0 else f"-{text}"
+            else:
+                result += f" + {text}" if coeff > 0 else f" - {text}"
+        if self.constant:
+            result += f" + {self.constant}" if self.constant > 0 else f" - {-self.constant}"
+        return result
+
+    __repr__ = __str__
+
+    def __reduce__(self):
+        return (AffineExpr, (self.constant, self.terms))
+
+
+def make_affine(constant: int, coefficients: Mapping[str, int]) -> Union[int, AffineExpr]:
+    """Нормализует выражение: без символов возвращает int"""
+    terms = tuple(sorted((name, coeff) for name, coeff in coefficients.items() if coeff))
+    if not terms:
+        return constant
+    return AffineExpr(constant, terms)
+
+
+_TOKEN_PATTERN = re.compile(r'\s*(?:(\d+)|([A-Za-z_][A-Za-z0-9_]*)|([-+*()]))')
+
+
+class _AffineParser:
+    def __init__(self, text: str):
+        self.tokens = []
+        pos = 0
+        text = text.strip()
+        while pos < len(text):
+            match = _TOKEN_PATTERN.match(text, pos)
+            if not match or match.end() == pos:
+                raise ValueError(text)
+            if match.group(1):
+                self.tokens.append(int(match.group(1)))
+            else:
+                self.tokens.append(match.group(2) or match.group(3))
+            pos = match.end()
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self):
+        token = self.peek()
+        if token is None:
+            raise ValueError("Unexpected end of expression")
+        self.pos += 1
+        return token
+
+    def expression(self):
+        result = self.term()
+        while self.peek() in ('+', '-'):
+            if self.take() == '+':
+                result = result + self.term()
+            else:
+                result = result - self.term()
+        return result
+
+    def term(self):
+        result = self.factor()
+        while self.peek() == '*':
+            self.take()
+            other = self.factor()
+            # произведение аффинно, только если один из множителей - число
+            if isinstance(result, int):
+                result = other * result
+            elif isinstance(other, int):
+                result = result * other
+            else:
+                raise ValueError("Non-affine product")
+        return result
+
+    def factor(self):
+        token = self.take()
+        if token == '-':
+            return -self.factor()
+        if token == '+':
+            return self.factor()
+        if isinstance(token, int):
+            return token
+        if token == '(':
+            result = self.expression()
+            if self.take() != ')':
+                raise ValueError("Unbalanced parentheses")
+            return result
+        if token in ('*', ')'):
+            raise ValueError(f"Unexpected token {token!r}")
+        if self.peek() == '(':
+            # вызов функции (min, max, size, ...) - не аффинное выражение
+            raise ValueError(f"Function call {token}()")
+        return AffineExpr.symbol(token)
+
+
+def parse_affine(text: str) -> Optional[Union[int, AffineExpr]]:
+    """Разбирает аффинное выражение C++; для всего остального возвращает None"""
+    try:
+        parser = _AffineParser(text)
+        if not parser.tokens:
+            return None
+        result = parser.expression()
+        if parser.peek() is not None:
+            return None
+        return result
+    except ValueError:
+        return None
+
+
+def is_sympy_expr(value) -> bool:
+    """Проверяет, что значение - объект sympy, не импортируя sympy без необходимости"""
+    sympy = sys.modules.get('sympy')
+    return sympy is not None and isinstance(value, sympy.Basic)
+
+
+def as_affine(expr) -> Optional[Union[int, AffineExpr]]:
+    """Приводит границу (int, str, AffineExpr, линейное выражение sympy) к аффинной форме"""
+    if isinstance(expr, (int, AffineExpr)):
+        return expr
+    if isinstance(expr, str):
+        return parse_affine(expr)
+    if is_sympy_expr(expr):
+        if expr.is_Integer:
+            return int(expr)
+        constant = 0
+        coefficients = {}
+        for key, coeff in expr.as_coefficients_dict().items():
+            if not coeff.is_Integer:
+                return None
+            if key.is_Number:
+                if not key.is_Integer:
+                    return None
+                constant += int(coeff) * int(key)
+            elif key.is_Symbol:
+                coefficients[key.name] = coefficients.get(key.name, 0) + int(coeff)
+            else:
+                return None
+        return make_affine(constant, coefficients)
+    return None
+
+
+def symbol_names(expr) -> set:
+    """Имена символов, от которых зависит выражение"""
+    if isinstance(expr, AffineExpr):
+        return set(expr.symbols)
+    if hasattr(expr, 'free_symbols'):
+        return {symbol.name for symbol in expr.free_symbols}
+    return set()
@@ -0,0 +1,54 @@
+from functools import lru_cache
+from typing import TYPE_CHECKING, Union
+
+from .affine import AffineExpr, as_affine, is_sympy_expr
+
+if TYPE_CHECKING:
+    import sympy as sp
+
+# Одни и те же выражения границ повторяются в разных гнездах и файлах,
+# поэтому результат кэшируется по структуре выражения (хеш sympy структурный)
+CANONICALIZATION_CACHE_SIZE = 4096
+
+
+def canonicalize_expression(expr) -> Union[int, AffineExpr, 'sp.Expr']:
+    """Приводит границу цикла к канонической форме без вызова sp.simplify.
+
+    Линейные выражения становятся AffineExpr (или int), у Min/Max
+    канонизируются аргументы; остальные выражения sympy упрощаются как раньше.
+    """
+    if isinstance(expr, (int, float, AffineExpr)):
+        return expr
+    if is_sympy_expr(expr):
+        return _canonicalize_sympy(expr)
+    return expr
+
+
+@lru_cache(maxsize=CANONICALIZATION_CACHE_SIZE)
+def _canonicalize_sympy(expr: 'sp.Expr') -> Union[int, AffineExpr, 'sp.Expr']:
+    affine_expr = as_affine(expr)
+    if affine_expr is not None:
+        return affine_expr
+
+    func_name = expr.func.__name__
+    if func_name in ('Max', 'Min'):
+        args = [canonicalize_expression(arg) for arg in expr.args]
+        if all(isinstance(arg, int) for arg in args):
+            return max(args) if func_name == 'Max' else min(args)
+        # конструктор Max/Min сам сортирует и убирает повторы аргументов
+        return expr.func(*[arg.to_sympy() if isinstance(arg, AffineExpr) else arg for arg in args])
+
+    import sympy as sp
+    affine_expr = as_affine(sp.expand(expr))
+    if affine_expr is not None:
+        return affine_expr
+    return sp.simplify(expr)
+
+
+def canonicalization_cache_info():
+    """Статистика кэша канонизации: hits, misses, maxsize, currsize"""
+    return _canonicalize_sympy.cache_info()
+
+
+def clear_canonicalization_cache():
+    _canonicalize_sympy.cache_clear()
@@ -1,30 +1,440 @@
-from loop_analyzer.core.loop import LoopStructure, PatternType
+import math
+import operator
+import time
+from dataclasses import dataclass
+from operator import itemgetter
+from statistics import median
+from typing import Callable, Mapping, Optional, Sequence, Union
+
+import numpy as np
+
+from loop_analyzer.core.affine import AffineExpr, symbol_names
+from loop_analyzer.core.enumerator import EnumerationBudgetExceeded, Enumerator, count_points
+from loop_analyzer.core.loop import LoopBound, LoopStructure, PatternType
 from loop_analyzer.core.pattern_recognizer import PatternRecognizer
+from loop_analyzer.core.summation import SummationEngine, SummationFormula
 from loop_analyzer.patterns.formulas import OptimizedFormulas
-from loop_analyzer.core.polyhedron_utils import loop_structure_to_isl_string
-from loop_analyzer.wrappers.barvinok_wrapper import count_integer_points
+from loop_analyzer.utils import instrumentation as metrics
+from loop_analyzer.core.polyhedron_utils import (loop_structure_to_isl_string, loop_structure_to_parametric_isl_string,
+                                                 parametric_isl_template)
+from loop_analyzer.wrappers.backends import CountingBackend, IsccBackend
+from loop_analyzer.wrappers.barvinok_wrapper import count_integer_points, compute_parametric_card, get_default_pool
+
+# Паттерны с замкнутой формулой и имена аргументов формулы в LoopStructure.parameters
+_PATTERN_FORMULAS = {
+    PatternType.LOWER_TRIANGLE: (OptimizedFormulas.pattern_1_lower_triangle, ('n',)),
+    PatternType.UPPER_TRIANGLE: (OptimizedFormulas.pattern_2_upper_triangle, ('n',)),
+    PatternType.TRAPEZOID: (OptimizedFormulas.pattern_3_trapezoid, ('n', 'k', 'T')),
+    PatternType.DIAGONAL: (OptimizedFormulas.pattern_4_diagonal, ('n', 'm')),
+    PatternType.PARALLELOGRAM: (OptimizedFormulas.pattern_5_parallelogram, ('n', 'p', 'q')),
+    PatternType.BAND_MATRIX: (OptimizedFormulas.pattern_6_band_matrix, ('n', 'b')),
+}
+
+# Области, где замкнутая формула совпадает с числом точек (аргументы - в порядке
+# _PATTERN_FORMULAS). Вне области, например при k > n или n < 0, подсчет
+# переходит к следующим уровням. Условия записаны через & и работают и для столбцов NumPy.
+_FORMULA_DOMAINS = {
+    PatternType.LOWER_TRIANGLE: lambda n: n >= 0,
+    PatternType.UPPER_TRIANGLE: lambda n: n >= 0,
+    PatternType.TRAPEZOID: lambda n, k, T: (n >= 0) & (k >= 0) & (T >= 0),
+    PatternType.DIAGONAL: lambda n, m: (n >= 0) & (m >= 0),
+    PatternType.PARALLELOGRAM: lambda n, p, q: (p >= 0) & (p <= n) & (q >= 0) & (q <= n),
+    PatternType.BAND_MATRIX: lambda n, b: (b >= 0) & (b <= n),
+}
+
+
+def _integral_value(value, name: str) -> int:
+    """Целое значение параметра; нецелое число (2.5, nan) - ValueError, а не усечение"""
+    try:
+        return operator.index(value)
+    except TypeError:
+        pass
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return int(value)
+    raise ValueError(f"Parameter {name} must be an integer, got {value!r}")
+
+
+def _as_integer_column(values, name: str) -> np.ndarray:
+    """Приводит столбец значений параметра к int64, а при переполнении - к массиву int Python.
+
+    Скаляр дает столбец из одного значения; нецелые значения отвергаются с ValueError.
+    """
+    column = np.atleast_1d(np.asarray(values))
+    if column.dtype.kind == 'i':
+        return column.astype(np.int64, copy=False)
+    if column.dtype.kind == 'u' and (column.size == 0 or column.max() <= np.iinfo(np.int64).max):
+        return column.astype(np.int64)
+    if column.dtype.kind == 'f' and np.isfinite(column).all() and (column == np.trunc(column)).all() \
+            and np.abs(column).max(initial=0) < 2 ** 63:
+        return column.astype(np.int64)
+    integers = [_integral_value(value, name) for value in column.ravel()]
+    return np.array(integers, dtype=object).reshape(column.shape)
+
+
+def _parameter_column(expr, columns: dict[str, np.ndarray], size: int) -> np.ndarray:
+    """Вычисляет выражение параметра формулы сразу для всех строк"""
+    if isinstance(expr, (int, np.integer)):
+        return np.full(size, int(expr), dtype=np.int64)
+    if getattr(expr, 'name', None) in columns:
+        return columns[expr.name]
+    if isinstance(expr, AffineExpr):
+        return np.broadcast_to(expr.evaluate(columns), (size,))
+    if hasattr(expr, 'free_symbols'):
+        import sympy as sp
+        symbols = sorted(expr.free_symbols, key=lambda sym: sym.name)
+        function = sp.lambdify(symbols, expr, modules='numpy')
+        return np.broadcast_to(function(*[columns[sym.name] for sym in symbols]), (size,))
+    raise ValueError(f"Cannot evaluate formula parameter {expr!r}")
+
+
+def _argument_resolver(name: str, expr) -> Callable[[Mapping[str, int]], int]:
+    """Функция, достающая аргумент формулы name из конкретных параметров.
+
+    Аргумент задан выражением из LoopStructure.parameters над символами
+    исходника, и значения берутся только по именам этих символов (параметры
+    get_parameters переводятся в них через to_source_parameters). Если символа
+    нет, выбрасывается KeyError.
+    """
+    if isinstance(expr, (int, np.integer)):
+        value = int(expr)
+        return lambda params: value
+    source_name = getattr(expr, 'name', None)
+    if source_name is not None:
+        return itemgetter(source_name)
+    if isinstance(expr, AffineExpr):
+        return expr.evaluate
+    if hasattr(expr, 'free_symbols'):
+        symbols = list(expr.free_symbols)
+        return lambda params: int(expr.subs({symbol: params[symbol.name] for symbol in symbols}))
+    raise ValueError(f"Cannot bind formula parameter {name}={expr!r}")
+
+
+def source_parameters(loop_structure: LoopStructure) -> tuple:
+    """Имена параметров гнезда: символы границ, не являющиеся переменными циклов"""
+    variables = {bound.variable for bound in loop_structure.bounds}
+    names = set()
+    for bound in loop_structure.bounds:
+        for expr in (bound.start, bound.end, bound.step):
+            names.update(symbol_names(expr))
+    return tuple(sorted(names - variables))
+
+
+def _missing_parameters(required: Sequence[str], params: Mapping[str, int]) -> ValueError:
+    missing = [name for name in required if name not in params]
+    return ValueError(f"Missing parameter(s) {', '.join(missing)}")
+
+
+def _specialize(formula: Callable, resolvers: list, domain: Callable,
+                required: Sequence[str]) -> Callable[[Mapping[str, int]], int]:
+    """Формула со связанными аргументами; без нужного параметра или вне области формулы - ValueError"""
+    if len(resolvers) == 1:
+        resolver = resolvers[0]
+
+        def count(params):
+            try:
+                value = resolver(params)
+            except KeyError:
+                raise _missing_parameters(required, params) from None
+            if not domain(value):
+                raise ValueError(f"Arguments ({value},) outside the domain of {formula.__name__}")
+            return formula(value)
+        return count
+
+    def count(params):
+        try:
+            arguments = [resolver(params) for resolver in resolvers]
+        except KeyError:
+            raise _missing_parameters(required, params) from None
+        if not domain(*arguments):
+            raise ValueError(f"Arguments {tuple(arguments)} outside the domain of {formula.__name__}")
+        return formula(*arguments)
+    return count
+
+
+@dataclass
+class CountResult:
+    """Результат count(): число точек, уровень, который его дал, и время в миллисекундах"""
+    value: int
+    tier: str
+    elapsed_ms: float
+
+
+# Уровни count() в порядке попыток
+COUNT_TIERS = ("formula", "summation", "enumeration", "barvinok")
+
+
+class CostModel:
+    """Оценка стоимости уровней count() на текущей машине.
+
+    Время обхода: enumeration_overhead_ms + enumeration_ns на каждую точку
+    внешних уровней (самый внутренний уровень считается без разворачивания).
+    barvinok_ms - время одного запроса к бэкенду подсчета (inf, если он недоступен).
+    Обход выбирается, пока его оценка дешевле запроса к бэкенду.
+    """
+    def __init__(self, enumeration_ns: float = None, barvinok_ms: float = None,
+                 enumeration_overhead_ms: float = None, max_enumeration_points: int = 10 ** 8):
+        self.enumeration_ns = enumeration_ns
+        self.enumeration_overhead_ms = enumeration_overhead_ms
+        self.barvinok_ms = barvinok_ms
+        self.max_enumeration_points = max_enumeration_points
+
+    @property
+    def calibrated(self) -> bool:
+        return None not in (self.enumeration_ns, self.enumeration_overhead_ms, self.barvinok_ms)
+
+    def calibrate(self, pool=None, repeats: int = 5, backend: CountingBackend = None) -> 'CostModel':
+        """Замеряет стоимость шага обхода и запроса к бэкенду (по умолчанию iscc)"""
+        if self.enumeration_ns is None or self.enumeration_overhead_ms is None:
+            n = AffineExpr.symbol('n')
+            triangle = LoopStructure(bounds=[LoopBound(0, n, 1, 'i'), LoopBound(0, AffineExpr.symbol('i'), 1, 'j')],
+                                     nesting_depth=2)
+
+            def measure(size: int) -> float:
+                samples = []
+                for _ in range(repeats):
+                    start = time.perf_counter_ns()
+                    count_points(triangle, {'n': size})
+                    samples.append(time.perf_counter_ns() - start)
+                return median(samples)
+
+            overhead_ns = measure(1)
+            large = 1 << 18
+            if self.enumeration_overhead_ms is None:
+                self.enumeration_overhead_ms = overhead_ns / 1_000_000
+            if self.enumeration_ns is None:
+                self.enumeration_ns = max(measure(large) - overhead_ns, 1) / large
+
+        if self.barvinok_ms is None:
+            try:
+                samples = []
+                for _ in range(repeats + 1):
+                    if backend is not None:
+                        _, time_ms = backend.count(LoopStructure(bounds=[LoopBound(0, 10, 1, 'i')], nesting_depth=1), {})
+                    elif pool is not None:
+                        _, time_ms = count_integer_points("{[i]: 0 <= i < 10}", pool=pool)
+                    else:
+                        _, time_ms = count_integer_points("{[i]: 0 <= i < 10}")
+                    samples.append(time_ms)
+                # первый запрос включает запуск процесса
+                self.barvinok_ms = median(samples[1:])
+            except RuntimeError:
+                self.barvinok_ms = math.inf
+        return self
+
+    def enumeration_budget(self) -> float:
+        """Сколько точек внешних уровней можно обойти за время одного запроса к iscc"""
+        if self.barvinok_ms == math.inf:
+            return self.max_enumeration_points
+        available_ms = max(0.0, self.barvinok_ms - self.enumeration_overhead_ms)
+        return min(self.max_enumeration_points, available_ms * 1_000_000 / self.enumeration_ns)
+
 
 class LatticeCounter:
+    def __init__(self, iscc_mode: str = "pool", cost_model: CostModel = None, backend: CountingBackend = None):
+        # "pool" - запросы к долгоживущим процессам iscc, "spawn" - новый процесс на каждый запрос
+        if iscc_mode not in ("pool", "spawn"):
+            raise ValueError(f"Unknown iscc mode: {iscc_mode}")
+        self.iscc_mode = iscc_mode
+        # бэкенд последнего уровня count(); по умолчанию - iscc в выбранном режиме
+        self.backend = backend or IsccBackend(iscc_mode)
+        # квазиполиномы card, посчитанные один раз на структуру циклов
+        self._parametric_cards = {}
+        self.pattern_recognizer = PatternRecognizer()
+        # скомпилированные функции подсчета (или None) по ключу структуры
+        self._compiled = {}
+        # имена параметров гнезда по ключу структуры
+        self._source_parameters = {}
+        # многочлены суммирования для гнезд без формулы паттерна
+        self.summation_engine = SummationEngine()
+        self._summations = {}
+        self._enumerators = {}
+        # калибруется при первом вызове count()
+        self.cost_model = cost_model or CostModel()
+
+    def compile(self, loop_structure: LoopStructure) -> Optional[Callable[[Mapping[str, int]], int]]:
+        """Распознает паттерн один раз и возвращает функцию count(concrete_params).
+
+        Функция вызывает формулу паттерна с уже связанными аргументами и
+        кэшируется по структуре циклов. Параметры задаются по именам символов
+        исходника; без нужного параметра или вне области формулы функция
+        выбрасывает ValueError. None - для структуры нет замкнутой формулы.
+        """
+        key = loop_structure.structure_key()
+        try:
+            return self._compiled[key]
+        except KeyError:
+            pass
+
+        compiled = None
+        pattern = self.pattern_recognizer.recognize_pattern(loop_structure)
+        if pattern in _PATTERN_FORMULAS:
+            formula, argument_names = _PATTERN_FORMULAS[pattern]
+            arguments = [loop_structure.parameters[name] for name in argument_names]
+            resolvers = [_argument_resolver(name, expr) for name, expr in zip(argument_names, arguments)]
+            required = sorted(set().union(*(symbol_names(expr) for expr in arguments)))
+            compiled = _specialize(formula, resolvers, _FORMULA_DOMAINS[pattern], required)
+        self._compiled[key] = compiled
+        return compiled
+
+    def summation(self, loop_structure: LoopStructure) -> Optional[SummationFormula]:
+        """Многочлен числа точек аффинного гнезда (кэшируется по структуре) или None"""
+        key = loop_structure.structure_key()
+        try:
+            return self._summations[key]
+        except KeyError:
+            pass
+        formula = self.summation_engine.formula(loop_structure)
+        self._summations[key] = formula
+        return formula
+
     def count_hybrid(self, loop_structure: LoopStructure, concrete_params: dict[str, int]) -> int:
-        pattern_recognizer = PatternRecognizer()
-        pattern = pattern_recognizer.recognize_pattern(loop_structure)
-        if pattern == PatternType.LOWER_TRIANGLE:
-            return OptimizedFormulas.pattern_1_lower_triangle(concrete_params['n'])
-        elif pattern == PatternType.UPPER_TRIANGLE:
-            return OptimizedFormulas.pattern_2_upper_triangle(concrete_params['n'])
+        """Число точек через count(); если ни один уровень не подошел, выбрасывается RuntimeError"""
+        return self.count(loop_structure, concrete_params).value
 
-        return 0
+    def count(self, loop_structure: LoopStructure, concrete_params: Mapping[str, int]) -> CountResult:
+        """Точное число точек гнезда через самый дешевый подходящий уровень.
+
+        Уровни: формула паттерна, многочлен суммирования, прямой обход (пока
+        он по модели стоимости дешевле запроса к бэкенду) и Barvinok через self.backend. Если ни один
+        уровень не дал ответа, выбрасывается RuntimeError с причинами.
+        Параметры задаются по именам символов исходника; если какого-то нет,
+        до попыток уровней выбрасывается ValueError со списком недостающих.
+        elapsed_ms включает время неудачных уровней и калибровки модели стоимости.
+        """
+        failures = []
+        start = time.perf_counter_ns()
+        self._check_parameters(loop_structure, concrete_params)
+
+        compiled = self.compile(loop_structure)
+        if compiled is not None:
+            try:
+                return self._result(compiled(concrete_params), "formula", start)
+            except (KeyError, ValueError) as e:
+                failures.append(f"formula: {e!r}")
+
+        formula = self.summation(loop_structure)
+        if formula is not None:
+            try:
+                return self._result(formula(concrete_params), "summation", start)
+            except (KeyError, ValueError) as e:
+                failures.append(f"summation: {e!r}")
+
+        if not self.cost_model.calibrated:
+            self.cost_model.calibrate(backend=self.backend)
 
-    def count_barvinok(self, loop_structure: LoopStructure, concrete_params: dict[str, int]):
         try:
+            key = loop_structure.structure_key()
+            enumerator = self._enumerators.get(key)
+            if enumerator is None:
+                enumerator = self._enumerators[key] = Enumerator(loop_structure)
+            value = enumerator.count(concrete_params, max_points=self.cost_model.enumeration_budget())
+            return self._result(value, "enumeration", start)
+        except EnumerationBudgetExceeded:
+            failures.append("enumeration: over cost-model budget")
+        except (KeyError, ValueError, TypeError) as e:
+            failures.append(f"enumeration: {e!r}")
+
+        try:
+            value, _ = self.backend.count(loop_structure, concrete_params)
+            return self._result(value, "barvinok", start)
+        except (RuntimeError, ValueError, KeyError) as e:
+            failures.append(f"barvinok: {e}")
+
+        metrics.inc("counter_failures_total")
+        raise RuntimeError("Cannot count loop nest: " + "; ".join(failures))
+
+    def _check_parameters(self, loop_structure: LoopStructure, concrete_params: Mapping[str, int]):
+        key = loop_structure.structure_key()
+        required = self._source_parameters.get(key)
+        if required is None:
+            required = self._source_parameters[key] = source_parameters(loop_structure)
+        for name in required:
+            if name not in concrete_params:
+                raise _missing_parameters(required, concrete_params)
+
+    @staticmethod
+    def _result(value, tier: str, start_ns: int) -> CountResult:
+        result = CountResult(int(value), tier, (time.perf_counter_ns() - start_ns) / 1_000_000)
+        metrics.inc("counter_tier_total", labels=(("tier", tier),))
+        metrics.observe("counter_count_ms", result.elapsed_ms, labels=(("tier", tier),))
+        return result
+
+    def count_many(self, loop_structure: LoopStructure,
+                   params: Union[Mapping[str, Sequence[int]], np.ndarray]) -> np.ndarray:
+        """Векторно вычисляет замкнутую формулу для массива наборов параметров.
+
+        params - словарь столбцов {имя: значения} или структурированный массив NumPy;
+        имена - символы исходника, как в count(), а скаляр относится ко всем строкам.
+        Нецелые значения и недостающие параметры отвергаются с ValueError.
+        Строки считаются в int64, а строки, где возможно переполнение,
+        пересчитываются в целых числах Python; тогда результат имеет dtype=object.
+        Строки вне области формулы считаются по одной через count().
+        """
+        pattern = self.pattern_recognizer.recognize_pattern(loop_structure)
+        if pattern not in _PATTERN_FORMULAS:
+            raise ValueError(f"No closed-form formula for pattern {pattern}")
+        formula, argument_names = _PATTERN_FORMULAS[pattern]
+
+        if isinstance(params, np.ndarray) and params.dtype.names:
+            params = {name: params[name] for name in params.dtype.names}
+        columns = {name: _as_integer_column(values, name) for name, values in params.items()}
+        # те же имена параметров, что и в count(): символы исходника
+        self._check_parameters(loop_structure, columns)
+        shape = np.broadcast_shapes(*(column.shape for column in columns.values()))
+        if len(shape) > 1:
+            raise ValueError(f"Parameter columns must be one-dimensional, got shape {shape}")
+        size = shape[0] if shape else 1
+        columns = {name: np.broadcast_to(column, (size,)) for name, column in columns.items()}
+
+        arguments = [_parameter_column(loop_structure.parameters[name], columns, size)
+                     for name in argument_names]
+        # формула сама считает в int64 и пересчитывает строки с риском переполнения точно
+        result = formula(*arguments)
+        outside = np.flatnonzero(~np.broadcast_to(np.asarray(_FORMULA_DOMAINS[pattern](*arguments), dtype=bool),
+                                                  (size,)))
+        if outside.size:
+            values = [self.count(loop_structure, {name: int(column[row]) for name, column in columns.items()}).value
+                      for row in outside]
+            # точный подсчет строки может не поместиться в int64, даже если формула поместилась
+            if result.dtype != object and not all(abs(value) <= np.iinfo(np.int64).max for value in values):
+                result = result.astype(object)
+            result[outside] = values
+        return result
+
+    def count_barvinok(self, loop_structure: LoopStructure, concrete_params: dict[str, int]):
+        """Число точек и время запроса к iscc в мс: [count, time_ms].
+
+        Ошибки iscc (RuntimeError) и построения множества (ValueError) не
+        подавляются: значения 0 вместо числа точек не бывает.
+        """
+        # параметрический шаблон строится один раз на структуру циклов
+        template = parametric_isl_template(loop_structure)
+        if template is not None:
+            isl_str = template.bind(concrete_params)
+        else:
             substituted_loop = loop_structure.substitute_parameters(concrete_params)
 
             # перевод в isl представление
             isl_str = loop_structure_to_isl_string(substituted_loop)
 
-            count, time_ms = count_integer_points(isl_str)
-            
-            return [count, time_ms]
-            
-        except Exception as e:
-            return 0
\ No newline at end of file
+        pool = get_default_pool() if self.iscc_mode == "pool" else None
+        count, time_ms = count_integer_points(isl_str, pool=pool)
+
+        return [count, time_ms]
+
+    def count_barvinok_parametric(self, loop_structure: LoopStructure, concrete_params: dict[str, int]):
+        """Считает card параметрического множества один раз и вычисляет его для concrete_params"""
+        key = loop_structure.structure_key()
+        card = self._parametric_cards.get(key)
+        if card is None:
+            template = parametric_isl_template(loop_structure)
+            isl_str = template.parametric if template is not None else loop_structure_to_parametric_isl_string(loop_structure)
+            pool = get_default_pool() if self.iscc_mode == "pool" else None
+            card, _ = compute_parametric_card(isl_str, pool=pool)
+            self._parametric_cards[key] = card
+
+        start = time.perf_counter_ns()
+        count = card.evaluate(concrete_params)
+        end = time.perf_counter_ns()
+
+        return [count, (end - start) / 1_000_000]
@@ -0,0 +1,128 @@
+from functools import reduce
+from typing import Callable, Dict, Iterator, Mapping, Tuple
+
+import numpy as np
+
+from loop_analyzer.core.affine import AffineExpr, as_affine, is_sympy_expr
+from loop_analyzer.core.loop import LoopStructure
+
+# Точный подсчет точек гнезда прямым обходом, векторизованным по NumPy.
+# Внешние уровни разворачиваются в массивы точек, а на самом внутреннем
+# уровне считается только число итераций max(0, ceil((end - start) / step)).
+# Точки разворачиваются порциями по chunk_size, поэтому память ограничена
+# независимо от размера пространства итераций. Значения считаются в int64.
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+class EnumerationBudgetExceeded(Exception):
+    """Число разворачиваемых точек внешних уровней превысило max_points"""
+
+
+def _vector_evaluator(expr) -> Callable[[Dict[str, object]], object]:
+    """Функция, вычисляющая границу для словаря значений (чисел или массивов)"""
+    if isinstance(expr, str):
+        affine_expr = as_affine(expr)
+        if affine_expr is None:
+            raise ValueError(f"Cannot evaluate loop bound {expr!r}")
+        expr = affine_expr
+    if isinstance(expr, (int, np.integer)):
+        value = int(expr)
+        return lambda values: value
+    if isinstance(expr, AffineExpr):
+        return expr.evaluate
+    if is_sympy_expr(expr):
+        import sympy as sp
+        symbols = sorted(expr.free_symbols, key=lambda symbol: symbol.name)
+        names = [symbol.name for symbol in symbols]
+        # Max/Min от скаляров и массивов - поэлементные maximum/minimum
+        function = sp.lambdify(symbols, expr, modules=[{
+            'Max': lambda *args: reduce(np.maximum, args),
+            'Min': lambda *args: reduce(np.minimum, args),
+        }, 'numpy'])
+        return lambda values: function(*[values[name] for name in names])
+    raise ValueError(f"Cannot evaluate loop bound {expr!r}")
+
+
+def _column(value, size: int) -> np.ndarray:
+    column = np.asarray(value)
+    if column.dtype.kind == 'f':
+        if not np.all(np.floor(column) == column):
+            raise ValueError("Non-integer loop bound")
+        column = column.astype(np.int64)
+    elif column.dtype.kind not in 'iu':
+        column = column.astype(np.int64)
+    return np.broadcast_to(column.astype(np.int64, copy=False), (size,))
+
+
+def _trip_counts(starts: np.ndarray, ends: np.ndarray, steps: np.ndarray) -> np.ndarray:
+    if not steps.all():
+        raise ValueError("Zero loop step")
+    # ceil((end - start) / step) для шагов обоих знаков
+    return np.maximum(0, -((starts - ends) // steps))
+
+
+def _exact_sum(trips: np.ndarray) -> int:
+    if trips.size and int(trips.max()) > (1 << 62) // trips.size:
+        return sum(int(trip) for trip in trips)
+    return int(trips.sum())
+
+
+def _expand(trips: np.ndarray, chunk_size: int) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Порции развернутых точек: (номер исходной точки, номер итерации в ее диапазоне)"""
+    ends = np.cumsum(trips)
+    total = int(ends[-1]) if ends.size else 0
+    for position in range(0, total, chunk_size):
+        flat = np.arange(position, min(total, position + chunk_size), dtype=np.int64)
+        index = np.searchsorted(ends, flat, side='right')
+        yield index, flat - (ends[index] - trips[index])
+
+
+class Enumerator:
+    """Скомпилированные границы гнезда; подходит для многократного подсчета с разными параметрами"""
+    def __init__(self, loop_structure: LoopStructure):
+        self.levels = [(bound.variable, _vector_evaluator(bound.start),
+                        _vector_evaluator(bound.end), _vector_evaluator(bound.step))
+                       for bound in loop_structure.bounds]
+
+    def count(self, params: Mapping[str, int], chunk_size: int = DEFAULT_CHUNK_SIZE,
+              max_points: float = float('inf')) -> int:
+        """Точное число точек для конкретных параметров.
+
+        max_points ограничивает число разворачиваемых точек внешних уровней;
+        при превышении - EnumerationBudgetExceeded.
+        """
+        if not self.levels:
+            return 1
+        values = {name: int(value) for name, value in params.items()}
+        return self._count(0, values, 1, chunk_size, [max_points])
+
+    def _count(self, level: int, values: Dict[str, object], size: int, chunk_size: int, budget: list) -> int:
+        variable, start, end, step = self.levels[level]
+        starts = _column(start(values), size)
+        steps = _column(step(values), size)
+        trips = _trip_counts(starts, _column(end(values), size), steps)
+        if level == len(self.levels) - 1:
+            return _exact_sum(trips)
+
+        budget[0] -= _exact_sum(trips)
+        if budget[0] < 0:
+            raise EnumerationBudgetExceeded(f"points budget exceeded at level {level}")
+
+        total = 0
+        for index, offsets in _expand(trips, chunk_size):
+            frontier = {name: column[index] if isinstance(column, np.ndarray) else column
+                        for name, column in values.items()}
+            frontier[variable] = starts[index] + steps[index] * offsets
+            total += self._count(level + 1, frontier, len(index), chunk_size, budget)
+        return total
+
+
+def count_points(loop_structure: LoopStructure, params: Mapping[str, int],
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, max_points: float = float('inf')) -> int:
+    """Точное число точек гнезда для конкретных параметров.
+
+    Границы могут быть любыми выражениями (в том числе Max/Min) от параметров
+    и внешних переменных.
+    """
+    return Enumerator(loop_structure).count(params, chunk_size, max_points)
@@ -0,0 +1,103 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from typing import List, Optional, Sequence
+
+from .loop import LoopStructure
+
+_ENTRY_SUFFIX = ".pkl"
+
+
+class ExtractionCache:
+    """Дисковый кэш извлеченных циклов: ключ - хеш исходника, аргументов clang и версии экстрактора"""
+    def __init__(self, cache_dir: str, max_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        # оценка размера каталога; точный размер пересчитывается при вытеснении
+        self._approx_size = sum(size for _, size, _ in self._entries())
+
+    def key(self, source: bytes, clang_args: Sequence[str], version: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(version.encode())
+        digest.update(b'\0')
+        digest.update('\0'.join(clang_args).encode())
+        digest.update(b'\0')
+        digest.update(source)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + _ENTRY_SUFFIX)
+
+    def get(self, key: str) -> Optional[List[LoopStructure]]:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                loops = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # поврежденная или несовместимая запись - просто удаляем
+            self._remove(path)
+            return None
+
+        # время модификации служит отметкой последнего использования при вытеснении
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return loops
+
+    def put(self, key: str, loops: List[LoopStructure]):
+        # пишем во временный файл и атомарно переименовываем: кэш могут
+        # одновременно заполнять несколько процессов
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(loops, f, protocol=pickle.HIGHEST_PROTOCOL)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+
+        self._approx_size += size
+        if self._approx_size > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Удаляет давно не использованные записи, пока размер кэша больше max_bytes"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if self._remove(path):
+                total -= size
+        self._approx_size = total
+
+    def clear(self):
+        for _, _, path in self._entries():
+            self._remove(path)
+        self._approx_size = 0
+
+    def _entries(self):
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(_ENTRY_SUFFIX):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
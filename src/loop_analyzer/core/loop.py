@@ -1,10 +1,15 @@
 from enum import Enum
-from dataclasses import dataclass
-from typing import List, Optional, Union, Dict
+from dataclasses import dataclass, field
+from operator import is_
+from typing import TYPE_CHECKING, List, Optional, Union, Dict
 import ast
-import sympy as sp
 from copy import deepcopy
 
+from .affine import AffineExpr, is_sympy_expr
+
+if TYPE_CHECKING:
+    import sympy as sp
+
 class PatternType(Enum):
     """Перечисление всех 6 паттернов из документа"""
     LOWER_TRIANGLE = 1
@@ -17,9 +22,9 @@ class PatternType(Enum):
 @dataclass
 class LoopBound:
     """Представляет границы одного цикла"""
-    start: Union[int, str, sp.Symbol] # начальное значение (может быть символьным)
-    end: Union[int, str, sp.Symbol]  # конечное значение
-    step: Union[int, str, sp.Symbol]  = 1 # шаг итерации
+    start: Union[int, str, AffineExpr, 'sp.Expr'] # начальное значение (может быть символьным)
+    end: Union[int, str, AffineExpr, 'sp.Expr']  # конечное значение
+    step: Union[int, str, AffineExpr, 'sp.Expr']  = 1 # шаг итерации
     variable: str = "" # имя переменной цикла
 
 @dataclass
@@ -37,17 +42,42 @@ class LoopStructure:
     conditions: List[LoopCondition] = None # условия внутри циклов
     nesting_depth: int = 0 # глубина вложенности
     pattern_type: Optional[PatternType] = None # тип распознанного паттерна
-    parameters: Dict[str, Union[int, sp.Symbol]] = None # параметры для формул
+    parameters: Dict[str, Union[int, AffineExpr, 'sp.Expr']] = None # параметры для формул
+    # (объекты границ и условий, ключ) последнего вызова structure_key()
+    _structure_key: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
+
+    def structure_key(self) -> tuple:
+        """Хешируемый ключ структуры: границы и условия в строковом виде.
+
+        str() выражений sympy стоит сотни микросекунд, поэтому ключ хранится
+        в экземпляре и строится заново, только если заменена граница, ее
+        выражение или условие (объекты сравниваются по тождеству).
+        """
+        stamp = self._key_stamp()
+        cached = self._structure_key
+        if cached is not None and len(cached[0]) == len(stamp) and all(map(is_, cached[0], stamp)):
+            return cached[1]
+        bounds_key = tuple((bound.variable, str(bound.start), str(bound.end), str(bound.step)) for bound in self.bounds)
+        conditions_key = tuple(condition.expression for condition in self.conditions or ())
+        key = bounds_key, conditions_key
+        self._structure_key = (stamp, key)
+        return key
+
+    def _key_stamp(self) -> tuple:
+        stamp = []
+        for bound in self.bounds:
+            stamp.extend((bound.variable, bound.start, bound.end, bound.step))
+        for condition in self.conditions or ():
+            stamp.append(condition.expression)
+        return tuple(stamp)
     
     def substitute_parameters(self, param_values: Dict[str, Union[int, float]]) -> 'LoopStructure':
-        substitutions = {sp.Symbol(k): v for k, v in param_values.items()}
-
         new_bounds = []
         for bound in self.bounds:
             new_bound = LoopBound(
-                start=self._substitute_expr(bound.start, substitutions),
-                end=self._substitute_expr(bound.end, substitutions),
-                step=self._substitute_expr(bound.step, substitutions),
+                start=self._substitute_expr(bound.start, param_values),
+                end=self._substitute_expr(bound.end, param_values),
+                step=self._substitute_expr(bound.step, param_values),
                 variable=bound.variable
             )
             new_bounds.append(new_bound)
@@ -67,10 +97,11 @@ class LoopStructure:
         new_parameters = {}
         if self.parameters:
             for k, v in self.parameters.items():
-                if isinstance(v, sp.Symbol) and k in param_values:
+                is_symbol = getattr(v, 'is_symbol', False) or getattr(v, 'is_Symbol', False)
+                if is_symbol and k in param_values:
                     new_parameters[k] = param_values[k]
-                elif isinstance(v, sp.Expr):
-                    new_parameters[k] = v.subs(substitutions)
+                elif isinstance(v, AffineExpr) or is_sympy_expr(v):
+                    new_parameters[k] = self._substitute_expr(v, param_values)
                 else:
                     new_parameters[k] = v
         
@@ -82,18 +113,15 @@ class LoopStructure:
             parameters=new_parameters
         )
     
-    def _substitute_expr(self, expr, substitutions):
-        if isinstance(expr, sp.Expr):
-            return expr.subs(substitutions)
-        elif isinstance(expr, sp.Symbol):
-            return substitutions.get(expr, expr)
+    def _substitute_expr(self, expr, param_values):
+        if isinstance(expr, AffineExpr):
+            return expr.substitute(param_values)
+        elif is_sympy_expr(expr):
+            # подставляем по именам символов, чтобы не импортировать sympy ради Symbol(k)
+            substitutions = {symbol: param_values[symbol.name]
+                             for symbol in expr.free_symbols if symbol.name in param_values}
+            return expr.subs(substitutions) if substitutions else expr
         elif isinstance(expr, str):
-            try:
-                symbol = sp.Symbol(expr)
-                if symbol in substitutions:
-                    return substitutions[symbol]
-            except:
-                pass
-            return expr
+            return param_values.get(expr, expr)
         return expr
 
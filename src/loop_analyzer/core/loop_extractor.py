@@ -1,67 +1,212 @@
 #!/usr/bin/env python3
 
+import functools
+import itertools
 import os
+import re
 import sys
+import weakref
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 import clang.cindex
 from clang.cindex import CursorKind, TypeKind
-from typing import List, Dict, Optional, Union
-import sympy as sp
+from typing import TYPE_CHECKING, Iterator, List, Dict, Optional, Tuple, Union
 
 sys.path.append(str(Path(__file__).parent / "src" / "loop_analyzer"))
 from .loop import (LoopBound, LoopCondition, LoopStructure, PatternType)
+from .extraction_cache import ExtractionCache
+from .affine import AffineExpr, is_sympy_expr, parse_affine
+from .canonicalize import canonicalize_expression
+from ..utils import instrumentation as metrics
+
+if TYPE_CHECKING:
+    import sympy as sp
+
+# Версия формата извлеченных структур; меняется вместе с логикой извлечения,
+# чтобы записи дискового кэша от старых версий не использовались
+EXTRACTOR_VERSION = "3"
+
+# Флаг CXTranslationUnit_LimitSkipFunctionBodiesToPreamble из clang-c/Index.h,
+# в clang.cindex для него нет константы. Вместе с PARSE_SKIP_FUNCTION_BODIES
+# пропускаются только тела функций из преамбулы (подключаемых заголовков),
+# тела функций самого файла разбираются. Флаг появился в libclang 6: более
+# старая версия его проигнорирует и пропустит тела всех функций вместе с циклами.
+CXTranslationUnit_LimitSkipFunctionBodiesToPreamble = 0x800
+LIMIT_SKIP_FUNCTION_BODIES_MIN_VERSION = (6, 0)
+
+_CLANG_VERSION_PATTERN = re.compile(r'clang version (\d+)\.(\d+)')
+
+
+@functools.lru_cache(maxsize=None)
+def libclang_version() -> Optional[Tuple[int, int]]:
+    """Версия загруженной libclang (major, minor); None, если ее не удалось определить"""
+    try:
+        get_version = clang.cindex.conf.lib.clang_getClangVersion
+        get_version.restype = clang.cindex._CXString
+        text = clang.cindex._CXString.from_result(get_version())
+    except Exception:
+        return None
+    match = _CLANG_VERSION_PATTERN.search(text or "")
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def incremental_parse_options() -> int:
+    """Опции разбора для инкрементального режима.
+
+    Тела функций преамбулы пропускаются, только если libclang знает флаг
+    ограничения пропуска преамбулой; иначе тела разбираются целиком.
+    """
+    options = (clang.cindex.TranslationUnit.PARSE_INCOMPLETE
+               | clang.cindex.TranslationUnit.PARSE_PRECOMPILED_PREAMBLE)
+    version = libclang_version()
+    if version is not None and version >= LIMIT_SKIP_FUNCTION_BODIES_MIN_VERSION:
+        options |= (clang.cindex.TranslationUnit.PARSE_SKIP_FUNCTION_BODIES
+                    | CXTranslationUnit_LimitSkipFunctionBodiesToPreamble)
+    return options
+
+
+class _SourceBuffer:
+    """Содержимое исходного файла, прочитанное один раз"""
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def slice(self, extent) -> str:
+        # смещения clang - в байтах от начала файла, поэтому многобайтные
+        # символы и переводы строк внутри диапазона пересчитывать не нужно
+        return self.data[extent.start.offset:extent.end.offset].decode('utf-8', errors='replace')
+
 
 class CppLoopExtractor:
-    def __init__(self):
+    def __init__(self, cache_dir: Optional[str] = None, cache_max_bytes: int = 256 * 1024 * 1024,
+                 incremental: bool = False):
+        self.clang_args = ['-std=c++17']
+        # инкрементальный режим для цикла "правка - анализ": единицы трансляции
+        # остаются в памяти и повторно разбираются через TranslationUnit.reparse
+        self.incremental = incremental
+        self.parse_options = incremental_parse_options() if incremental else 0
+        self._translation_units: Dict[str, clang.cindex.TranslationUnit] = {}
+        # несохраненное содержимое файлов для повторного разбора (только в инкрементальном режиме)
+        self._unsaved_contents: Dict[str, bytes] = {}
+        # дисковый кэш результатов: при неизменном исходнике libclang не вызывается
+        self.cache = ExtractionCache(cache_dir, cache_max_bytes) if cache_dir else None
+        # буферы исходников на единицу трансляции; освобождаются вместе с ней
+        self._source_buffers = weakref.WeakKeyDictionary()
         try:
             self.index = clang.cindex.Index.create()
         except Exception as e:
-            print(f"Failed to initialize clang: {e}")
-            print("Trying to find compatible libclang...")
+            print(f"Failed to initialize clang: {e}", file=sys.stderr)
+            print("Trying to find compatible libclang...", file=sys.stderr)
             import subprocess
             try:
                 result = subprocess.run(['find', '/usr/lib', '-name', 'libclang*.so*'], 
                                       capture_output=True, text=True)
                 if result.stdout:
                     libclang_path = result.stdout.strip().split('\n')[0]
-                    print(f"Found libclang at: {libclang_path}")
+                    print(f"Found libclang at: {libclang_path}", file=sys.stderr)
                     clang.cindex.conf.set_library_file(libclang_path)
                     self.index = clang.cindex.Index.create()
                 else:
                     raise Exception("No libclang found")
             except Exception as e2:
-                print(f"Could not initialize clang: {e2}")
+                print(f"Could not initialize clang: {e2}", file=sys.stderr)
                 self.index = None
     
-    def parse_file(self, filepath: str) -> clang.cindex.TranslationUnit:
-        return self.index.parse(filepath, args=['-std=c++17'])
+    def parse_file(self, filepath: str, unsaved_content: Union[str, bytes, None] = None) -> clang.cindex.TranslationUnit:
+        """Разбирает файл; unsaved_content подменяет содержимое файла на диске.
+
+        В инкрементальном режиме единица трансляции файла сохраняется, и при
+        следующем вызове разбирается заново только сам файл: преамбула берется
+        из кэша libclang.
+        """
+        if isinstance(unsaved_content, str):
+            unsaved_content = unsaved_content.encode('utf-8')
+        unsaved_files = [(filepath, unsaved_content)] if unsaved_content is not None else None
+
+        start = metrics.clock()
+        if not self.incremental:
+            tu = self.index.parse(filepath, args=self.clang_args, unsaved_files=unsaved_files)
+            if unsaved_content is not None:
+                # буфер редактора живет вместе с единицей трансляции и не копится в self._unsaved_contents
+                self._source_buffers[tu] = {filepath: _SourceBuffer(unsaved_content)}
+            metrics.observe_since("extractor_parse_ms", start, labels=(("mode", "parse"),))
+            return tu
+
+        # при повторном разборе содержимое нужно снова, поэтому оно хранится до release_translation_units
+        if unsaved_content is not None:
+            self._unsaved_contents[filepath] = unsaved_content
+        else:
+            self._unsaved_contents.pop(filepath, None)
+
+        tu = self._translation_units.get(filepath)
+        if tu is None:
+            tu = self.index.parse(filepath, args=self.clang_args,
+                                  unsaved_files=unsaved_files, options=self.parse_options)
+            self._translation_units[filepath] = tu
+            metrics.observe_since("extractor_parse_ms", start, labels=(("mode", "parse"),))
+        else:
+            tu.reparse(unsaved_files=unsaved_files)
+            # содержимое файла могло измениться - буферы старого разбора устарели
+            self._source_buffers.pop(tu, None)
+            metrics.observe_since("extractor_parse_ms", start, labels=(("mode", "reparse"),))
+        return tu
+
+    def release_translation_units(self, filepath: Optional[str] = None):
+        """Освобождает сохраненные единицы трансляции (все или одного файла)"""
+        if filepath is None:
+            self._translation_units.clear()
+            self._unsaved_contents.clear()
+        else:
+            self._translation_units.pop(filepath, None)
+            self._unsaved_contents.pop(filepath, None)
     
     def extract_expression_text(self, cursor) -> str:
         if not cursor.extent.start.file or not cursor.extent.end.file:
             return ""
         
         try:
-            with open(cursor.extent.start.file.name, 'r') as f:
-                lines = f.readlines()
-                
-            start_line = cursor.extent.start.line - 1
-            start_col = cursor.extent.start.column - 1
-            end_line = cursor.extent.end.line - 1
-            end_col = cursor.extent.end.column - 1
-            
-            if start_line == end_line:
-                return lines[start_line][start_col:end_col]
-            else:
-                result = lines[start_line][start_col:]
-                for i in range(start_line + 1, end_line):
-                    result += lines[i]
-                if end_line < len(lines):
-                    result += lines[end_line][:end_col]
-                return result
+            return self._source_buffer(cursor).slice(cursor.extent)
         except:
             return cursor.spelling or ""
+
+    def _source_buffer(self, cursor) -> _SourceBuffer:
+        """Возвращает буфер файла курсора, читая файл не больше одного раза на разбор"""
+        filename = cursor.extent.start.file.name
+        buffers = self._source_buffers.get(cursor.translation_unit)
+        if buffers is None:
+            buffers = {}
+            self._source_buffers[cursor.translation_unit] = buffers
+
+        buffer = buffers.get(filename)
+        if buffer is None:
+            data = self._unsaved_contents.get(filename)
+            if data is None:
+                with open(filename, 'rb') as f:
+                    data = f.read()
+            buffer = _SourceBuffer(data)
+            buffers[filename] = buffer
+        return buffer
     
-    def parse_expression_to_sympy(self, expr_text: str) -> Union[sp.Expr, sp.Symbol, int]:
+    def parse_expression(self, expr_text: str) -> Union[int, AffineExpr, 'sp.Expr']:
+        """Разбирает выражение границы: аффинные выражения - без sympy, остальные - через sympy"""
+        cleaned_expr = expr_text.strip()
+        try:
+            value = int(cleaned_expr)
+            metrics.inc("extractor_expressions_total", labels=(("kind", "int"),))
+            return value
+        except ValueError:
+            pass
+
+        affine_expr = parse_affine(cleaned_expr)
+        if affine_expr is not None:
+            metrics.inc("extractor_expressions_total", labels=(("kind", "affine"),))
+            return affine_expr
+        metrics.inc("extractor_expressions_total", labels=(("kind", "sympy"),))
+        return self.parse_expression_to_sympy(expr_text)
+
+    def parse_expression_to_sympy(self, expr_text: str) -> Union['sp.Expr', 'sp.Symbol', int]:
+        import sympy as sp
+
         if not expr_text.strip():
             return sp.Symbol('unknown')
 
@@ -98,6 +243,7 @@ class CppLoopExtractor:
             else:
                 return sp.sympify(cleaned_expr)
         except:
+            metrics.inc("extractor_sympy_fallbacks_total")
             if cleaned_expr.isidentifier():
                 return sp.Symbol(cleaned_expr)
             else:
@@ -132,10 +278,10 @@ class CppLoopExtractor:
                                 if resolved_expr:
                                     expr_text = resolved_expr
                             
-                            start_value = self.parse_expression_to_sympy(expr_text)
+                            start_value = self.parse_expression(expr_text)
                             break
 
-        end_value = sp.Symbol('n')
+        end_value = AffineExpr.symbol('n')
         if condition:
             condition_text = self.extract_expression_text(condition)
             operators = ['<=', '>=', '<', '>', '!=', '==']
@@ -157,7 +303,7 @@ class CppLoopExtractor:
                             if resolved_expr:
                                 end_expr = resolved_expr
                         
-                        end_value = self.parse_expression_to_sympy(end_expr)
+                        end_value = self.parse_expression(end_expr)
                         break
 
         step_value = 1
@@ -167,12 +313,12 @@ class CppLoopExtractor:
                 parts = inc_text.split('+=')
                 if len(parts) == 2:
                     step_expr = parts[1].strip()
-                    step_value = self.parse_expression_to_sympy(step_expr)
+                    step_value = self.parse_expression(step_expr)
             elif '-=' in inc_text:
                 parts = inc_text.split('-=')
                 if len(parts) == 2:
                     step_expr = parts[1].strip()
-                    step_value = -self.parse_expression_to_sympy(step_expr)
+                    step_value = -self.parse_expression(step_expr)
             elif '++' in inc_text:
                 step_value = 1
             elif '--' in inc_text:
@@ -232,7 +378,9 @@ class CppLoopExtractor:
             return False
         return True
     
-    def is_sympy_expression_linear(self, expr: Union[sp.Expr, sp.Symbol, int]) -> bool:
+    def is_sympy_expression_linear(self, expr: Union['sp.Expr', 'sp.Symbol', int]) -> bool:
+        import sympy as sp
+
         try:
             if isinstance(expr, (int, float)):
                 return True
@@ -252,7 +400,9 @@ class CppLoopExtractor:
             return False
         return False
     
-    def extract_linear_coefficients(self, expr: Union[sp.Expr, sp.Symbol, int], variables: List[str]) -> Dict[str, int]:
+    def extract_linear_coefficients(self, expr: Union['sp.Expr', 'sp.Symbol', int], variables: List[str]) -> Dict[str, int]:
+        import sympy as sp
+
         coefficients = {}
         try:
             if isinstance(expr, (int, float)):
@@ -294,17 +444,18 @@ class CppLoopExtractor:
             parameters=loop_structure.parameters
         )
     
-    def simplify_expression(self, expr: Union[int, str, sp.Symbol, sp.Expr]) -> Union[int, sp.Symbol, sp.Expr]:
+    def simplify_expression(self, expr: Union[int, str, AffineExpr, 'sp.Expr']) -> Union[int, AffineExpr, 'sp.Expr']:
         try:
-            if isinstance(expr, (int, float)):
+            # аффинные выражения уже в канонической форме
+            if isinstance(expr, (int, float, AffineExpr)):
                 return expr
             if isinstance(expr, str):
-                return self.parse_expression_to_sympy(expr)
-            if isinstance(expr, (sp.Symbol, sp.Expr)):
-                return sp.simplify(expr)
+                return self.parse_expression(expr)
+            if is_sympy_expr(expr):
+                return canonicalize_expression(expr)
         except:
             if isinstance(expr, str):
-                return sp.Symbol(expr)
+                return AffineExpr.symbol(expr) if expr.isidentifier() else expr
             return expr
     
     def find_variable_assignments(self, cursor, var_name: str) -> Optional[str]:
@@ -325,7 +476,10 @@ class CppLoopExtractor:
         return search_assignments(cursor)
 
     def extract_loops_from_cursor(self, cursor, depth=0) -> List[LoopStructure]:
-        loops = []
+        return list(self.iter_loops_from_cursor(cursor, depth))
+
+    def iter_loops_from_cursor(self, cursor, depth=0) -> Iterator[LoopStructure]:
+        """Выдает гнезда циклов по мере обхода AST, не накапливая их"""
         current_bounds = []
         
         def collect_nested_loops(node, current_depth, bounds_stack, parent_scope=None):
@@ -346,49 +500,157 @@ class CppLoopExtractor:
                     )
 
                     simplified_struct = self.validate_and_simplify_bounds(loop_struct)
-                    loops.append(simplified_struct)
+                    yield simplified_struct
 
                     for child in node.get_children():
                         if child.kind == CursorKind.COMPOUND_STMT:
-                            collect_nested_loops(child, current_depth + 1, new_bounds, node)
+                            yield from collect_nested_loops(child, current_depth + 1, new_bounds, node)
             else:
                 for child in node.get_children():
-                    collect_nested_loops(child, current_depth, bounds_stack, parent_scope)
+                    yield from collect_nested_loops(child, current_depth, bounds_stack, parent_scope)
         
-        collect_nested_loops(cursor, depth, current_bounds)
-        return loops
+        yield from collect_nested_loops(cursor, depth, current_bounds)
     
-    def extract_loops_from_file(self, filepath: str) -> List[LoopStructure]:
+    def extract_loops_from_file(self, filepath: str, unsaved_content: Union[str, bytes, None] = None) -> List[LoopStructure]:
+        return list(self.iter_loops_from_file(filepath, unsaved_content))
+
+    def iter_loops_from_file(self, filepath: str, unsaved_content: Union[str, bytes, None] = None) -> Iterator[LoopStructure]:
+        """Выдает гнезда циклов файла по мере извлечения.
+
+        Единица трансляции освобождается, как только файл обойден до конца
+        (в инкрементальном режиме она остается в self._translation_units).
+        """
         try:
-            tu = self.parse_file(filepath)
+            if isinstance(unsaved_content, str):
+                unsaved_content = unsaved_content.encode('utf-8')
+
+            cache_key = None
+            if self.cache is not None:
+                source = unsaved_content
+                if source is None:
+                    with open(filepath, 'rb') as f:
+                        source = f.read()
+                cache_key = self.cache.key(source, self._cache_args(), EXTRACTOR_VERSION)
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    metrics.inc("extractor_cache_total", labels=(("result", "hit"),))
+                    metrics.inc("extractor_loops_total", len(cached))
+                    yield from cached
+                    return
+                metrics.inc("extractor_cache_total", labels=(("result", "miss"),))
+
+            tu = self.parse_file(filepath, unsaved_content)
             if not tu:
-                print(f"Failed to parse {filepath}")
-                return []
+                print(f"Failed to parse {filepath}", file=sys.stderr)
+                return
             
-            loops = []
+            # список нужен только для записи в кэш и ограничен одним файлом
+            loops = [] if cache_key is not None else None
             for cursor in tu.cursor.get_children():
-                loops.extend(self.extract_loops_from_cursor(cursor))
-            
-            return loops
+                for loop in self.iter_loops_from_cursor(cursor):
+                    if loops is not None:
+                        loops.append(loop)
+                    metrics.inc("extractor_loops_total")
+                    yield loop
+            # курсоры держат ссылку на единицу трансляции
+            cursor = tu = None
+
+            if cache_key is not None:
+                self.cache.put(cache_key, loops)
         except Exception as e:
-            print(f"Error processing {filepath}: {e}")
-            return []
+            metrics.inc("extractor_errors_total")
+            print(f"Error processing {filepath}: {e}", file=sys.stderr)
+
+    def _cache_args(self) -> List[str]:
+        # пропуск тел функций заголовков меняет результат, поэтому опции разбора входят в ключ
+        if self.parse_options:
+            return self.clang_args + [f'--parse-options={self.parse_options:#x}']
+        return self.clang_args
+
+    def clear_cache(self):
+        """Очищает дисковый кэш извлеченных циклов"""
+        if self.cache is not None:
+            self.cache.clear()
     
-    def process_directory(self, data_dir: str) -> Dict[str, List[LoopStructure]]:
+    def process_directory(self, data_dir: str, jobs: int = 1) -> Dict[str, List[LoopStructure]]:
+        """Извлекает циклы из всех .cpp файлов каталога; jobs > 1 - разбор в пуле процессов"""
         results = {}
-        
-        for root, dirs, files in os.walk(data_dir):
-            for file in files:
-                if file.endswith('.cpp'):
-                    filepath = os.path.join(root, file)
-                    
-                    loops = self.extract_loops_from_file(filepath)
-                    if loops:
-                        results[filepath] = loops
-                    else:
-                        pass
-        
+        for filepath, loop in self.iter_loops(data_dir, jobs):
+            results.setdefault(filepath, []).append(loop)
         return results
+
+    def iter_loops(self, path: str, jobs: int = 1) -> Iterator[Tuple[str, LoopStructure]]:
+        """Потоково выдает пары (файл, гнездо циклов) для файла или каталога.
+
+        В памяти одновременно находятся циклы не более чем нескольких файлов,
+        поэтому распознавание и подсчет можно выполнять конвейером над деревом
+        исходников любого размера. Файлы обходятся в отсортированном порядке.
+        Если процесс-исполнитель падает на файле, файл сообщается и пропускается,
+        а пул процессов создается заново.
+        """
+        filepaths = _collect_source_files(path)
+
+        if jobs is None or jobs <= 0:
+            jobs = os.cpu_count() or 1
+
+        if jobs == 1 or len(filepaths) < 2:
+            for filepath in filepaths:
+                for loop in self.iter_loops_from_file(filepath):
+                    yield filepath, loop
+            return
+
+        cache_args = (self.cache.cache_dir, self.cache.max_bytes) if self.cache else (None,)
+        workers = min(jobs, len(filepaths))
+
+        def start_pool(max_workers: int = workers) -> ProcessPoolExecutor:
+            return ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=cache_args)
+
+        def restart():
+            # упавший процесс (например, segfault libclang) ломает весь пул, и все
+            # незавершенные задачи окна теряются: они отправляются в новый пул
+            nonlocal executor
+            executor.shutdown(wait=False, cancel_futures=True)
+            executor = start_pool()
+            for entry in window:
+                if not _succeeded(entry[1]):
+                    entry[1] = executor.submit(_extract_loops_in_worker, entry[0])
+
+        def submit(filepath: str):
+            try:
+                window.append([filepath, executor.submit(_extract_loops_in_worker, filepath)])
+            except BrokenProcessPool:
+                restart()
+                window.append([filepath, executor.submit(_extract_loops_in_worker, filepath)])
+
+        executor = start_pool()
+        # скользящее окно задач [файл, future]: готовые, но не выданные результаты не копятся
+        window = []
+        try:
+            pending = iter(filepaths)
+            for filepath in itertools.islice(pending, 2 * workers):
+                submit(filepath)
+
+            while window:
+                filepath, future = window.pop(0)
+                try:
+                    loops = future.result()
+                except BrokenProcessPool:
+                    # неизвестно, какой файл уронил процесс: первый файл окна
+                    # повторяется в отдельном пуле, остальные - в новом общем
+                    loops = _extract_in_isolation(filepath, cache_args)
+                    restart()
+                except Exception as e:
+                    loops = None
+                    print(f"Error processing {filepath}: {e}", file=sys.stderr)
+
+                next_filepath = next(pending, None)
+                if next_filepath is not None:
+                    submit(next_filepath)
+                # падение одного файла (в том числе процесса libclang) не прерывает разбор
+                for loop in loops or ():
+                    yield filepath, loop
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
     
     def print_loop_analysis(self, results: Dict[str, List[LoopStructure]]):
         print("\n" + "="*60)
@@ -412,11 +674,49 @@ class CppLoopExtractor:
                         print(f"    {cond.expression} (linear: {cond.is_linear})")
                         print(f"    Variables: {cond.variables}")
 
+def _collect_source_files(path: str) -> List[str]:
+    if os.path.isfile(path):
+        return [path]
+    filepaths = []
+    for root, dirs, files in os.walk(path):
+        for file in files:
+            if file.endswith('.cpp'):
+                filepaths.append(os.path.join(root, file))
+    # порядок os.walk зависит от файловой системы
+    filepaths.sort()
+    return filepaths
+
+# Экстрактор процесса-исполнителя: у каждого процесса свой clang.cindex.Index
+_worker_extractor = None
+
+def _init_worker(*cache_args):
+    global _worker_extractor
+    _worker_extractor = CppLoopExtractor(*cache_args)
+
+def _extract_loops_in_worker(filepath: str) -> List[LoopStructure]:
+    return _worker_extractor.extract_loops_from_file(filepath)
+
+def _succeeded(future: Future) -> bool:
+    return future.done() and not future.cancelled() and future.exception() is None
+
+def _extract_in_isolation(filepath: str, cache_args: tuple) -> Optional[List[LoopStructure]]:
+    """Извлекает циклы файла в отдельном процессе; None, если процесс упал и на этом файле"""
+    with ProcessPoolExecutor(max_workers=1, initializer=_init_worker, initargs=cache_args) as executor:
+        try:
+            return executor.submit(_extract_loops_in_worker, filepath).result()
+        except BrokenProcessPool:
+            metrics.inc("extractor_errors_total")
+            print(f"Error processing {filepath}: extraction process crashed", file=sys.stderr)
+        except Exception as e:
+            print(f"Error processing {filepath}: {e}", file=sys.stderr)
+    return None
+
 def main():
+    """Печатает извлеченные циклы; полный анализ с подсчетом - python -m loop_analyzer.main"""
     if len(sys.argv) > 1:
         data_dir = sys.argv[1]
     else:
-        data_dir = "/home/andrei/PycharmProjects/loop_pattern_analyzer/data"
+        data_dir = str(Path(__file__).resolve().parents[3] / "data")
 
     print(data_dir)
     
@@ -426,6 +726,7 @@ def main():
     
     extractor = CppLoopExtractor()
     results = extractor.process_directory(data_dir)
+    extractor.print_loop_analysis(results)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
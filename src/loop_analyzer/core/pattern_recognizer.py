@@ -1,44 +1,201 @@
-from typing import Optional
+import time
+from typing import Dict, Optional, Tuple
 
 from loop_analyzer.core.loop import PatternType, LoopStructure, LoopBound
+from loop_analyzer.core.affine import AffineExpr, as_affine, is_sympy_expr, make_affine, symbol_names
+from loop_analyzer.utils import instrumentation as metrics
+from loop_analyzer.utils.lru import LRUCache
+
+# Канонические имена не являются идентификаторами C++ и не пересекаются с исходными
+_LOOP_VARIABLE_PREFIX = '$v'
+_PARAMETER_PREFIX = '$p'
+
+_NOT_CACHED = object()
+
+
+def rename_symbols(expr, renaming: Dict[str, str]):
+    """Переименовывает символы выражения границы (int, str, AffineExpr, sympy)"""
+    if isinstance(expr, AffineExpr):
+        coefficients = {}
+        for name, coeff in expr.terms:
+            new_name = renaming.get(name, name)
+            coefficients[new_name] = coefficients.get(new_name, 0) + coeff
+        return make_affine(expr.constant, coefficients)
+    if is_sympy_expr(expr):
+        import sympy as sp
+        replacements = {symbol: sp.Symbol(renaming[symbol.name])
+                        for symbol in expr.free_symbols if symbol.name in renaming}
+        return expr.xreplace(replacements) if replacements else expr
+    if isinstance(expr, str):
+        return renaming.get(expr, expr)
+    return expr
+
+
+def _expression_key(expr) -> Tuple[str, str]:
+    # тип входит в ключ: распознаватель по-разному обращается с int, AffineExpr и sympy
+    return type(expr).__name__, str(expr)
+
+
+def structural_fingerprint(loop_structure: LoopStructure) -> Optional[Tuple[tuple, Dict[str, str]]]:
+    """Канонический отпечаток формы гнезда циклов и переименование в канонические имена.
+
+    Переменные циклов нумеруются по уровню вложенности, остальные символы
+    (параметры) - по первому появлению в границах, поэтому гнезда
+    "for i / for j < i" и "for r / for c < r" дают один отпечаток.
+    Возвращает None, если имена переменных циклов повторяются.
+    """
+    renaming = {}
+    for level, bound in enumerate(loop_structure.bounds):
+        if bound.variable in renaming:
+            return None
+        renaming[bound.variable] = f"{_LOOP_VARIABLE_PREFIX}{level}"
+
+    parameter_count = 0
+    for bound in loop_structure.bounds:
+        for expr in (bound.start, bound.end, bound.step):
+            for name in sorted(symbol_names(expr)):
+                if name not in renaming:
+                    renaming[name] = f"{_PARAMETER_PREFIX}{parameter_count}"
+                    parameter_count += 1
+
+    bounds_key = tuple((_expression_key(rename_symbols(bound.start, renaming)),
+                        _expression_key(rename_symbols(bound.end, renaming)),
+                        _expression_key(rename_symbols(bound.step, renaming)))
+                       for bound in loop_structure.bounds)
+    return (loop_structure.nesting_depth, bounds_key), renaming
+
+
+def _min_max_name(expr) -> Optional[str]:
+    func = getattr(expr, 'func', None)
+    name = getattr(func, '__name__', None)
+    return name if name in ('Max', 'Min') else None
+
+
+def loop_signature(loop_structure: LoopStructure) -> tuple:
+    """Дешевая сигнатура гнезда для выбора проверок паттернов.
+
+    Для каждого уровня, начиная со второго: маски внешних уровней, от которых
+    зависят начало и конец, и является ли граница Max/Min. Внешний уровень
+    ни от чего не зависит, а его форму проверяют сами проверки. Последний
+    элемент - все ли шаги единичные: формулы паттернов выведены для шага 1.
+    """
+    outer = {}
+    levels = []
+    for level, bound in enumerate(loop_structure.bounds):
+        if level:
+            masks = []
+            for expr in (bound.start, bound.end):
+                mask = 0
+                for name in symbol_names(expr):
+                    if name in outer:
+                        mask |= 1 << outer[name]
+                masks.append(mask)
+            levels.append((masks[0], masks[1], _min_max_name(bound.start), _min_max_name(bound.end)))
+        outer.setdefault(bound.variable, level)
+    unit_steps = all(bound.step == 1 for bound in loop_structure.bounds)
+    return loop_structure.nesting_depth, tuple(levels), unit_steps
+
+
+# Сигнатуры гнезд, которые может принять каждая проверка
+_BAND_SIGNATURE = (2, ((0b1, 0b1, 'Max', 'Min'),), True)
+_CHECKER_SIGNATURES = {
+    PatternType.LOWER_TRIANGLE: (2, ((0, 0b1, None, None),), True),
+    PatternType.UPPER_TRIANGLE: (2, ((0b1, 0, None, None),), True),
+    PatternType.DIAGONAL: _BAND_SIGNATURE,
+    PatternType.PARALLELOGRAM: _BAND_SIGNATURE,
+    PatternType.BAND_MATRIX: _BAND_SIGNATURE,
+    PatternType.TRAPEZOID: _BAND_SIGNATURE,
+}
 
 
 class PatternRecognizer:
     """Класс для распознавания паттернов циклов"""
-    def __init__(self):
+    def __init__(self, cache_size: int = 4096):
+        # паттерн и параметры (в канонических именах) по структурному отпечатку
+        self.cache = LRUCache(cache_size)
         # Регистрируем методы распознавания для каждого паттерна
         # Порядок важен: от более специфичного к общему
         self.pattern_checkers = [
             (PatternType.LOWER_TRIANGLE, self._check_lower_triangle),
             (PatternType.UPPER_TRIANGLE, self._check_upper_triangle),
+            (PatternType.DIAGONAL, self._check_diagonal),
+            (PatternType.PARALLELOGRAM, self._check_parallelogram),
+            (PatternType.BAND_MATRIX, self._check_band_matrix),
+            (PatternType.TRAPEZOID, self._check_trapezoid),
         ]
+        # индекс сигнатура -> проверки в порядке регистрации: для гнезда
+        # запускаются только проверки, которые могут его принять
+        self._dispatch = {}
+        for pattern_type, checker in self.pattern_checkers:
+            self._dispatch.setdefault(_CHECKER_SIGNATURES[pattern_type], []).append((pattern_type, checker))
+        # статистика проверок: [вызовы, совпадения, суммарное время в нс]
+        self._checker_stats = {pattern_type: [0, 0, 0] for pattern_type, _ in self.pattern_checkers}
 
     def recognize_pattern(self, loop_structure: LoopStructure) -> Optional[PatternType]:
         """Определяет тип паттерна для данной структуры циклов"""
-        # Проверяем паттерны в порядке от более специфичного к общему
-        for pattern_type, checker in self.pattern_checkers:
-            if checker(loop_structure):
+        fingerprint = structural_fingerprint(loop_structure)
+        if fingerprint is None:
+            metrics.inc("recognizer_cache_total", labels=(("result", "uncacheable"),))
+            return self._recognize(loop_structure)
+
+        key, renaming = fingerprint
+        cached = self.cache.get(key, _NOT_CACHED)
+        if cached is not _NOT_CACHED:
+            metrics.inc("recognizer_cache_total", labels=(("result", "hit"),))
+            pattern_type, canonical_parameters = cached
+            if pattern_type is not None:
+                inverse = {canonical: name for name, canonical in renaming.items()}
+                loop_structure.pattern_type = pattern_type
+                if loop_structure.parameters is None:
+                    loop_structure.parameters = {}
+                for name, value in canonical_parameters.items():
+                    loop_structure.parameters[name] = rename_symbols(value, inverse)
+            return pattern_type
+
+        metrics.inc("recognizer_cache_total", labels=(("result", "miss"),))
+        pattern_type = self._recognize(loop_structure)
+        canonical_parameters = {}
+        if pattern_type is not None:
+            canonical_parameters = {name: rename_symbols(value, renaming)
+                                    for name, value in loop_structure.parameters.items()}
+        self.cache.put(key, (pattern_type, canonical_parameters))
+        return pattern_type
+
+    def _recognize(self, loop_structure: LoopStructure) -> Optional[PatternType]:
+        match_start = metrics.clock()
+        # Проверяем подходящие по сигнатуре паттерны от более специфичного к общему
+        for pattern_type, checker in self._dispatch.get(loop_signature(loop_structure), ()):
+            stats = self._checker_stats[pattern_type]
+            start = time.perf_counter_ns()
+            matched = checker(loop_structure)
+            stats[2] += time.perf_counter_ns() - start
+            stats[0] += 1
+            if matched:
+                stats[1] += 1
                 loop_structure.pattern_type = pattern_type
                 self._extract_parameters(loop_structure, pattern_type)
+                metrics.observe_since("recognizer_match_ms", match_start)
+                metrics.inc("recognizer_patterns_total", labels=(("pattern", pattern_type.name),))
                 return pattern_type
+        metrics.observe_since("recognizer_match_ms", match_start)
+        metrics.inc("recognizer_patterns_total", labels=(("pattern", "NONE"),))
         return None
 
-    def _is_constant_bound(self, bound_expr) -> bool:
-        """Проверяет, является ли выражение константой"""
-        if isinstance(bound_expr, int):
-            return True
-        if isinstance(bound_expr, str):
-            try:
-                int(bound_expr)
-                return True
-            except ValueError:
-                return False
-
-        if hasattr(bound_expr, 'is_number') and bound_expr.is_number:
-            return True
-        if hasattr(bound_expr, 'is_symbol') and bound_expr.is_symbol:
-            return True
-        return False
+    def checker_timings(self) -> Dict[PatternType, dict]:
+        """Число вызовов, совпадений и время каждой проверки паттерна"""
+        timings = {}
+        for pattern_type, (calls, matches, total_ns) in self._checker_stats.items():
+            timings[pattern_type] = {
+                'calls': calls,
+                'matches': matches,
+                'total_ms': total_ns / 1_000_000,
+                'mean_us': total_ns / calls / 1000 if calls else 0.0,
+            }
+        return timings
+
+    def cache_info(self):
+        """Статистика кэша распознавания: hits, misses, maxsize, currsize"""
+        return self.cache.info()
 
     def _is_variable_reference(self, bound_expr, var_name: str) -> bool:
         """Проверяет, является ли выражение ссылкой на переменную"""
@@ -56,10 +213,7 @@ class PatternRecognizer:
 
     def _has_variable_dependency(self, bound_expr, var_name: str) -> bool:
         """Проверяет, зависит ли выражение от данной переменной"""
-        if hasattr(bound_expr, 'free_symbols'):
-            var_symbols = {sym.name for sym in bound_expr.free_symbols}
-            return var_name in var_symbols
-        return False
+        return var_name in symbol_names(bound_expr)
 
     def _is_diagonal_pattern(self, bound_expr) -> bool:
         """Проверяет паттерн диагональной итерации (сумма размерностей минус 1)"""
@@ -69,6 +223,66 @@ class PatternRecognizer:
             return '+' in str_expr and '-' in str_expr and '1' in str_expr
         return False
 
+    def _max_min_args(self, bound_expr, func_name: str) -> Optional[list]:
+        """Аргументы Max/Min в аффинной форме или None"""
+        if not self._contains_max_min(bound_expr) or bound_expr.func.__name__ != func_name:
+            return None
+        args = [as_affine(arg) for arg in bound_expr.args]
+        if len(args) != 2 or any(arg is None for arg in args):
+            return None
+        return args
+
+    def _clamped_window(self, bound: LoopBound, outer_var: str) -> Optional[tuple]:
+        """Разбирает границы вида Max(floor, v - lower) .. Min(cap, v + upper).
+
+        Возвращает (floor, lower, cap, upper), где ни одно выражение не зависит
+        от внешней переменной v; такие границы получаются из
+        max(0, i - k) / min(n, i + k + 1), в том числе через промежуточные
+        переменные, разрешенные find_variable_assignments.
+        """
+        start_args = self._max_min_args(bound.start, 'Max')
+        end_args = self._max_min_args(bound.end, 'Min')
+        if start_args is None or end_args is None:
+            return None
+
+        outer = AffineExpr.symbol(outer_var)
+        window = []
+        for args, sign in ((start_args, -1), (end_args, 1)):
+            moving = [arg for arg in args if self._has_variable_dependency(arg, outer_var)]
+            fixed = [arg for arg in args if not self._has_variable_dependency(arg, outer_var)]
+            if len(moving) != 1 or len(fixed) != 1 or moving[0].coeff(outer_var) != 1:
+                return None
+            # смещение относительно v: v - lower для Max и v + upper для Min
+            offset = (moving[0] - outer) * sign
+            window.extend([fixed[0], offset])
+        return tuple(window)
+
+    def _skew_window(self, loop_structure: LoopStructure) -> Optional[tuple]:
+        """Для гнезда "for v = 0..; for j = max(0, v - p) .. min(cap, v + q + 1)" возвращает (p, q, cap)"""
+        if loop_structure.nesting_depth != 2:
+            return None
+        bound1, bound2 = loop_structure.bounds[0], loop_structure.bounds[1]
+        if bound1.start != 0 or bound1.step != 1 or bound2.step != 1:
+            return None
+
+        window = self._clamped_window(bound2, bound1.variable)
+        if window is None:
+            return None
+        floor, lower, cap, upper = window
+        if floor != 0:
+            return None
+        return lower, upper - 1, cap
+
+    def _band_window(self, loop_structure: LoopStructure) -> Optional[tuple]:
+        """Симметричное окно "max(0, v - k) .. min(cap, v + k + 1)": возвращает (k, cap)"""
+        window = self._skew_window(loop_structure)
+        if window is None:
+            return None
+        lower, upper, cap = window
+        if upper != lower:
+            return None
+        return lower, cap
+
     def _check_lower_triangle(self, loop_structure: LoopStructure) -> bool:
         """Проверяет паттерн 1: нижний треугольник (for i in range(n); for j in range(i))"""
         if loop_structure.nesting_depth != 2:
@@ -76,12 +290,16 @@ class PatternRecognizer:
 
         bound1, bound2 = loop_structure.bounds[0], loop_structure.bounds[1]
 
+        # формула n(n-1)/2 выведена для единичных шагов
+        if bound1.step != 1 or bound2.step != 1:
+            return False
+
         # Первый цикл: for i = 0 to n-1
-        if not self._is_constant_bound(bound1.start):
+        if bound1.start != 0:
             return False
 
         # Второй цикл: for j = 0 to i-1 (зависит от i)
-        if not self._is_constant_bound(bound2.start):
+        if bound2.start != 0:
             return False
 
         # Проверяем, что верхняя граница второго цикла точно равна переменной первого
@@ -94,8 +312,12 @@ class PatternRecognizer:
 
         bound1, bound2 = loop_structure.bounds[0], loop_structure.bounds[1]
 
+        # формула n(n+1)/2 выведена для единичных шагов
+        if bound1.step != 1 or bound2.step != 1:
+            return False
+
         # Первый цикл: for i = 0 to n-1
-        if not self._is_constant_bound(bound1.start):
+        if bound1.start != 0:
             return False
 
         # Второй цикл: for j = i to n-1 (начинается с i)
@@ -103,7 +325,48 @@ class PatternRecognizer:
             return False
 
         # Верхняя граница должна совпадать с первым циклом
-        return str(bound1.end) == str(bound2.end)
+        return bound1.end == bound2.end
+
+    def _check_trapezoid(self, loop_structure: LoopStructure) -> bool:
+        """Проверяет паттерн 3: трапеция (for t < T; for i = max(0, t-k) .. min(n, t+k+1)), T отлично от n"""
+        band = self._band_window(loop_structure)
+        if band is None:
+            return False
+        _, cap = band
+        return cap != loop_structure.bounds[0].end
+
+    def _check_diagonal(self, loop_structure: LoopStructure) -> bool:
+        """Проверяет паттерн 4: обход по диагоналям (for d < n+m-1; for i = max(0, d-m+1) .. min(d+1, n))"""
+        if loop_structure.nesting_depth != 2:
+            return False
+        bound1, bound2 = loop_structure.bounds[0], loop_structure.bounds[1]
+        if bound1.start != 0 or bound1.step != 1 or bound2.step != 1:
+            return False
+
+        window = self._clamped_window(bound2, bound1.variable)
+        if window is None:
+            return False
+        floor, lower, cap, upper = window
+        if floor != 0 or upper != 1:
+            return False
+        # lower = m - 1, внешняя граница n + m - 1 = cap + lower
+        return as_affine(bound1.end) == cap + lower
+
+    def _check_parallelogram(self, loop_structure: LoopStructure) -> bool:
+        """Проверяет паттерн 5: параллелограмм - полоса со сдвигом (for i < n; for j = max(0, i-p) .. min(n, i+q+1)), p != q"""
+        window = self._skew_window(loop_structure)
+        if window is None:
+            return False
+        lower, upper, cap = window
+        return cap == loop_structure.bounds[0].end and upper != lower
+
+    def _check_band_matrix(self, loop_structure: LoopStructure) -> bool:
+        """Проверяет паттерн 6: ленточная матрица - симметричная полоса (for i < n; for j = max(0, i-b) .. min(n, i+b+1))"""
+        band = self._band_window(loop_structure)
+        if band is None:
+            return False
+        _, cap = band
+        return cap == loop_structure.bounds[0].end
 
     def _extract_parameters(self, loop_structure: LoopStructure, pattern_type: PatternType):
         """Извлекает параметры для формул в зависимости от типа паттерна"""
@@ -114,4 +377,29 @@ class PatternRecognizer:
 
         if pattern_type in [PatternType.LOWER_TRIANGLE, PatternType.UPPER_TRIANGLE]:
             # Параметр: n
-            loop_structure.parameters['n'] = bounds[0].end
\ No newline at end of file
+            loop_structure.parameters['n'] = bounds[0].end
+
+        elif pattern_type == PatternType.DIAGONAL:
+            # Параметры: n, m
+            _, lower, cap, _ = self._clamped_window(bounds[1], bounds[0].variable)
+            loop_structure.parameters['n'] = cap
+            loop_structure.parameters['m'] = lower + 1
+
+        elif pattern_type == PatternType.PARALLELOGRAM:
+            # Параметры: n и ширины полосы ниже (p) и выше (q) диагонали
+            lower, upper, cap = self._skew_window(loop_structure)
+            loop_structure.parameters['n'] = cap
+            loop_structure.parameters['p'] = lower
+            loop_structure.parameters['q'] = upper
+
+        elif pattern_type in [PatternType.TRAPEZOID, PatternType.BAND_MATRIX]:
+            radius, cap = self._band_window(loop_structure)
+            loop_structure.parameters['n'] = cap
+            if pattern_type == PatternType.BAND_MATRIX:
+                # Параметры: n, b
+                loop_structure.parameters['b'] = radius
+            else:
+                # Параметры: n, k (и число шагов T для трапеции)
+                loop_structure.parameters['k'] = radius
+                if pattern_type == PatternType.TRAPEZOID:
+                    loop_structure.parameters['T'] = bounds[0].end
\ No newline at end of file
@@ -1,58 +1,46 @@
 import numpy as np
-import sympy as sp
-from typing import List, Tuple, Dict, Union
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, List, Sequence, Tuple, Dict, Union
 from .loop import LoopStructure, LoopBound, LoopCondition
+from .affine import AffineExpr, as_affine, is_sympy_expr, symbol_names
+from ..utils.lru import LRUCache
 import re
 
+if TYPE_CHECKING:
+    import sympy as sp
+
+ISL_TEMPLATE_CACHE_SIZE = 4096
+
 
 def loop_structure_to_polyhedron(loop_structure: LoopStructure) -> Tuple[np.ndarray, np.ndarray]:
     if not loop_structure.bounds:
         raise ValueError("LoopStructure must have at least one bound")
     
-    constraints = []
-    bounds_vector = []
-
     num_vars = len(loop_structure.bounds)
+    linear_conditions = [condition for condition in loop_structure.conditions or []
+                         if condition.is_linear and condition.coefficients]
+
+    # строки 2i и 2i + 1 - нижняя и верхняя границы переменной i, затем условия
+    A = np.zeros((2 * num_vars + len(linear_conditions), num_vars))
+    b = np.zeros(A.shape[0])
+    indices = np.arange(num_vars)
+    A[2 * indices, indices] = -1
+    A[2 * indices + 1, indices] = 1
 
     for i, bound in enumerate(loop_structure.bounds):
-        start_val = _convert_to_numeric(bound.start)
-        end_val = _convert_to_numeric(bound.end)
-        step_val = _convert_to_numeric(bound.step)
-
-        lower_constraint = np.zeros(num_vars)
-        lower_constraint[i] = -1
-        constraints.append(lower_constraint)
-        bounds_vector.append(-start_val)
-
-        upper_constraint = np.zeros(num_vars)
-        upper_constraint[i] = 1
-        constraints.append(upper_constraint)
-        bounds_vector.append(end_val - 1)
-
-    if loop_structure.conditions:
-        for condition in loop_structure.conditions:
-            if condition.is_linear and condition.coefficients:
-                constraint = np.zeros(num_vars)
-                constant_term = 0
-                
-                for var_name, coeff in condition.coefficients.items():
-                    var_index = _find_variable_index(var_name, loop_structure.bounds)
-                    if var_index is not None:
-                        constraint[var_index] = coeff
-                    else:
-                        constant_term += coeff
-                
-                constraints.append(constraint)
-                bounds_vector.append(-constant_term)
-    
-    if not constraints:
-        A = np.eye(num_vars) 
-        b = np.ones(num_vars)
-        return A, b
-    
-    A = np.array(constraints)
-    b = np.array(bounds_vector)
-    
+        b[2 * i] = -_convert_to_numeric(bound.start)
+        b[2 * i + 1] = _convert_to_numeric(bound.end) - 1
+
+    for row, condition in enumerate(linear_conditions, start=2 * num_vars):
+        constant_term = 0
+        for var_name, coeff in condition.coefficients.items():
+            var_index = _find_variable_index(var_name, loop_structure.bounds)
+            if var_index is not None:
+                A[row, var_index] = coeff
+            else:
+                constant_term += coeff
+        b[row] = -constant_term
+
     return A, b
 
 
@@ -69,53 +57,46 @@ def polyhedron_to_isl_string(A: np.ndarray, b: np.ndarray, variable_names: List[
         raise ValueError(f"Number of variable names ({len(variable_names)}) must match number of variables ({num_vars})")
 
     var_list = ", ".join(variable_names)
-    constraints_list = []
-    
-    for i in range(num_constraints):
-        constraint_terms = []
-        
-        for j in range(num_vars):
-            coeff = A[i, j]
-            if coeff == 0:
-                continue
-            elif coeff == 1:
-                constraint_terms.append(variable_names[j])
-            elif coeff == -1:
-                constraint_terms.append(f"-{variable_names[j]}")
-            else:
-                if coeff > 0:
-                    constraint_terms.append(f"{coeff}*{variable_names[j]}")
-                else:
-                    constraint_terms.append(f"{coeff}*{variable_names[j]}")
-        
-        if not constraint_terms:
-            continue
-
-        constraint_str = ""
-        for k, term in enumerate(constraint_terms):
-            if k == 0:
-                constraint_str = term
-            else:
-                if term.startswith("-"):
-                    constraint_str += f" {term}"
-                else:
-                    constraint_str += f" + {term}"
-
-        bound_val = b[i]
-        if bound_val == int(bound_val):
-            bound_val = int(bound_val)
-        
-        constraint_str += f" <= {bound_val}"
-        constraints_list.append(constraint_str)
-    
-    if not constraints_list:
+    left_sides = _row_terms(A, np.asarray(variable_names, dtype=object))
+    nonempty = left_sides != ''
+    if not nonempty.any():
         return f"{{[{var_list}]}}"
 
+    # целые значения правой части печатаются без ".0"
+    b = np.asarray(b)
+    is_whole = b == np.floor(b)
+    right_sides = np.where(is_whole, np.where(is_whole, b, 0).astype(np.int64).astype(str), b.astype(str))
+    constraints_list = left_sides[nonempty] + " <= " + right_sides[nonempty].astype(object)
+
     constraints_combined = " and ".join(constraints_list)
     
     return f"{{[{var_list}]: {constraints_combined}}}"
 
 
+def _row_terms(coefficients: np.ndarray, names: np.ndarray) -> np.ndarray:
+    """Левые части ограничений: для каждой строки сумма ее ненулевых членов ('' для нулевой строки).
+
+    names - имена столбцов (одномерный массив) или имя для каждого элемента матрицы.
+    Члены форматируются и склеиваются по строкам без циклов Python.
+    """
+    result = np.full(coefficients.shape[0], '', dtype=object)
+    rows, cols = np.nonzero(coefficients)
+    if rows.size == 0:
+        return result
+
+    values = coefficients[rows, cols]
+    entry_names = names[rows, cols] if names.ndim == 2 else names[cols]
+    prefixes = np.where(values == 1, '', np.where(values == -1, '-', np.char.add(values.astype(str), '*')))
+    first = np.ones(rows.size, dtype=bool)
+    first[1:] = rows[1:] != rows[:-1]
+    separators = np.where(first, '', np.where(values < 0, ' ', ' + '))
+
+    terms = separators.astype(object) + prefixes.astype(object) + entry_names.astype(object)
+    starts = np.flatnonzero(first)
+    result[rows[starts]] = np.add.reduceat(terms, starts)
+    return result
+
+
 def loop_structure_to_isl_string(loop_structure: LoopStructure) -> str:
     variable_names = []
     for bound in loop_structure.bounds:
@@ -130,6 +111,306 @@ def loop_structure_to_isl_string(loop_structure: LoopStructure) -> str:
         A, b = loop_structure_to_polyhedron(loop_structure)
         return polyhedron_to_isl_string(A, b, variable_names)
 
+def _nest_names(loop_structure: LoopStructure, variable_names: List[str]) -> set:
+    """Имена, занятые в гнезде: переменные циклов и символы границ"""
+    names = set(variable_names)
+    for bound in loop_structure.bounds:
+        for expr in (bound.start, bound.end, bound.step):
+            names.update(symbol_names(expr))
+    return names
+
+
+def _existential_name(level: int, used: set) -> str:
+    """Имя вспомогательной переменной шага уровня level (q0, ...), не совпадающее с именами гнезда"""
+    name = f"q{level}"
+    while name in used:
+        name = "_" + name
+    used.add(name)
+    return name
+
+
+def loop_structure_to_parametric_isl_string(loop_structure: LoopStructure) -> str:
+    """Строит параметрическое множество [n, ...] -> {[i, ...]: ...} без подстановки параметров"""
+    variable_names = []
+    for bound in loop_structure.bounds:
+        if bound.variable:
+            variable_names.append(bound.variable)
+        else:
+            variable_names.append(f"x{len(variable_names)}")
+
+    constraints = []
+    parameters = set()
+    used_names = _nest_names(loop_structure, variable_names)
+
+    for i, bound in enumerate(loop_structure.bounds):
+        var_name = variable_names[i]
+        step = _to_isl_affine(bound.step, parameters, variable_names)
+        if not step.lstrip('-').isdigit() or int(step) == 0:
+            raise ValueError(f"Unsupported step for parametric set: {bound.step}")
+        step = int(step)
+
+        # при положительном шаге Max в начале и Min в конце дают пересечение ограничений
+        lower_func, upper_func = ('Max', 'Min') if step > 0 else ('Min', 'Max')
+        starts = [_to_isl_affine(arg, parameters, variable_names) for arg in _bound_args(bound.start, lower_func)]
+        ends = [_to_isl_affine(arg, parameters, variable_names) for arg in _bound_args(bound.end, upper_func)]
+
+        if step > 0:
+            constraints.extend(f"{var_name} >= {start}" for start in starts)
+            constraints.extend(f"{var_name} < {end}" for end in ends)
+        else:
+            constraints.extend(f"{var_name} <= {start}" for start in starts)
+            constraints.extend(f"{var_name} > {end}" for end in ends)
+
+        if abs(step) != 1:
+            if len(starts) != 1:
+                raise ValueError(f"Unsupported strided loop with compound start: {bound.start}")
+            sign = "+" if step > 0 else "-"
+            existential = _existential_name(i, used_names)
+            constraints.append(f"exists ({existential}: {var_name} = {starts[0]} {sign} {abs(step)}{existential})")
+
+    var_list = ", ".join(variable_names)
+    body = f"{{[{var_list}]: {' and '.join(constraints)}}}" if constraints else f"{{[{var_list}]}}"
+    if parameters:
+        return f"[{', '.join(sorted(parameters))}] -> {body}"
+    return body
+
+class IslTemplate:
+    """Параметрическое множество гнезда, заготовленное для подстановки значений.
+
+    parametric - запись [n, ...] -> {...}; bind() подставляет значения в
+    шаблон тела, где каждый параметр заменен на "({имя})", и дает то же
+    множество, что и параметрическая запись для этих значений.
+    """
+    def __init__(self, parametric: str):
+        self.parametric = parametric
+        self.parameters: List[str] = []
+        body = parametric
+        if parametric.startswith('['):
+            header, body = parametric.split(' -> ', 1)
+            self.parameters = [name.strip() for name in header[1:-1].split(',')]
+        body = body.replace('{', '{{').replace('}', '}}')
+        if self.parameters:
+            pattern = re.compile(r'\b(' + '|'.join(map(re.escape, self.parameters)) + r')\b')
+            body = pattern.sub(lambda match: f"({{{match.group(1)}}})", body)
+        self._body = body
+
+    def bind(self, concrete_params: Dict[str, int]) -> str:
+        """Множество без параметров для конкретных значений; KeyError, если значения не хватает"""
+        return self._body.format(**{name: int(concrete_params[name]) for name in self.parameters})
+
+    def __repr__(self):
+        return f"IslTemplate({self.parametric})"
+
+
+_NO_TEMPLATE = object()
+
+# Шаблоны по ключу структуры; None - для гнезда нет аффинного параметрического вида
+_template_cache = LRUCache(ISL_TEMPLATE_CACHE_SIZE)
+
+
+def parametric_isl_template(loop_structure: LoopStructure) -> Union[IslTemplate, None]:
+    """Шаблон множества гнезда, построенный один раз на структуру циклов.
+
+    None, если границы не аффинны или шаг не постоянен - тогда множество
+    нужно строить по структуре с уже подставленными параметрами.
+    """
+    key = loop_structure.structure_key()
+    template = _template_cache.get(key, _NO_TEMPLATE)
+    if template is _NO_TEMPLATE:
+        try:
+            template = IslTemplate(loop_structure_to_parametric_isl_string(loop_structure))
+        except ValueError:
+            template = None
+        _template_cache.put(key, template)
+    return template
+
+
+def isl_template_cache_info():
+    """Статистика кэша шаблонов: hits, misses, maxsize, currsize"""
+    return _template_cache.info()
+
+
+def clear_isl_template_cache():
+    _template_cache.clear()
+
+
+@dataclass
+class AffineConstraint:
+    """Ограничение sum(coefficients[x] * x) + constant >= 0 (или == 0 для равенства)"""
+    coefficients: Dict[str, int]
+    constant: int
+    is_equality: bool = False
+
+
+@dataclass
+class LoopConstraints:
+    """Ограничения множества итераций гнезда без строкового представления"""
+    variables: List[str] # переменные циклов
+    existentials: List[str] # вспомогательные переменные шага (q0, ... или _q0 при совпадении имен), проецируются
+    parameters: List[str] # символы, не являющиеся переменными циклов
+    constraints: List[AffineConstraint]
+
+
+def _affine_terms(expr, parameters: set, loop_vars: List[str]) -> Tuple[Dict[str, int], int]:
+    if isinstance(expr, np.integer):
+        expr = int(expr)
+    affine_expr = as_affine(expr)
+    if affine_expr is None:
+        raise ValueError(f"Non-affine bound expression: {expr}")
+    if isinstance(affine_expr, int):
+        return {}, affine_expr
+    parameters.update(name for name in affine_expr.symbols if name not in loop_vars)
+    return dict(affine_expr.terms), affine_expr.constant
+
+
+def _difference(a: Tuple[Dict[str, int], int], b: Tuple[Dict[str, int], int], offset: int = 0) -> AffineConstraint:
+    # a - b + offset >= 0
+    coefficients = dict(a[0])
+    for name, coeff in b[0].items():
+        coefficients[name] = coefficients.get(name, 0) - coeff
+    return AffineConstraint({name: coeff for name, coeff in coefficients.items() if coeff}, a[1] - b[1] + offset)
+
+
+def loop_structure_to_constraints(loop_structure: LoopStructure) -> LoopConstraints:
+    """Ограничения того же множества, что и loop_structure_to_parametric_isl_string"""
+    variable_names = [bound.variable or f"x{i}" for i, bound in enumerate(loop_structure.bounds)]
+    parameters = set()
+    existentials = []
+    constraints = []
+    used_names = _nest_names(loop_structure, variable_names)
+
+    for i, bound in enumerate(loop_structure.bounds):
+        var = ({variable_names[i]: 1}, 0)
+        coefficients, step = _affine_terms(bound.step, parameters, variable_names)
+        if coefficients or step == 0:
+            raise ValueError(f"Unsupported step for parametric set: {bound.step}")
+
+        lower_func, upper_func = ('Max', 'Min') if step > 0 else ('Min', 'Max')
+        starts = [_affine_terms(arg, parameters, variable_names) for arg in _bound_args(bound.start, lower_func)]
+        ends = [_affine_terms(arg, parameters, variable_names) for arg in _bound_args(bound.end, upper_func)]
+
+        if step > 0:
+            constraints.extend(_difference(var, start) for start in starts)
+            constraints.extend(_difference(end, var, -1) for end in ends)
+        else:
+            constraints.extend(_difference(start, var) for start in starts)
+            constraints.extend(_difference(var, end, -1) for end in ends)
+
+        if abs(step) != 1:
+            if len(starts) != 1:
+                raise ValueError(f"Unsupported strided loop with compound start: {bound.start}")
+            # var = start + step * q
+            existential = _existential_name(i, used_names)
+            existentials.append(existential)
+            equality = _difference(var, starts[0])
+            equality.coefficients[existential] = -step
+            equality.is_equality = True
+            constraints.append(equality)
+
+    return LoopConstraints(variable_names, existentials, sorted(parameters), constraints)
+
+@dataclass
+class ConstraintBatch:
+    """Ограничения многих гнезд в одном тензоре int64.
+
+    Строки гнезда s - coefficients[offsets[s]:offsets[s + 1]]. Столбцы - переменные
+    циклов, вспомогательные переменные шага и параметры гнезда (names[s], пустые
+    имена в столбцах дополнения), последний столбец - свободный член. Строка
+    задает coefficients[row] . (x, 1) >= 0 или == 0, если equalities[row].
+    """
+    coefficients: np.ndarray # (строки, ширина + 1), int64
+    equalities: np.ndarray # (строки,), bool
+    offsets: np.ndarray # (гнезда + 1,), int64
+    names: np.ndarray # (гнезда, ширина), object
+    dimensions: np.ndarray # (гнезда, 3): число переменных, вспомогательных переменных и параметров
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def rows(self, index: int) -> slice:
+        return slice(int(self.offsets[index]), int(self.offsets[index + 1]))
+
+
+def build_constraint_batch(loop_structures: Sequence[LoopStructure]) -> ConstraintBatch:
+    """Строит ConstraintBatch: тензор выделяется один раз и заполняется одним присваиванием"""
+    systems = [loop_structure_to_constraints(loop_structure) for loop_structure in loop_structures]
+
+    offsets = np.zeros(len(systems) + 1, dtype=np.int64)
+    np.cumsum([len(system.constraints) for system in systems], out=offsets[1:])
+    dimensions = np.array([(len(system.variables), len(system.existentials), len(system.parameters))
+                           for system in systems], dtype=np.int64).reshape(len(systems), 3)
+    width = int(dimensions.sum(axis=1).max()) if systems else 0
+
+    coefficients = np.zeros((int(offsets[-1]), width + 1), dtype=np.int64)
+    equalities = np.zeros(int(offsets[-1]), dtype=bool)
+    names = np.full((len(systems), width), '', dtype=object)
+
+    row_index, column_index, values, constants = [], [], [], []
+    for index, system in enumerate(systems):
+        columns = system.variables + system.existentials + system.parameters
+        names[index, :len(columns)] = columns
+        positions = {name: column for column, name in enumerate(columns)}
+        for row, constraint in enumerate(system.constraints, start=int(offsets[index])):
+            for name, coeff in constraint.coefficients.items():
+                row_index.append(row)
+                column_index.append(positions[name])
+                values.append(coeff)
+            constants.append(constraint.constant)
+            equalities[row] = constraint.is_equality
+
+    coefficients[row_index, column_index] = values
+    coefficients[:, -1] = constants
+    return ConstraintBatch(coefficients, equalities, offsets, names, dimensions)
+
+
+def constraint_batch_to_isl_strings(batch: ConstraintBatch) -> List[str]:
+    """Текст ISL для каждого гнезда пакета, в том же виде, что и loop_structure_to_parametric_isl_string"""
+    row_structures = np.repeat(np.arange(len(batch)), np.diff(batch.offsets))
+    left_sides = _row_terms(batch.coefficients[:, :-1], batch.names[row_structures])
+    left_sides[left_sides == ''] = '0'
+    relations = np.where(batch.equalities, ' = ', ' >= ').astype(object)
+    constraints = left_sides + relations + (-batch.coefficients[:, -1]).astype(str).astype(object)
+
+    result = []
+    for index in range(len(batch)):
+        num_vars, num_existentials, num_params = (int(value) for value in batch.dimensions[index])
+        names = batch.names[index]
+        var_list = ", ".join(names[:num_vars])
+        conjunction = " and ".join(constraints[batch.rows(index)])
+        if not conjunction:
+            body = f"{{[{var_list}]}}"
+        elif num_existentials:
+            existentials = ", ".join(names[num_vars:num_vars + num_existentials])
+            body = f"{{[{var_list}]: exists ({existentials}: {conjunction})}}"
+        else:
+            body = f"{{[{var_list}]: {conjunction}}}"
+        if num_params:
+            params = ", ".join(names[num_vars + num_existentials:num_vars + num_existentials + num_params])
+            body = f"[{params}] -> {body}"
+        result.append(body)
+    return result
+
+def _bound_args(bound_expr, func_name: str) -> list:
+    if isinstance(bound_expr, str) and as_affine(bound_expr) is None:
+        import sympy as sp
+        bound_expr = sp.sympify(bound_expr)
+    if is_sympy_expr(bound_expr) and bound_expr.func.__name__ in ('Max', 'Min'):
+        if bound_expr.func.__name__ != func_name:
+            raise ValueError(f"Bound {bound_expr} does not describe a convex set")
+        return list(bound_expr.args)
+    return [bound_expr]
+
+def _to_isl_affine(expr, parameters: set, loop_vars: List[str]) -> str:
+    if isinstance(expr, np.integer):
+        expr = int(expr)
+    affine_expr = as_affine(expr)
+    if affine_expr is None:
+        raise ValueError(f"Non-affine bound expression: {expr}")
+    if isinstance(affine_expr, AffineExpr):
+        parameters.update(name for name in affine_expr.symbols if name not in loop_vars)
+    # str(AffineExpr) - корректная запись аффинного выражения в ISL
+    return str(affine_expr)
+
 def _loop_structure_to_isl_direct(loop_structure: LoopStructure, variable_names: List[str]) -> str:
     constraints = []
     
@@ -179,10 +460,13 @@ def _convert_bound_to_constraint(bound_expr, var_name: str, op: str, all_vars: L
         else:
             return _convert_expression_to_constraint(bound_expr, var_name, op, all_vars)
     
+    elif isinstance(bound_expr, AffineExpr):
+        return _convert_expression_to_constraint(str(bound_expr), var_name, op, all_vars)
+
     elif hasattr(bound_expr, 'func'):
-        if bound_expr.func == sp.Max:
+        if bound_expr.func.__name__ == 'Max':
             return _convert_sympy_max_to_constraint(bound_expr, var_name, op, all_vars)
-        elif bound_expr.func == sp.Min:
+        elif bound_expr.func.__name__ == 'Min':
             return _convert_sympy_min_to_constraint(bound_expr, var_name, op, all_vars)
         else:
             try:
@@ -374,7 +658,7 @@ def _evaluate_expression_with_context(expr_str: str, all_vars: List[str], curren
     return None
 
 
-def _convert_to_numeric(value: Union[int, str, sp.Symbol]) -> float:
+def _convert_to_numeric(value: Union[int, str, AffineExpr, 'sp.Symbol']) -> float:
     if isinstance(value, (int, float)):
         return float(value)
     elif isinstance(value, str):
@@ -382,7 +666,7 @@ def _convert_to_numeric(value: Union[int, str, sp.Symbol]) -> float:
             return float(value)
         except ValueError:
             return 10.0
-    elif isinstance(value, sp.Symbol):
+    elif isinstance(value, AffineExpr) or getattr(value, 'is_Symbol', False):
         return 10.0
     else:
         return float(value)
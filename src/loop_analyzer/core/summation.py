@@ -0,0 +1,291 @@
+import copy
+import math
+from fractions import Fraction
+from functools import lru_cache
+from typing import Dict, List, Mapping, Optional, Tuple, Union
+
+from loop_analyzer.core.affine import AffineExpr, as_affine
+from loop_analyzer.core.loop import LoopBound, LoopStructure
+from loop_analyzer.core.pattern_recognizer import rename_symbols, structural_fingerprint
+from loop_analyzer.utils.lru import LRUCache
+
+# Точное число итераций аффинного гнезда циклов любой глубины.
+# Число итераций уровня - это длина его диапазона, поэтому количество точек
+# равно вложенной сумме, которая берется изнутри наружу по формулам Фаульхабера:
+#   sum_{t=0}^{c-1} t^p = 1/(p+1) * sum_j C(p+1, j) B_j c^(p+1-j),  B_1 = -1/2
+# Результат - многочлен от параметров с рациональными коэффициентами.
+
+# Многочлен: {моном: коэффициент}, моном - отсортированный кортеж (имя, степень)
+Polynomial = Dict[Tuple[Tuple[str, int], ...], Fraction]
+
+_INDEX_VARIABLE = '$t'
+
+_NOT_CACHED = object()
+
+
+def _constant(value) -> Polynomial:
+    return {(): Fraction(value)} if value else {}
+
+
+def _from_affine(expr) -> Polynomial:
+    if isinstance(expr, int):
+        return _constant(expr)
+    poly = _constant(expr.constant)
+    for name, coeff in expr.terms:
+        poly[((name, 1),)] = Fraction(coeff)
+    return poly
+
+
+def _add(a: Polynomial, b: Polynomial, factor=1) -> Polynomial:
+    result = dict(a)
+    for monomial, coeff in b.items():
+        value = result.get(monomial, 0) + coeff * factor
+        if value:
+            result[monomial] = value
+        else:
+            result.pop(monomial, None)
+    return result
+
+
+def _multiply_monomials(a, b):
+    powers = dict(a)
+    for name, power in b:
+        powers[name] = powers.get(name, 0) + power
+    return tuple(sorted(powers.items()))
+
+
+def _mul(a: Polynomial, b: Polynomial) -> Polynomial:
+    result = {}
+    for monomial_a, coeff_a in a.items():
+        for monomial_b, coeff_b in b.items():
+            monomial = _multiply_monomials(monomial_a, monomial_b)
+            value = result.get(monomial, 0) + coeff_a * coeff_b
+            if value:
+                result[monomial] = value
+            else:
+                result.pop(monomial, None)
+    return result
+
+
+def _power(a: Polynomial, exponent: int) -> Polynomial:
+    result = _constant(1)
+    for _ in range(exponent):
+        result = _mul(result, a)
+    return result
+
+
+def _split(poly: Polynomial, name: str) -> Dict[int, Polynomial]:
+    """Группирует многочлен по степеням переменной name"""
+    groups = {}
+    for monomial, coeff in poly.items():
+        power = 0
+        rest = []
+        for term_name, term_power in monomial:
+            if term_name == name:
+                power = term_power
+            else:
+                rest.append((term_name, term_power))
+        groups.setdefault(power, {})[tuple(rest)] = coeff
+    return groups
+
+
+def _substitute(poly: Polynomial, name: str, value: Polynomial) -> Polynomial:
+    result = {}
+    for power, coeff_poly in _split(poly, name).items():
+        result = _add(result, _mul(coeff_poly, _power(value, power)))
+    return result
+
+
+@lru_cache(maxsize=None)
+def _bernoulli(index: int) -> Fraction:
+    # B_1 = -1/2, при таком выборе формула дает сумму по t от 0 до c-1
+    if index == 0:
+        return Fraction(1)
+    return -sum(math.comb(index + 1, j) * _bernoulli(j) for j in range(index)) / (index + 1)
+
+
+@lru_cache(maxsize=None)
+def _faulhaber(power: int) -> Tuple[Tuple[int, Fraction], ...]:
+    """Коэффициенты sum_{t=0}^{c-1} t^power как многочлена от c: ((степень c, коэффициент), ...)"""
+    return tuple((power + 1 - j, math.comb(power + 1, j) * _bernoulli(j) / (power + 1))
+                 for j in range(power + 1) if _bernoulli(j))
+
+
+def _sum_over_index(poly: Polynomial, count: Polynomial) -> Polynomial:
+    """sum_{t=0}^{count-1} poly(t)"""
+    result = {}
+    for power, coeff_poly in _split(poly, _INDEX_VARIABLE).items():
+        power_sum = {}
+        for count_power, coeff in _faulhaber(power):
+            power_sum = _add(power_sum, _power(count, count_power), coeff)
+        result = _add(result, _mul(coeff_poly, power_sum))
+    return result
+
+
+def _evaluate_affine(expr, values: Mapping[str, int]) -> int:
+    return expr if isinstance(expr, int) else expr.evaluate(values)
+
+
+# Таблица Горнера: многочлен от параметров p0, p1, ... хранится как кортеж
+# коэффициентов по степеням p0 (от нулевой), каждый коэффициент - такая же
+# таблица от p1, ...; после последнего параметра остается целое число.
+HornerTable = Union[int, Tuple['HornerTable', ...]]
+
+
+def _horner_table(poly: Dict[Tuple[Tuple[str, int], ...], int], names: List[str]) -> HornerTable:
+    if not names:
+        return poly.get((), 0)
+    groups = _split(poly, names[0])
+    degree = max(groups, default=0)
+    return tuple(_horner_table(groups.get(power, {}), names[1:]) for power in range(degree + 1))
+
+
+def _horner(table: HornerTable, values: List[int], position: int) -> int:
+    if isinstance(table, int):
+        return table
+    value = values[position]
+    result = 0
+    for coeff in reversed(table):
+        result = result * value + _horner(coeff, values, position + 1)
+    return result
+
+
+class SummationFormula:
+    """Число точек гнезда как многочлен от параметров, вычисляемый по схеме Горнера над int.
+
+    Многочлен совпадает с числом итераций, пока диапазоны всех уровней
+    неотрицательной длины; это проверяется при вычислении по вершинам
+    области (каждая переменная в начале или в конце своего диапазона).
+    """
+    def __init__(self, parameters: List[str], polynomial: Polynomial, levels: list):
+        self.parameters = list(parameters)
+        self.polynomial = polynomial
+        self._names = list(parameters)
+        # (переменная, начало, шаг, число итераций) - для проверки области
+        self._levels = levels
+
+        self.denominator = 1
+        for coeff in polynomial.values():
+            self.denominator = self.denominator * coeff.denominator // math.gcd(self.denominator, coeff.denominator)
+        scaled = {monomial: int(coeff * self.denominator) for monomial, coeff in polynomial.items()}
+        self._table = _horner_table(scaled, self._names)
+
+    def bind(self, names: List[str]) -> 'SummationFormula':
+        """Та же формула с другими внешними именами параметров (в порядке self.parameters)"""
+        bound = copy.copy(self)
+        bound.parameters = list(names)
+        return bound
+
+    def evaluate(self, params: Mapping[str, int]) -> int:
+        values = [int(params[name]) for name in self.parameters]
+        if not self._ranges_nonnegative(dict(zip(self._names, values)), 0):
+            raise ValueError(f"Loop range with negative length for {params}")
+        return _horner(self._table, values, 0) // self.denominator
+
+    def __call__(self, params: Mapping[str, int]) -> int:
+        return self.evaluate(params)
+
+    def _ranges_nonnegative(self, values: Dict[str, int], level: int) -> bool:
+        # длины аффинны, поэтому минимум достигается в вершинах области
+        if level == len(self._levels):
+            return True
+        variable, start, step, count = self._levels[level]
+        iterations = _evaluate_affine(count, values)
+        if iterations < 0:
+            return False
+        if iterations == 0:
+            return True
+        first = _evaluate_affine(start, values)
+        for value in {first, first + step * (iterations - 1)}:
+            values[variable] = value
+            if not self._ranges_nonnegative(values, level + 1):
+                return False
+        return True
+
+    def __str__(self):
+        renaming = dict(zip(self._names, self.parameters))
+        terms = []
+        for monomial, coeff in sorted(self.polynomial.items(), reverse=True):
+            factors = [f"{renaming[name]}^{power}" if power > 1 else renaming[name] for name, power in monomial]
+            if coeff != 1 or not factors:
+                factors.insert(0, str(coeff))
+            terms.append('*'.join(factors))
+        return ' + '.join(terms) or '0'
+
+    def __repr__(self):
+        return f"SummationFormula({self})"
+
+
+def build_summation(loop_structure: LoopStructure) -> Optional[SummationFormula]:
+    """Строит многочлен числа итераций; None, если гнездо не аффинное.
+
+    Поддерживаются аффинные границы с шагом ±1 и постоянный шаг, если длина
+    диапазона уровня - константа (иначе число итераций - квазиполином).
+    """
+    variables = [bound.variable for bound in loop_structure.bounds]
+    if len(set(variables)) != len(variables):
+        return None
+
+    levels = []
+    for bound in loop_structure.bounds:
+        start, end, step = as_affine(bound.start), as_affine(bound.end), as_affine(bound.step)
+        if start is None or end is None or not isinstance(step, int) or step == 0:
+            return None
+        # диапазон: start <= v < end при step > 0 и end < v <= start при step < 0
+        length = end - start if step > 0 else start - end
+        if abs(step) == 1:
+            count = length
+        elif isinstance(length, int):
+            count = max(0, -(-length // abs(step)))
+        else:
+            return None
+        levels.append((bound.variable, start, step, count))
+
+    # суммируем изнутри наружу, подставляя v = start + step * t, t = 0 .. count-1
+    polynomial = _constant(1)
+    for variable, start, step, count in reversed(levels):
+        index = _add(_from_affine(start), {((_INDEX_VARIABLE, 1),): Fraction(step)})
+        polynomial = _substitute(polynomial, variable, index)
+        polynomial = _sum_over_index(polynomial, _from_affine(count))
+
+    parameters = sorted({name for monomial in polynomial for name, _ in monomial})
+    for _, start, _, count in levels:
+        for expr in (start, count):
+            if isinstance(expr, AffineExpr):
+                parameters.extend(name for name in expr.symbols
+                                  if name not in variables and name not in parameters)
+    return SummationFormula(parameters, polynomial, levels)
+
+
+class SummationEngine:
+    """Строит формулы суммирования с кэшем по структурному отпечатку гнезда"""
+    def __init__(self, cache_size: int = 4096):
+        self.cache = LRUCache(cache_size)
+
+    def formula(self, loop_structure: LoopStructure) -> Optional[SummationFormula]:
+        fingerprint = structural_fingerprint(loop_structure)
+        if fingerprint is None:
+            return build_summation(loop_structure)
+
+        key, renaming = fingerprint
+        canonical = self.cache.get(key, _NOT_CACHED)
+        if canonical is _NOT_CACHED:
+            canonical = build_summation(_renamed(loop_structure, renaming))
+            self.cache.put(key, canonical)
+        if canonical is None:
+            return None
+
+        inverse = {canonical_name: name for name, canonical_name in renaming.items()}
+        return canonical.bind([inverse.get(name, name) for name in canonical.parameters])
+
+    def cache_info(self):
+        return self.cache.info()
+
+
+def _renamed(loop_structure: LoopStructure, renaming: Dict[str, str]) -> LoopStructure:
+    bounds = [LoopBound(start=rename_symbols(bound.start, renaming),
+                        end=rename_symbols(bound.end, renaming),
+                        step=rename_symbols(bound.step, renaming),
+                        variable=renaming[bound.variable])
+              for bound in loop_structure.bounds]
+    return LoopStructure(bounds=bounds, nesting_depth=loop_structure.nesting_depth)
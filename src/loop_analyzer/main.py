@@ -0,0 +1,153 @@
+import argparse
+import json
+import os
+import sys
+from typing import Dict, Iterator, List, Optional
+
+# Модули стадий импортируются внутри analyze(): без --params не загружаются
+# подсчет и numpy, с --extract-only - распознавание. Извлечение всегда загружает
+# clang, а sympy - для границ с max/min, в том числе с --extract-only.
+
+
+def _parse_params(values: List[str]) -> Dict[str, int]:
+    """Разбирает значения --params вида "n=100,k=3" (флаг можно повторять)"""
+    params = {}
+    for value in values:
+        for item in value.split(','):
+            item = item.strip()
+            if not item:
+                continue
+            name, sep, number = item.partition('=')
+            if not sep or not name.strip():
+                raise argparse.ArgumentTypeError(f"Invalid parameter {item!r}, expected name=value")
+            try:
+                params[name.strip()] = int(number)
+            except ValueError:
+                raise argparse.ArgumentTypeError(f"Parameter {name.strip()} must be an integer, got {number!r}")
+    return params
+
+
+def _bound_record(bound) -> dict:
+    return {"variable": bound.variable, "start": str(bound.start), "end": str(bound.end), "step": str(bound.step)}
+
+
+def analyze(paths: List[str], jobs: int = 1, cache_dir: Optional[str] = None, backend: str = "iscc",
+            params: Optional[Dict[str, int]] = None, recognize: bool = True) -> Iterator[dict]:
+    """Выдает по записи на каждое гнездо циклов по мере готовности.
+
+    Запись содержит файл, номер гнезда в файле, границы, паттерн (если
+    recognize) и, если заданы params, число точек с уровнем подсчета.
+    """
+    from loop_analyzer.core.loop_extractor import CppLoopExtractor
+    extractor = CppLoopExtractor(cache_dir=cache_dir)
+
+    recognizer = None
+    if recognize:
+        from loop_analyzer.core.pattern_recognizer import PatternRecognizer
+        recognizer = PatternRecognizer()
+
+    counter = None
+    if params is not None:
+        from loop_analyzer.core.counter import LatticeCounter
+        from loop_analyzer.wrappers.backends import get_backend
+        counter = LatticeCounter(backend=get_backend(backend))
+
+    for path in paths:
+        indices = {}
+        for filepath, loop_structure in extractor.iter_loops(path, jobs=jobs):
+            index = indices[filepath] = indices.get(filepath, -1) + 1
+            record = {
+                "file": filepath,
+                "index": index,
+                "depth": loop_structure.nesting_depth,
+                "bounds": [_bound_record(bound) for bound in loop_structure.bounds],
+            }
+
+            if recognizer is not None:
+                pattern = recognizer.recognize_pattern(loop_structure)
+                record["pattern"] = pattern.name if pattern is not None else None
+                if pattern is not None:
+                    record["parameters"] = {name: str(value) for name, value in loop_structure.parameters.items()}
+
+            if counter is not None:
+                try:
+                    result = counter.count(loop_structure, params)
+                    record.update(count=result.value, tier=result.tier, elapsed_ms=result.elapsed_ms)
+                except RuntimeError as e:
+                    record.update(count=None, error=str(e))
+            yield record
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="loop_analyzer",
+        description="Извлекает гнезда циклов из C/C++, распознает паттерны и считает итерации; "
+                    "результаты выводятся в формате JSON Lines по мере готовности, "
+                    "ошибки разбора файлов - в stderr")
+    parser.add_argument("paths", nargs="+", help="файлы или директории с исходниками")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="число процессов извлечения")
+    parser.add_argument("--cache-dir", help="директория дискового кэша извлеченных циклов")
+    parser.add_argument("--backend", choices=("iscc", "islpy"), default="iscc",
+                        help="бэкенд точного подсчета для гнезд без формулы")
+    parser.add_argument("--params", action="append", metavar="NAME=VALUE[,...]",
+                        help="значения параметров для подсчета точек, например n=1000,k=3")
+    parser.add_argument("--extract-only", action="store_true", help="только извлечение, без распознавания")
+    parser.add_argument("--output", "-o", help="файл для записей (по умолчанию stdout)")
+    parser.add_argument("--metrics", action="store_true",
+                        help="собрать метрики и вывести их в stderr в формате Prometheus")
+    args = parser.parse_args(argv)
+
+    if args.jobs < 1:
+        parser.error("--jobs must be positive")
+    missing = [path for path in args.paths if not os.path.exists(path)]
+    if missing:
+        parser.error("path not found: " + ", ".join(missing))
+    try:
+        params = _parse_params(args.params) if args.params else None
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    if params is not None and args.extract_only:
+        parser.error("--params requires pattern recognition, drop --extract-only")
+
+    if args.metrics:
+        from loop_analyzer.utils import instrumentation
+        instrumentation.enable()
+
+    # записи пишутся во временный файл рядом с --output, который заменяет его
+    # только после успешного анализа: при ошибке прежнее содержимое остается
+    output = sys.stdout
+    if args.output:
+        directory, name = os.path.split(os.path.abspath(args.output))
+        try:
+            output = open(os.path.join(directory, f".{name}.{os.getpid()}.tmp"), 'w')
+        except OSError as e:
+            parser.error(f"cannot write --output: {e}")
+    succeeded = False
+    try:
+        records = analyze(args.paths, jobs=args.jobs, cache_dir=args.cache_dir, backend=args.backend,
+                          params=params, recognize=not args.extract_only)
+        for record in records:
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+        succeeded = True
+    except (KeyError, ValueError) as e:
+        # недостающие или неподходящие --params - ошибка использования, а не сбой
+        parser.error(f"Missing parameter {e.args[0]}" if isinstance(e, KeyError) else str(e))
+    except RuntimeError as e:
+        print(f"loop_analyzer: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+            if succeeded:
+                os.replace(output.name, args.output)
+            else:
+                os.unlink(output.name)
+
+    if args.metrics:
+        sys.stderr.write(instrumentation.to_prometheus())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
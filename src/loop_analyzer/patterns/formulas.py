@@ -1,35 +1,160 @@
+import functools
 import math
-from typing import Union, Optional
+from typing import TYPE_CHECKING, Union, Optional
 from enum import Enum
-import sympy as sp
+import numpy as np
+
+if TYPE_CHECKING:
+    import sympy as sp
+
+
+# Все формулы - многочлены степени 2 с коэффициентами не больше 2, поэтому
+# при |аргумент| <= 2**30 результат гарантированно помещается в int64
+INT64_SAFE_LIMIT = 2 ** 30
+
+_INT64_MAX = np.iinfo(np.int64).max
+
+
+def _normalize(value):
+    """Целые sympy и скаляры NumPy - в int Python, последовательности - в массивы int64 или object"""
+    if isinstance(value, int) or value is None:
+        return value
+    if isinstance(value, np.integer):
+        return int(value)
+    if getattr(value, 'is_Integer', False):
+        return int(value)
+    if isinstance(value, (list, tuple)):
+        value = np.asarray(value)
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind == 'u' and value.size and value.max() > _INT64_MAX:
+            return value.astype(object)
+        if value.dtype.kind in 'iu':
+            return value.astype(np.int64, copy=False)
+    return value
+
+
+def _exact(formula):
+    """Точное вычисление формулы для int, целых sympy и NumPy и целочисленных массивов.
+
+    Массивы считаются в int64; строки, где аргумент больше INT64_SAFE_LIMIT
+    и возможно переполнение, пересчитываются в целых числах Python, и тогда
+    результат имеет dtype=object. Символьные аргументы передаются как есть.
+    """
+    @functools.wraps(formula)
+    def evaluate(*args):
+        # скаляры int - основной путь подсчета: int Python не переполняется
+        for arg in args:
+            if type(arg) is not int:
+                break
+        else:
+            return formula(*args)
+        args = [_normalize(arg) for arg in args]
+        arrays = [arg for arg in args if isinstance(arg, np.ndarray)]
+        if not arrays or any(arg.dtype.kind not in 'iO' for arg in arrays):
+            return formula(*args)
+        if any(arg.dtype == object for arg in arrays):
+            return formula(*[arg.astype(object) if isinstance(arg, np.ndarray) else arg for arg in args])
+
+        shape = np.broadcast_shapes(*(arg.shape for arg in arrays))
+        safe = np.ones(shape, dtype=bool)
+        for arg in args:
+            if isinstance(arg, np.ndarray):
+                safe &= np.abs(arg) <= INT64_SAFE_LIMIT
+            elif isinstance(arg, int) and abs(arg) > INT64_SAFE_LIMIT:
+                safe[...] = False
+        if safe.all():
+            return formula(*args)
+
+        columns = [np.broadcast_to(arg, shape) if isinstance(arg, np.ndarray) else arg for arg in args]
+        result = np.empty(shape, dtype=object)
+        if safe.any():
+            result[safe] = formula(*[column[safe] if isinstance(column, np.ndarray) else column
+                                     for column in columns]).tolist()
+        unsafe = ~safe
+        result[unsafe] = formula(*[column[unsafe].astype(object) if isinstance(column, np.ndarray) else column
+                                   for column in columns])
+        return result
+    return evaluate
+
+
+def _is_integral(value) -> bool:
+    """Целое число Python/NumPy или целочисленный массив NumPy"""
+    if isinstance(value, (int, np.integer)):
+        return True
+    return isinstance(value, np.ndarray) and value.dtype.kind in 'iuO'
+
+
+def _clamp_min(a, b):
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return np.minimum(a, b)
+    if _is_integral(a) and _is_integral(b):
+        return min(a, b)
+    import sympy as sp
+    return sp.Min(a, b)
+
+
+def _clamp_max(a, b):
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return np.maximum(a, b)
+    if _is_integral(a) and _is_integral(b):
+        return max(a, b)
+    import sympy as sp
+    return sp.Max(a, b)
+
+
+def _staircase(a, length):
+    """sum_{i=0}^{length-1} max(0, a - i): точки прямоугольника за пределами полосы"""
+    m = _clamp_max(_clamp_min(length, a), 0)
+    if _is_integral(m):
+        return m * a - m * (m - 1) // 2
+    return m * a - m * (m - 1) / 2
+
 
 class OptimizedFormulas:
      @staticmethod
-     def pattern_1_lower_triangle(n: Union[int, sp.Symbol]) -> Union[int, sp.Expr]:
-         if isinstance(n, int):
+     @_exact
+     def pattern_1_lower_triangle(n: Union[int, 'sp.Symbol']) -> Union[int, 'sp.Expr']:
+         if _is_integral(n):
              return n * (n - 1) // 2
          else:
              return n * (n - 1) / 2
 
      @staticmethod
-     def pattern_2_upper_triangle(n: Union[int, sp.Symbol]) -> Union[int, sp.Expr]:
-         if isinstance(n, int):
+     @_exact
+     def pattern_2_upper_triangle(n: Union[int, 'sp.Symbol']) -> Union[int, 'sp.Expr']:
+         if _is_integral(n):
              return n * (n + 1) // 2
          else:
              return n * (n + 1) / 2
 
      @staticmethod
-     def pattern_3_trapezoid(n: Union[int, sp.Symbol], k: Union[int, sp.Symbol]) -> Union[int, sp.Expr]:
-         return n * (2 * k + 1) - k * (k + 1)
+     @_exact
+     def pattern_3_trapezoid(n: Union[int, 'sp.Symbol'], k: Union[int, 'sp.Symbol'],
+                             T: Union[int, 'sp.Symbol', None] = None) -> Union[int, 'sp.Expr']:
+         if T is None:
+             return n * (2 * k + 1) - k * (k + 1)
+         # точки полосы |t - i| <= k в прямоугольнике [0, T) x [0, n):
+         # из прямоугольника вычитаются два треугольника над и под полосой
+         return T * n - _staircase(T - k - 1, n) - _staircase(n - k - 1, T)
 
      @staticmethod
-     def pattern_4_diagonal(n: Union[int, sp.Symbol]) -> Union[int, sp.Expr]:
-         return n * n
+     @_exact
+     def pattern_4_diagonal(n: Union[int, 'sp.Symbol'], m: Union[int, 'sp.Symbol', None] = None) -> Union[int, 'sp.Expr']:
+         # обход по диагоналям покрывает прямоугольник n x m ровно один раз
+         if m is None:
+             return n * n
+         return n * m
 
      @staticmethod
-     def pattern_5_parallelogram(n: Union[int, sp.Symbol], k: Union[int, sp.Symbol]) -> Union[int, sp.Expr]:
-         return n * (2 * k + 1) - k * (k + 1)
+     @_exact
+     def pattern_5_parallelogram(n: Union[int, 'sp.Symbol'], p: Union[int, 'sp.Symbol'],
+                                 q: Union[int, 'sp.Symbol']) -> Union[int, 'sp.Expr']:
+         # полоса из p диагоналей ниже главной и q выше, обрезанная квадратом n x n
+         if _is_integral(p) and _is_integral(q):
+             return n * (p + q + 1) - (p * (p + 1) + q * (q + 1)) // 2
+         return n * (p + q + 1) - (p * (p + 1) + q * (q + 1)) / 2
 
      @staticmethod
-     def pattern_6_band_matrix(n: Union[int, sp.Symbol], b: Union[int, sp.Symbol]) -> Union[int, sp.Expr]:
+     @_exact
+     def pattern_6_band_matrix(n: Union[int, 'sp.Symbol'], b: Union[int, 'sp.Symbol']) -> Union[int, 'sp.Expr']:
          return n * (2 * b + 1) - b * (b + 1)
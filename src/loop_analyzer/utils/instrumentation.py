@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Tuple
+
+# Счетчики и гистограммы задержек для горячих путей.
+# Включаются переменной окружения LOOP_ANALYZER_METRICS=1 или вызовом enable().
+# Пока метрики выключены, каждая точка замера - вызов функции с одной
+# проверкой флага. Метки передаются кортежем пар (("mode", "pool"),): литерал
+# из констант не создает объектов при вызове. Метрики собираются в пределах
+# процесса: воркеры iter_loops(jobs > 1) ведут свои собственные.
+
+ENV_VARIABLE = "LOOP_ANALYZER_METRICS"
+PROMETHEUS_PREFIX = "loop_analyzer_"
+
+# Верхние границы корзин гистограмм в миллисекундах
+DEFAULT_BUCKETS_MS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 50.0, 100.0, 500.0, 1000.0, 5000.0)
+
+_enabled = os.environ.get(ENV_VARIABLE, "").lower() in ("1", "true", "yes", "on")
+_lock = threading.Lock()
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Распределение значений по корзинам с накопленными суммой и числом наблюдений"""
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        # последняя корзина - значения больше всех границ (+Inf)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> Dict[str, int]:
+        result = {}
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            result['+Inf' if bound == float('inf') else repr(bound)] = total
+        return result
+
+
+_counters: Dict[Tuple[str, Labels], float] = {}
+_histograms: Dict[Tuple[str, Labels], Histogram] = {}
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset():
+    """Сбрасывает все накопленные значения"""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def inc(name: str, amount: float = 1, labels: Labels = ()):
+    """Увеличивает счетчик name"""
+    if not _enabled:
+        return
+    key = (name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe(name: str, value_ms: float, labels: Labels = ()):
+    """Добавляет наблюдение в гистограмму name"""
+    if not _enabled:
+        return
+    key = (name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(value_ms)
+
+
+def clock() -> int:
+    """Отметка времени для observe_since(); 0, если метрики выключены"""
+    return time.perf_counter_ns() if _enabled else 0
+
+
+def observe_since(name: str, start_ns: int, labels: Labels = ()):
+    """Добавляет в гистограмму время в миллисекундах с отметки clock()"""
+    if not start_ns or not _enabled:
+        return
+    observe(name, (time.perf_counter_ns() - start_ns) / 1_000_000, labels)
+
+
+def snapshot() -> dict:
+    """Текущие значения: {"counters": {...}, "histograms": {...}}; метки - в имени, как в Prometheus"""
+    with _lock:
+        counters = {_series_name(name, labels): value for (name, labels), value in sorted(_counters.items())}
+        histograms = {
+            _series_name(name, labels): {"buckets": histogram.cumulative(), "sum": histogram.sum,
+                                         "count": histogram.count}
+            for (name, labels), histogram in sorted(_histograms.items())
+        }
+    return {"counters": counters, "histograms": histograms}
+
+
+def to_prometheus() -> str:
+    """Значения в текстовом формате экспозиции Prometheus"""
+    lines = []
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((key, (histogram.cumulative(), histogram.sum, histogram.count))
+                            for key, histogram in _histograms.items())
+
+    declared = set()
+    for (name, labels), value in counters:
+        metric = PROMETHEUS_PREFIX + name
+        if metric not in declared:
+            declared.add(metric)
+            lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{_series_name(metric, labels)} {_format_value(value)}")
+
+    for (name, labels), (buckets, total, count) in histograms:
+        metric = PROMETHEUS_PREFIX + name
+        if metric not in declared:
+            declared.add(metric)
+            lines.append(f"# TYPE {metric} histogram")
+        for bound, cumulative in buckets.items():
+            lines.append(f"{_series_name(metric + '_bucket', labels + (('le', bound),))} {cumulative}")
+        lines.append(f"{_series_name(metric + '_sum', labels)} {_format_value(total)}")
+        lines.append(f"{_series_name(metric + '_count', labels)} {count}")
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def _series_name(name: str, labels: Labels) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
@@ -1,29 +1,62 @@
 from typing import Dict
-from loop_analyzer.core.loop import PatternType
+from loop_analyzer.core.loop import LoopStructure, PatternType
 import math
 
 def get_parameters(n_points: int, pattern: PatternType) -> Dict[str, int]:
     if n_points <= 0:
         raise ValueError("n_points должно быть больше нуля")
     
-    C = n_points
+    # целые sympy и NumPy приводятся к int Python
+    C = int(n_points)
     d: Dict[str, int] = {}
 
     if pattern == PatternType.LOWER_TRIANGLE:
-        discriminant = 1 + 8 * C
-        if discriminant < 0:
-            d['n'] = 1
-        else:
-            d['n'] = max(1, int((1 + math.sqrt(discriminant)) / 2))
+        # n(n-1)/2 <= C: целый корень без потери точности при больших C
+        d['n'] = max(1, (1 + math.isqrt(1 + 8 * C)) // 2)
         return d
         
     elif pattern == PatternType.UPPER_TRIANGLE:
-        discriminant = 1 + 8 * C
-        if discriminant < 0:
-            d['n'] = 1
-        else:
-            d['n'] = max(1, int((-1 + math.sqrt(discriminant)) / 2))
+        d['n'] = max(1, (-1 + math.isqrt(1 + 8 * C)) // 2)
         return d
 
-    d['n'] = max(1, int(math.sqrt(C)))
-    return d
\ No newline at end of file
+    elif pattern in (PatternType.TRAPEZOID, PatternType.BAND_MATRIX):
+        # n(2k+1) - k(k+1) = C: ширину полосы берем порядка sqrt(C), тогда k < n
+        k = math.isqrt(C) // 4
+        n = max(1, (C + k * (k + 1)) // (2 * k + 1))
+        d['n'] = n
+        d['b' if pattern == PatternType.BAND_MATRIX else 'k'] = k
+        if pattern == PatternType.TRAPEZOID:
+            d['T'] = n
+        return d
+
+    elif pattern == PatternType.PARALLELOGRAM:
+        # n(p+1) - p(p+1)/2 = C при q = 0: сдвиг полосы порядка sqrt(C), тогда p < n
+        p = math.isqrt(C) // 4
+        d['n'] = max(1, (C + p * (p + 1) // 2) // (p + 1))
+        d['p'] = p
+        d['q'] = 0
+        return d
+
+    elif pattern == PatternType.DIAGONAL:
+        # n * m = C
+        d['n'] = max(1, math.isqrt(C))
+        d['m'] = d['n']
+        return d
+
+    d['n'] = max(1, math.isqrt(C))
+    return d
+
+
+def to_source_parameters(loop_structure: LoopStructure, params: Dict[str, int]) -> Dict[str, int]:
+    """Переводит параметры с именами аргументов формулы (n, k, b, p, ...) в имена символов исходника.
+
+    Параметр, которому в LoopStructure.parameters соответствует одиночный символ
+    (например, b -> bandwidth), передается под именем символа; остальные
+    остаются под своими именами.
+    """
+    mapping = loop_structure.parameters or {}
+    result = {}
+    for name, value in params.items():
+        source_name = getattr(mapping.get(name), 'name', None)
+        result[source_name or name] = value
+    return result
\ No newline at end of file
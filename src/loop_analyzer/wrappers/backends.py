@@ -0,0 +1,132 @@
+import time
+from typing import Dict, Mapping, Tuple
+
+from loop_analyzer.core.loop import LoopStructure
+from loop_analyzer.core.polyhedron_utils import (loop_structure_to_constraints, loop_structure_to_parametric_isl_string,
+                                                 parametric_isl_template)
+from loop_analyzer.wrappers.barvinok_wrapper import count_integer_points, get_default_pool
+
+
+class CountingBackend:
+    """Бэкенд точного подсчета целых точек множества итераций гнезда"""
+    name = None
+
+    def count(self, loop_structure: LoopStructure, concrete_params: Mapping[str, int]) -> Tuple[int, float]:
+        """Возвращает число точек и чистое время подсчета в миллисекундах"""
+        raise NotImplementedError
+
+    def is_available(self) -> bool:
+        raise NotImplementedError
+
+
+class IsccBackend(CountingBackend):
+    """Подсчет внешним iscc: множество передается текстом через stdin"""
+    name = "iscc"
+
+    def __init__(self, mode: str = "pool"):
+        # "pool" - запросы к долгоживущим процессам iscc, "spawn" - новый процесс на каждый запрос
+        if mode not in ("pool", "spawn"):
+            raise ValueError(f"Unknown iscc mode: {mode}")
+        self.mode = mode
+
+    def count(self, loop_structure: LoopStructure, concrete_params: Mapping[str, int]) -> Tuple[int, float]:
+        template = parametric_isl_template(loop_structure)
+        if template is not None:
+            isl_str = template.bind(concrete_params)
+        else:
+            substituted_loop = loop_structure.substitute_parameters(dict(concrete_params))
+            isl_str = loop_structure_to_parametric_isl_string(substituted_loop)
+        pool = get_default_pool() if self.mode == "pool" else None
+        return count_integer_points(isl_str, pool=pool)
+
+    def is_available(self) -> bool:
+        try:
+            count_integer_points("{[i]: 0 <= i < 1}", pool=get_default_pool() if self.mode == "pool" else None)
+            return True
+        except RuntimeError:
+            return False
+
+
+class IslpyBackend(CountingBackend):
+    """Подсчет в процессе через islpy: множество строится из ограничений без текста.
+
+    Параметрическое множество строится один раз на структуру циклов, для
+    конкретных параметров значения фиксируются через fix_val. Если islpy
+    собран с barvinok, используется card, иначе count_val (перебор isl).
+    """
+    name = "islpy"
+
+    def __init__(self):
+        import islpy as isl
+        self._isl = isl
+        self._ctx = isl.Context()
+        self._has_card = hasattr(isl.BasicSet, 'card')
+        self._sets: Dict[tuple, tuple] = {}
+
+    def build_set(self, loop_structure: LoopStructure):
+        """Параметрическое множество isl и список его параметров"""
+        key = loop_structure.structure_key()
+        cached = self._sets.get(key)
+        if cached is not None:
+            return cached
+
+        isl = self._isl
+        constraints = loop_structure_to_constraints(loop_structure)
+        space = isl.Space.create_from_names(self._ctx, set=constraints.variables + constraints.existentials,
+                                            params=constraints.parameters)
+        basic_set = isl.BasicSet.universe(space)
+        for constraint in constraints.constraints:
+            coefficients = dict(constraint.coefficients)
+            coefficients[1] = constraint.constant
+            if constraint.is_equality:
+                basic_set = basic_set.add_constraint(isl.Constraint.eq_from_names(space, coefficients))
+            else:
+                basic_set = basic_set.add_constraint(isl.Constraint.ineq_from_names(space, coefficients))
+        if constraints.existentials:
+            basic_set = basic_set.project_out(isl.dim_type.set, len(constraints.variables),
+                                              len(constraints.existentials))
+
+        cached = (basic_set, constraints.parameters)
+        self._sets[key] = cached
+        return cached
+
+    def count(self, loop_structure: LoopStructure, concrete_params: Mapping[str, int]) -> Tuple[int, float]:
+        isl = self._isl
+        basic_set, parameters = self.build_set(loop_structure)
+
+        start = time.perf_counter_ns()
+        try:
+            for index, name in enumerate(parameters):
+                value = isl.Val(str(int(concrete_params[name])), self._ctx)
+                basic_set = basic_set.fix_val(isl.dim_type.param, index, value)
+            if self._has_card:
+                card = basic_set.card()
+                value = card.eval(isl.Point.zero(card.get_domain_space()))
+            else:
+                value = isl.Set.from_basic_set(basic_set).count_val()
+        except isl.Error as e:
+            raise RuntimeError(f"islpy failed: {e}")
+        end = time.perf_counter_ns()
+
+        return (int(value.to_python()), (end - start) / 1_000_000)
+
+    def is_available(self) -> bool:
+        return True
+
+
+_BACKENDS = {
+    IsccBackend.name: IsccBackend,
+    IslpyBackend.name: IslpyBackend,
+}
+
+
+def get_backend(name: str, **kwargs) -> CountingBackend:
+    """Создает бэкенд по имени: "iscc" или "islpy" """
+    try:
+        backend_class = _BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown counting backend: {name}. Available: {', '.join(_BACKENDS)}")
+    try:
+        return backend_class(**kwargs)
+    except ImportError as e:
+        raise RuntimeError(f"Backend {name} is not available: {e}")
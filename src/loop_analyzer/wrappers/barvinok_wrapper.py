@@ -1,11 +1,60 @@
+import atexit
+import itertools
+import os
+import queue
+import shutil
 import subprocess
+import threading
 import time
 import re
 
-def count_integer_points(polyhedron_isl_str: str) -> (int,int):
-    input_data = f"""S := {polyhedron_isl_str}; card S;"""
+from loop_analyzer.utils import instrumentation as metrics
+from loop_analyzer.wrappers.qpolynomial import PiecewiseQuasiPolynomial, parse_piecewise_qpolynomial
 
-    count = 0
+_CARD_PATTERN = re.compile(r'\{\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*\}')
+
+# Маркер конца ответа: iscc печатает множество с именованным кортежем как есть,
+# поэтому по строке "lpa_end[<номер>]" можно однозначно отделить ответы друг от друга
+_END_MARKER = "lpa_end"
+
+# Предельное время одного запроса к iscc в секундах: зависший процесс
+# завершается, а запрос считается неудачным (None - без ограничения)
+ISCC_TIMEOUT_S = 60.0
+
+
+def _parse_card(stdout: str) -> int:
+    match = _CARD_PATTERN.search(stdout)
+    if match:
+        return int(match.group(1))
+    raise ValueError(f"Cardinal value not found in output: {stdout}")
+
+
+def count_integer_points(polyhedron_isl_str: str, pool: 'IsccWorkerPool' = None) -> (int,int):
+    """Считает число целых точек множества; с pool запрос уходит долгоживущему iscc"""
+    if pool is not None:
+        return pool.count_integer_points(polyhedron_isl_str)
+
+    stdout, pure_time = _run_iscc(f"""S := {polyhedron_isl_str}; card S;""")
+    return (_parse_card(stdout), pure_time)
+
+
+def compute_parametric_card(polyhedron_isl_str: str, pool: 'IsccWorkerPool' = None) -> (PiecewiseQuasiPolynomial, float):
+    """Считает card параметрического множества и разбирает квазиполином из ответа iscc"""
+    script = f"""S := {polyhedron_isl_str}; card S;"""
+    if pool is not None:
+        stdout, pure_time = pool.query(script)
+    else:
+        stdout, pure_time = _run_iscc(script)
+
+    lines = [line.strip() for line in stdout.splitlines() if '{' in line]
+    if not lines:
+        raise ValueError(f"Quasi-polynomial not found in output: {stdout}")
+    return (parse_piecewise_qpolynomial(lines[-1]), pure_time)
+
+
+def _run_iscc(input_data: str) -> (str, float):
+    metrics.inc("iscc_calls_total", labels=(("mode", "spawn"),))
+    call_start = metrics.clock()
     try:
         # запускаем iscc через subprocess
         proc = subprocess.Popen(["iscc"],
@@ -14,20 +63,212 @@ def count_integer_points(polyhedron_isl_str: str) -> (int,int):
                                 stderr=subprocess.PIPE,
                                 text=True)
         start = time.perf_counter_ns()
-        stdout, stderr = proc.communicate(input=input_data)
+        try:
+            stdout, stderr = proc.communicate(input=input_data, timeout=ISCC_TIMEOUT_S)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            metrics.inc("iscc_timeouts_total", labels=(("mode", "spawn"),))
+            metrics.inc("iscc_failures_total", labels=(("mode", "spawn"),))
+            raise RuntimeError(f"iscc timed out after {ISCC_TIMEOUT_S} s")
         end = time.perf_counter_ns()
 
         if proc.returncode != 0:
+            metrics.inc("iscc_failures_total", labels=(("mode", "spawn"),))
             raise RuntimeError(f"iscc failed: {stderr}")
 
-        match = re.search(r'\{\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*\}', stdout)
-        if match:
-            count = int(match.group(1))
-        else:
-            raise ValueError(f"Cardinal value not found in output: {stdout}")
-
         pure_time = (end - start) / 1_000_000  # Конвертируем в миллисекунды
-        return (count, pure_time)
+        metrics.observe("iscc_compute_ms", pure_time, labels=(("mode", "spawn"),))
+        metrics.observe_since("iscc_latency_ms", call_start, labels=(("mode", "spawn"),))
+        return (stdout, pure_time)
 
     except FileNotFoundError:
+        metrics.inc("iscc_failures_total", labels=(("mode", "spawn"),))
         raise RuntimeError("iscc not found. Please install barvinok and ensure iscc is in PATH")
+
+
+class _WorkerCrashed(Exception):
+    """Процесс iscc завершился или перестал принимать запросы"""
+
+
+class _WorkerTimedOut(_WorkerCrashed):
+    """Процесс iscc не ответил вовремя и был завершен"""
+
+
+class _IsccWorker:
+    """Один долгоживущий процесс iscc, принимающий запросы через stdin"""
+    def __init__(self, command: list):
+        try:
+            self.proc = subprocess.Popen(command,
+                                         stdin=subprocess.PIPE,
+                                         stdout=subprocess.PIPE,
+                                         stderr=subprocess.STDOUT,
+                                         text=True,
+                                         bufsize=1)
+        except FileNotFoundError:
+            raise RuntimeError("iscc not found. Please install barvinok and ensure iscc is in PATH")
+
+    def run(self, script: str, seq: int, timeout: float = None) -> (str, float):
+        """Отправляет скрипт и читает вывод до маркера конца с номером seq.
+
+        Если ответа нет за timeout секунд, сторожевой таймер завершает процесс,
+        readline получает конец потока, и выбрасывается _WorkerTimedOut.
+        """
+        marker = f"{_END_MARKER}[{seq}]"
+        timed_out = threading.Event()
+
+        def kill():
+            timed_out.set()
+            self.proc.kill()
+
+        watchdog = threading.Timer(timeout, kill) if timeout else None
+        try:
+            start = time.perf_counter_ns()
+            if watchdog is not None:
+                watchdog.daemon = True
+                watchdog.start()
+            self.proc.stdin.write(f"{script}\n{{ {marker} }};\n")
+            self.proc.stdin.flush()
+
+            output = []
+            while True:
+                line = self.proc.stdout.readline()
+                if not line:
+                    if timed_out.is_set():
+                        raise _WorkerTimedOut(f"no answer in {timeout} s")
+                    raise _WorkerCrashed(''.join(output))
+                if marker in line:
+                    break
+                # хвосты прерванных запросов отбрасываем
+                if _END_MARKER in line:
+                    output = []
+                    continue
+                output.append(line)
+            end = time.perf_counter_ns()
+        except (BrokenPipeError, OSError, ValueError) as e:
+            if timed_out.is_set():
+                raise _WorkerTimedOut(f"no answer in {timeout} s")
+            raise _WorkerCrashed(str(e))
+        finally:
+            if watchdog is not None:
+                watchdog.cancel()
+
+        return ''.join(output), (end - start) / 1_000_000
+
+    def close(self):
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.proc.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+
+
+def _default_iscc_command() -> list:
+    # при выводе в pipe stdout буферизуется блоками, и ответ не дойдет до
+    # маркера; stdbuf переводит iscc на построчную буферизацию
+    if shutil.which("stdbuf"):
+        return ["stdbuf", "-oL", "iscc"]
+    return ["iscc"]
+
+
+class IsccWorkerPool:
+    """Пул долгоживущих процессов iscc; безопасен при вызове из нескольких потоков.
+
+    timeout - предельное время запроса в секундах: зависший процесс
+    завершается, и слот пула освобождается.
+    """
+    def __init__(self, size: int = None, command: list = None, timeout: float = ISCC_TIMEOUT_S):
+        self.size = size or os.cpu_count() or 1
+        self._command = command or _default_iscc_command()
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._workers = []
+        self._seq = itertools.count()
+        self._closed = False
+
+    def _spawn(self) -> _IsccWorker:
+        metrics.inc("iscc_worker_spawns_total")
+        worker = _IsccWorker(self._command)
+        with self._lock:
+            self._workers.append(worker)
+        return worker
+
+    def _discard(self, worker: _IsccWorker):
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+        worker.proc.kill()
+        worker.proc.wait()
+
+    def query(self, script: str) -> (str, float):
+        """Выполняет скрипт iscc и возвращает его вывод и время в миллисекундах"""
+        if self._closed:
+            raise RuntimeError("IsccWorkerPool is closed")
+
+        metrics.inc("iscc_calls_total", labels=(("mode", "pool"),))
+        call_start = metrics.clock()
+        with self._slots:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                worker = self._spawn()
+
+            # упавший процесс перезапускаем и повторяем запрос один раз
+            for attempt in range(2):
+                try:
+                    result = worker.run(script, next(self._seq), self.timeout)
+                except _WorkerTimedOut as e:
+                    # зависание на этом множестве повторится, поэтому без повтора
+                    metrics.inc("iscc_timeouts_total", labels=(("mode", "pool"),))
+                    metrics.inc("iscc_failures_total", labels=(("mode", "pool"),))
+                    self._discard(worker)
+                    raise RuntimeError(f"iscc timed out: {e}")
+                except _WorkerCrashed as e:
+                    metrics.inc("iscc_worker_crashes_total")
+                    self._discard(worker)
+                    if attempt:
+                        metrics.inc("iscc_failures_total", labels=(("mode", "pool"),))
+                        raise RuntimeError(f"iscc failed: {e}")
+                    worker = self._spawn()
+                    continue
+                self._idle.put(worker)
+                metrics.observe("iscc_compute_ms", result[1], labels=(("mode", "pool"),))
+                metrics.observe_since("iscc_latency_ms", call_start, labels=(("mode", "pool"),))
+                return result
+
+    def count_integer_points(self, polyhedron_isl_str: str) -> (int, float):
+        stdout, pure_time = self.query(f"S := {polyhedron_isl_str}; card S;")
+        return (_parse_card(stdout), pure_time)
+
+    def close(self):
+        self._closed = True
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_default_pool() -> IsccWorkerPool:
+    """Возвращает общий для процесса пул iscc, создавая его при первом обращении"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = IsccWorkerPool()
+            atexit.register(_default_pool.close)
+        return _default_pool
@@ -0,0 +1,327 @@
+import math
+import operator
+import re
+from typing import Dict, List, Optional, Tuple
+
+# Разбор кусочно-заданных квазиполиномов, которые печатает iscc для card
+# параметрического множества, например:
+#   [n] -> { (-1/2 * n + 1/2 * n^2) : n >= 1 }
+#   [n, k] -> { (n + floor((k)/2)) : exists (e0 = floor((n)/2): 2e0 = n) and k >= 0; 0 : n < 0 }
+# Каждый кусок разбирается один раз в дерево из кортежей (тег, операнды...),
+# которое затем вычисляется над целыми числами для конкретных параметров.
+
+_TOKEN_PATTERN = re.compile(r'\s*(?:(\d+)|([A-Za-z_][A-Za-z0-9_\']*)|(->|<=|>=|[-+*/^(){}\[\]:;,<>=]))')
+
+_RELATIONS = {'=': operator.eq, '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge}
+
+# Узлы выражений:
+#   ('num', value), ('var', slot), ('neg', node), ('lin', ((coeff, node), ...)),
+#   ('mul', node, node), ('pow', node, exponent), ('floor', node, den), ('ceil', node, den),
+#   ('mod', node, modulus)
+# Узлы условий:
+#   ('bool', value), ('and', (node, ...)), ('or', (node, ...)),
+#   ('chain', node, ((relation, node), ...)), ('exists', ((slot, node), ...), node)
+Node = tuple
+
+
+def _tokenize(text: str) -> List[str]:
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = _TOKEN_PATTERN.match(text, pos)
+        if not match or match.end() == pos:
+            raise ValueError(f"Unexpected character in quasi-polynomial: {text[pos:pos + 20]!r}")
+        tokens.append(match.group(match.lastindex))
+        pos = match.end()
+    return tokens
+
+
+def _scale(node: Node, factor: int) -> Node:
+    return node if factor == 1 else ('lin', ((factor, node),))
+
+
+def _evaluate(node: Node, env: Dict[int, int]):
+    """Значение узла дерева: int для выражений, bool для условий"""
+    tag = node[0]
+    if tag == 'num' or tag == 'bool':
+        return node[1]
+    if tag == 'var':
+        return env[node[1]]
+    if tag == 'lin':
+        return sum(coeff * _evaluate(term, env) for coeff, term in node[1])
+    if tag == 'mul':
+        return _evaluate(node[1], env) * _evaluate(node[2], env)
+    if tag == 'neg':
+        return -_evaluate(node[1], env)
+    if tag == 'pow':
+        return _evaluate(node[1], env) ** node[2]
+    if tag == 'floor':
+        return _evaluate(node[1], env) // node[2]
+    if tag == 'ceil':
+        return -(-_evaluate(node[1], env) // node[2])
+    if tag == 'mod':
+        return _evaluate(node[1], env) % node[2]
+    if tag == 'and':
+        return all(_evaluate(part, env) for part in node[1])
+    if tag == 'or':
+        return any(_evaluate(part, env) for part in node[1])
+    if tag == 'chain':
+        left = _evaluate(node[1], env)
+        for relation, part in node[2]:
+            right = _evaluate(part, env)
+            if not relation(left, right):
+                return False
+            left = right
+        return True
+    if tag == 'exists':
+        inner_env = dict(env)
+        for slot, definition in node[1]:
+            inner_env[slot] = _evaluate(definition, env)
+        return _evaluate(node[2], inner_env)
+    raise ValueError(f"Unknown quasi-polynomial node {tag!r}")
+
+
+class _Parser:
+    """Рекурсивный спуск по выводу iscc с построением дерева выражения.
+
+    Выражение представляется парой (node, den): значение равно node / den,
+    где node - целочисленное выражение, поэтому вычисление идет только
+    в int без Fraction.
+    """
+    def __init__(self, tokens: List[str], names: Dict[str, int]):
+        self.tokens = tokens
+        self.pos = 0
+        self.names = names
+        self.slots = len(names)
+
+    def peek(self, offset: int = 0) -> Optional[str]:
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def take(self, expected: str = None) -> str:
+        token = self.peek()
+        if token is None or (expected is not None and token != expected):
+            raise ValueError(f"Expected {expected!r}, got {token!r}")
+        self.pos += 1
+        return token
+
+    # --- квазиполиномы ---
+
+    def expression(self) -> Tuple[Node, int]:
+        terms = [(1, self.term())]
+        while self.peek() in ('+', '-'):
+            sign = 1 if self.take() == '+' else -1
+            terms.append((sign, self.term()))
+
+        den = 1
+        for _, (_, term_den) in terms:
+            den = den * term_den // math.gcd(den, term_den)
+        if len(terms) == 1 and terms[0][0] == 1:
+            node, term_den = terms[0][1]
+            return _scale(node, den // term_den), den
+        return ('lin', tuple((sign * (den // term_den), node) for sign, (node, term_den) in terms)), den
+
+    def term(self) -> Tuple[Node, int]:
+        node, den = self.unary()
+        while True:
+            token = self.peek()
+            if token == '*':
+                self.take()
+                other, other_den = self.unary()
+                node, den = ('mul', node, other), den * other_den
+            elif token == '/':
+                self.take()
+                den = den * int(self.take())
+            elif token == 'mod':
+                self.take()
+                node, den = ('mod', ('floor', node, den), int(self.take())), 1
+            elif token is not None and (token == '(' or token[0].isalpha() or token[0] == '_') \
+                    and token not in ('and', 'or', 'mod'):
+                # неявное умножение: 2n, 2e0, 3(n + 1)
+                other, other_den = self.power()
+                node, den = ('mul', node, other), den * other_den
+            else:
+                return node, den
+
+    def unary(self) -> Tuple[Node, int]:
+        if self.peek() == '-':
+            self.take()
+            node, den = self.unary()
+            return ('neg', node), den
+        return self.power()
+
+    def power(self) -> Tuple[Node, int]:
+        node, den = self.atom()
+        if self.peek() == '^':
+            self.take()
+            exponent = int(self.take())
+            return ('pow', node, exponent), den ** exponent
+        return node, den
+
+    def atom(self) -> Tuple[Node, int]:
+        token = self.take()
+        if token.isdigit():
+            return ('num', int(token)), 1
+        if token == '(':
+            inner = self.expression()
+            self.take(')')
+            return inner
+        if token == 'floor':
+            self.take('(')
+            node, den = self.expression()
+            self.take(')')
+            return (node, 1) if den == 1 else (('floor', node, den), 1)
+        if token == 'ceil':
+            self.take('(')
+            node, den = self.expression()
+            self.take(')')
+            return (node, 1) if den == 1 else (('ceil', node, den), 1)
+        if token in self.names:
+            return ('var', self.names[token]), 1
+        raise ValueError(f"Unknown identifier in quasi-polynomial: {token!r}")
+
+    # --- условия ---
+
+    def condition(self) -> Node:
+        parts = [self.conjunction()]
+        while self.peek() == 'or':
+            self.take()
+            parts.append(self.conjunction())
+        return parts[0] if len(parts) == 1 else ('or', tuple(parts))
+
+    def conjunction(self) -> Node:
+        parts = [self.constraint()]
+        while self.peek() == 'and':
+            self.take()
+            parts.append(self.constraint())
+        return parts[0] if len(parts) == 1 else ('and', tuple(parts))
+
+    def constraint(self) -> Node:
+        token = self.peek()
+        if token == 'true':
+            self.take()
+            return ('bool', True)
+        if token == 'false':
+            self.take()
+            return ('bool', False)
+        if token == 'exists':
+            return self.exists()
+
+        # цепочка сравнений: 0 <= i < n; скобки могут открывать и выражение,
+        # и вложенное условие, поэтому при неудаче откатываемся
+        saved = self.pos
+        try:
+            chain = [self.expression()]
+            if self.peek() not in _RELATIONS:
+                raise ValueError("Relation expected")
+            relations = []
+            while self.peek() in _RELATIONS:
+                relations.append(_RELATIONS[self.take()])
+                chain.append(self.expression())
+        except ValueError:
+            if token != '(':
+                raise
+            self.pos = saved
+            self.take('(')
+            inner = self.condition()
+            self.take(')')
+            return inner
+
+        # приводим все части цепочки к общему знаменателю
+        den = 1
+        for _, part_den in chain:
+            den = den * part_den // math.gcd(den, part_den)
+        first = _scale(chain[0][0], den // chain[0][1])
+        rest = tuple((relation, _scale(node, den // part_den))
+                     for relation, (node, part_den) in zip(relations, chain[1:]))
+        return ('chain', first, rest)
+
+    def exists(self) -> Node:
+        self.take('exists')
+        self.take('(')
+        definitions = []
+        while True:
+            name = self.take()
+            if self.peek() != '=':
+                raise ValueError(f"Existential variable {name!r} without definition is not supported")
+            self.take('=')
+            node, den = self.expression()
+            if den != 1:
+                raise ValueError(f"Non-integral definition of existential variable {name!r}")
+            slot = self.slots
+            self.slots += 1
+            definitions.append((slot, node))
+            self.names[name] = slot
+            if self.peek() == ',':
+                self.take()
+                continue
+            break
+        self.take(':')
+        inner = self.condition()
+        self.take(')')
+        return ('exists', tuple(definitions), inner)
+
+
+class PiecewiseQuasiPolynomial:
+    """Кусочно-заданный квазиполином, разобранный в деревья выражений и условий"""
+    def __init__(self, parameters: List[str], pieces: List[Tuple[Tuple[Node, int], Node]], text: str):
+        self.parameters = parameters
+        self.text = text
+        self._pieces = [(node, den, condition) for (node, den), condition in pieces]
+
+    def evaluate(self, params: Dict[str, int]) -> int:
+        env = {slot: int(params[name]) for slot, name in enumerate(self.parameters)}
+        for value, den, condition in self._pieces:
+            if _evaluate(condition, env):
+                result = _evaluate(value, env)
+                if den == 1:
+                    return result
+                quotient, remainder = divmod(result, den)
+                if remainder:
+                    raise ValueError(f"Non-integer cardinality {result}/{den} for {params}")
+                return quotient
+        # вне области определения квазиполином равен нулю
+        return 0
+
+    def __call__(self, params: Dict[str, int]) -> int:
+        return self.evaluate(params)
+
+    def __repr__(self):
+        return f"PiecewiseQuasiPolynomial({self.text!r})"
+
+
+def parse_piecewise_qpolynomial(text: str) -> PiecewiseQuasiPolynomial:
+    """Разбирает вывод iscc вида [params] -> { qp : cond; ... }"""
+    tokens = _tokenize(text)
+    pos = 0
+
+    parameters = []
+    if tokens and tokens[0] == '[':
+        end = tokens.index(']')
+        parameters = [token for token in tokens[1:end] if token != ',']
+        if tokens[end + 1] != '->':
+            raise ValueError(f"Malformed parameter list in {text!r}")
+        pos = end + 2
+
+    names = {name: slot for slot, name in enumerate(parameters)}
+    parser = _Parser(tokens, names)
+    parser.pos = pos
+    parser.take('{')
+
+    pieces = []
+    while parser.peek() != '}':
+        value = parser.expression()
+        condition = ('bool', True)
+        if parser.peek() == ':':
+            parser.take()
+            condition = parser.condition()
+        pieces.append((value, condition))
+        if parser.peek() == ';':
+            parser.take()
+    parser.take('}')
+
+    if parser.peek() is not None:
+        raise ValueError(f"Trailing tokens in quasi-polynomial: {tokens[parser.pos:]}")
+
+    return PiecewiseQuasiPolynomial(parameters, pieces, text)
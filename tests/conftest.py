@@ -0,0 +1,55 @@
+import itertools
+import math
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).parent.parent
+DATA = ROOT / 'data'
+
+sys.path.insert(0, str(ROOT / 'src'))
+# бенчмарки импортируются как пакет benchmarks
+sys.path.insert(0, str(ROOT))
+
+
+def _band(outer, n, k):
+    return sum(max(0, min(n, a + k + 1) - max(0, a - k)) for a in range(outer))
+
+
+# подсчет прямым перебором по тексту исходников data/patternN.cpp
+ORACLES = {
+    1: (('n',), lambda n: sum(len(range(0, i)) for i in range(n))),
+    2: (('n',), lambda n: sum(len(range(i, n)) for i in range(n))),
+    3: (('T', 'n', 'k'), lambda T, n, k: _band(T, n, k)),
+    4: (('n', 'm'), lambda n, m: sum(max(0, min(d + 1, n) - max(0, d - m + 1)) for d in range(n + m - 1))),
+    5: (('n', 'k'), lambda n, k: sum(max(0, min(n, a + 1) - max(0, a - k)) for a in range(n))),
+    6: (('n', 'bandwidth'), lambda n, bandwidth: _band(n, n, bandwidth)),
+}
+
+# сетка значений параметров, включая нулевые, отрицательные и вырожденные (k >= n, m = 0, T < k)
+GRID = (-2, -1, 0, 1, 2, 3, 5, 8)
+
+
+def grid(number):
+    """Пары (параметры, число точек) по сетке GRID для data/patternN.cpp"""
+    names, oracle = ORACLES[number]
+    for values in itertools.product(GRID, repeat=len(names)):
+        yield dict(zip(names, values)), oracle(*values)
+
+
+@pytest.fixture(scope="session")
+def nests():
+    """Самое глубокое гнездо каждого файла data/patternN.cpp по номеру паттерна"""
+    from loop_analyzer.core.loop_extractor import CppLoopExtractor
+    extractor = CppLoopExtractor()
+    return {number: extractor.extract_loops_from_file(str(DATA / f"pattern{number}.cpp"))[-1]
+            for number in range(1, 7)}
+
+
+@pytest.fixture
+def counter():
+    """LatticeCounter без калибровки и без обращений к iscc: обход без ограничения бюджета"""
+    from loop_analyzer.core.counter import CostModel, LatticeCounter
+    return LatticeCounter(iscc_mode="spawn", cost_model=CostModel(enumeration_ns=1.0, barvinok_ms=math.inf,
+                                                                       enumeration_overhead_ms=0.0))
@@ -0,0 +1,70 @@
+import os
+import pickle
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+import sympy as sp
+
+from loop_analyzer.core.affine import AffineExpr, as_affine, parse_affine
+
+from conftest import DATA, ROOT
+
+
+@pytest.mark.parametrize("text", ["n", "i + 1", "n + m - 1", "2*k", "-k + t", "2 * (n - i) + 3", "n - (i - 1)"])
+def test_parse_matches_sympy(text):
+    expr = parse_affine(text)
+    assert isinstance(expr, AffineExpr)
+    assert str(expr) == str(sp.sympify(text))
+    assert as_affine(sp.sympify(text)) == expr
+
+
+@pytest.mark.parametrize("text", ["min(n, m)", "n * m", "n / 2", "n % 2", "", "(n"])
+def test_non_affine_text_is_rejected(text):
+    assert parse_affine(text) is None
+
+
+def test_arithmetic_normalizes_to_int():
+    n = AffineExpr.symbol('n')
+    assert (n + 1) - n == 1 and type((n + 1) - n) is int
+    assert 0 * n == 0
+    assert n + AffineExpr.symbol('m') == AffineExpr.symbol('m') + n
+    assert hash(n + 1) == hash(1 + n)
+
+
+def test_substitute_and_evaluate():
+    expr = AffineExpr.symbol('n') + AffineExpr.symbol('k') * 2 - 1
+    assert expr.substitute({'n': 5}) == AffineExpr.symbol('k') * 2 + 4
+    assert expr.substitute({'n': 5, 'k': 2}) == 8
+    assert expr.substitute({'k': AffineExpr.symbol('n')}) == AffineExpr.symbol('n') * 3 - 1
+    assert expr.evaluate({'n': 5, 'k': 2}) == 8
+
+
+def test_pickle_round_trip():
+    expr = parse_affine("n + m - 1")
+    assert pickle.loads(pickle.dumps(expr)) == expr
+
+
+def test_extractor_does_not_import_sympy_for_affine_bounds():
+    script = ("import sys\n"
+              "from loop_analyzer.core.loop_extractor import CppLoopExtractor\n"
+              f"loops = CppLoopExtractor().extract_loops_from_file({str(DATA / 'pattern1.cpp')!r})\n"
+              "print(type(loops[-1].bounds[1].end).__name__, 'sympy' in sys.modules)\n")
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                            env={**os.environ, "PYTHONPATH": str(ROOT / "src")}, check=True)
+    assert result.stdout.split() == ["AffineExpr", "False"]
+
+
+def test_substitute_integer_types_stays_affine():
+    expr = AffineExpr.symbol('n') + AffineExpr.symbol('k') * 2 - 1
+    for value in (5, np.int64(5), np.int32(5), np.uint16(5), sp.Integer(5)):
+        result = expr.substitute({'n': value})
+        assert isinstance(result, AffineExpr)
+        assert result == AffineExpr.symbol('k') * 2 + 4
+    assert type(expr.substitute({'n': np.int64(5), 'k': np.int64(2)})) is int
+
+
+def test_substitute_non_integer_goes_through_sympy():
+    result = AffineExpr.symbol('n').substitute({'n': 2.5})
+    assert result == sp.Float(2.5)
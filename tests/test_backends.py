@@ -0,0 +1,47 @@
+import itertools
+import math
+
+import pytest
+
+from loop_analyzer.core.affine import AffineExpr
+from loop_analyzer.core.counter import CostModel, LatticeCounter
+from loop_analyzer.core.loop import LoopBound, LoopStructure
+from loop_analyzer.wrappers.backends import get_backend
+
+from conftest import ORACLES
+
+pytest.importorskip("islpy")
+
+
+@pytest.mark.parametrize("number", sorted(ORACLES))
+def test_islpy_matches_brute_force(nests, number):
+    names, oracle = ORACLES[number]
+    backend = get_backend("islpy")
+    for values in itertools.product((-2, 0, 1, 3, 8), repeat=len(names)):
+        assert backend.count(nests[number], dict(zip(names, values)))[0] == oracle(*values), values
+    assert len(backend._sets) == 1
+
+
+def test_strided_nest():
+    n, i = AffineExpr.symbol('n'), AffineExpr.symbol('i')
+    strided = LoopStructure(bounds=[LoopBound(0, n, 2, 'i'), LoopBound(i, n, 3, 'j')], nesting_depth=2)
+    backend = get_backend("islpy")
+    for value in range(0, 12):
+        expected = sum(len(range(a, value, 3)) for a in range(0, value, 2))
+        assert backend.count(strided, {'n': value})[0] == expected
+
+
+def test_counter_uses_backend_as_last_tier(nests):
+    cost_model = CostModel(enumeration_ns=1.0, barvinok_ms=math.inf, enumeration_overhead_ms=0.0,
+                           max_enumeration_points=0)
+    counter = LatticeCounter(cost_model=cost_model, backend=get_backend("islpy"))
+    n = AffineExpr.symbol('n')
+    strided = LoopStructure(bounds=[LoopBound(0, n, 2, 'i'), LoopBound(0, AffineExpr.symbol('i') + 1, 2, 'j')],
+                            nesting_depth=2)
+    result = counter.count(strided, {'n': 20})
+    assert (result.value, result.tier) == (sum(len(range(0, a + 1, 2)) for a in range(0, 20, 2)), "barvinok")
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        get_backend("polylib")
@@ -0,0 +1,66 @@
+import sys
+import time
+
+import pytest
+
+from loop_analyzer.wrappers.barvinok_wrapper import IsccWorkerPool, count_integer_points
+
+# заменитель iscc: на "card" печатает мощность, на "pid" - номер процесса,
+# на "crash" завершается, на "hang" зависает, остальные строки (вместе с маркером конца) повторяет
+_FAKE_ISCC = """
+import os, sys, time
+for line in sys.stdin:
+    if "crash" in line:
+        sys.exit(1)
+    if "hang" in line:
+        time.sleep(600)
+    if "card" in line:
+        line = "{ 42 }\\n"
+    elif "pid" in line:
+        line = f"{os.getpid()}\\n"
+    print(line, end="", flush=True)
+"""
+
+
+@pytest.fixture
+def pool():
+    with IsccWorkerPool(size=1, command=[sys.executable, "-c", _FAKE_ISCC], timeout=0.5) as pool:
+        yield pool
+
+
+def test_query_returns_output(pool):
+    stdout, elapsed = pool.query("S := { [1] };")
+    assert "S := { [1] };" in stdout
+    assert "lpa_end" not in stdout
+    assert elapsed >= 0
+
+
+def test_count_integer_points_through_pool(pool):
+    assert count_integer_points("{ [i] : 0 <= i < 42 }", pool=pool)[0] == 42
+
+
+def test_worker_is_reused(pool):
+    assert pool.query("pid")[0] == pool.query("pid")[0]
+
+
+def test_crashed_worker_is_replaced(pool):
+    pid = pool.query("pid")[0]
+    with pytest.raises(RuntimeError, match="iscc failed"):
+        pool.query("crash")
+    assert pool.query("pid")[0] != pid
+
+
+def test_closed_pool_rejects_queries(pool):
+    pool.close()
+    with pytest.raises(RuntimeError):
+        pool.query("pid")
+
+
+def test_hanging_query_times_out_and_frees_the_slot(pool):
+    start = time.perf_counter()
+    with pytest.raises(RuntimeError, match="timed out"):
+        pool.query("hang")
+    assert time.perf_counter() - start < 5
+    # единственный слот пула снова доступен
+    stdout, _ = pool.query("after")
+    assert "after" in stdout
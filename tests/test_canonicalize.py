@@ -0,0 +1,34 @@
+import sympy as sp
+
+from loop_analyzer.core.affine import AffineExpr, parse_affine
+from loop_analyzer.core.canonicalize import (canonicalization_cache_info, canonicalize_expression,
+                                             clear_canonicalization_cache)
+
+n, m, i, k = sp.symbols('n m i k')
+
+
+def test_linear_expressions_become_affine():
+    assert canonicalize_expression(2 * (n + 1) - n) == parse_affine("n + 2")
+    assert canonicalize_expression(sp.Integer(7)) == 7
+    assert canonicalize_expression(AffineExpr.symbol('n')) == AffineExpr.symbol('n')
+
+
+def test_min_max_arguments_are_canonicalized():
+    assert canonicalize_expression(sp.Max(0, i - k)) == sp.Max(0, i - k)
+    assert canonicalize_expression(sp.Min(n, (i + 1) + k)) == sp.Min(n, i + k + 1)
+    assert canonicalize_expression(sp.Max(sp.Integer(3), sp.Integer(5))) == 5
+
+
+def test_agrees_with_simplify():
+    for expr in (sp.expand((n + 1) ** 2 - n ** 2), (n * m + n) / n, sp.Min(n, m + 1 - 1)):
+        assert sp.simplify(sp.sympify(str(canonicalize_expression(expr))) - sp.simplify(expr)) == 0
+
+
+def test_repeated_expressions_hit_the_cache():
+    clear_canonicalization_cache()
+    canonicalize_expression(sp.Max(0, i - k))
+    first = canonicalization_cache_info()
+    for _ in range(2):
+        canonicalize_expression(sp.Max(0, i - k))
+    info = canonicalization_cache_info()
+    assert info.misses == first.misses and info.hits == first.hits + 2
@@ -0,0 +1,32 @@
+from benchmarks.corpus_generator import generate_corpus, load_manifest
+from loop_analyzer.core.loop_extractor import CppLoopExtractor
+from loop_analyzer.core.pattern_recognizer import PatternRecognizer
+
+
+def test_same_seed_same_corpus(tmp_path):
+    first = generate_corpus(tmp_path / "a", files=5, seed=1)
+    second = generate_corpus(tmp_path / "b", files=5, seed=1)
+    other = generate_corpus(tmp_path / "c", files=5, seed=2)
+
+    assert first == second
+    assert first != other
+    for name in first["files"]:
+        assert (tmp_path / "a" / name).read_text() == (tmp_path / "b" / name).read_text()
+    assert load_manifest(tmp_path / "a") == first
+
+
+def test_manifest_matches_extraction(tmp_path, counter):
+    manifest = generate_corpus(tmp_path, files=20, seed=3)
+    extractor = CppLoopExtractor()
+    recognizer = PatternRecognizer()
+    checked = 0
+    for name, entries in manifest["files"].items():
+        loops = {tuple(bound.variable for bound in loop_structure.bounds): loop_structure
+                 for loop_structure in extractor.extract_loops_from_file(str(tmp_path / name))}
+        for entry in entries:
+            loop_structure = loops[tuple(entry["variables"])]
+            pattern = recognizer.recognize_pattern(loop_structure)
+            assert pattern is not None and pattern.name == entry["pattern"], (name, entry)
+            assert counter.count(loop_structure, entry["params"]).value == entry["count"], (name, entry)
+            checked += 1
+    assert checked > 20
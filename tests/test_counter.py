@@ -0,0 +1,268 @@
+import itertools
+import math
+import time
+
+import numpy as np
+import pytest
+import sympy as sp
+
+from loop_analyzer.core import counter as counter_module
+from loop_analyzer.core.affine import AffineExpr
+from loop_analyzer.core.counter import CostModel, CountResult, LatticeCounter
+from loop_analyzer.core.enumerator import count_points
+from loop_analyzer.core.loop import LoopBound, LoopStructure
+from loop_analyzer.wrappers.qpolynomial import parse_piecewise_qpolynomial
+
+from conftest import ORACLES, grid
+
+
+def test_parametric_card_is_computed_once_per_structure(nests, monkeypatch):
+    requests = []
+
+    def fake_card(isl_str, pool=None):
+        requests.append(isl_str)
+        return parse_piecewise_qpolynomial("[n] -> { (-1/2 * n + 1/2 * n^2) : n >= 1 }"), 1.0
+
+    monkeypatch.setattr(counter_module, "compute_parametric_card", fake_card)
+    counter = LatticeCounter(iscc_mode="spawn")
+    assert [counter.count_barvinok_parametric(nests[1], {'n': n})[0] for n in (0, 1, 4, 10)] == [0, 0, 6, 45]
+    assert requests == ["[n] -> {[i, j]: i >= 0 and i < n and j >= 0 and j < i}"]
+
+
+@pytest.mark.parametrize("number", (1, 2))
+def test_count_many_matches_brute_force(nests, number):
+    _, oracle = ORACLES[number]
+    n = np.arange(0, 40)
+    result = LatticeCounter().count_many(nests[number], {'n': n})
+    assert result.dtype == np.int64
+    assert result.tolist() == [oracle(value) for value in range(40)]
+
+
+def test_count_many_accepts_structured_array(nests):
+    params = np.array([(3,), (10,)], dtype=[('n', np.int32)])
+    assert LatticeCounter().count_many(nests[1], params).tolist() == [3, 45]
+
+
+def test_count_many_switches_to_bigint_on_large_rows(nests):
+    big = 2 ** 40
+    result = LatticeCounter().count_many(nests[2], {'n': np.array([10, big], dtype=np.int64)})
+    assert result.dtype == object
+    assert result.tolist() == [55, big * (big + 1) // 2]
+
+
+def test_compile_is_cached_per_structure(nests):
+    counter = LatticeCounter()
+    compiled = counter.compile(nests[1])
+    assert counter.compile(nests[1]) is compiled
+    assert [compiled({'n': n}) for n in range(6)] == [ORACLES[1][1](n) for n in range(6)]
+    assert counter.count_hybrid(nests[2], {'n': 10}) == 55
+
+
+def test_compile_without_formula_returns_none():
+    n = AffineExpr.symbol('n')
+    loop_structure = LoopStructure(bounds=[LoopBound(0, n, 2, 'i')], nesting_depth=1)
+    counter = LatticeCounter()
+    assert counter.compile(loop_structure) is None
+    assert loop_structure.structure_key() in counter._compiled
+
+
+@pytest.mark.parametrize("number", (3, 4, 5, 6))
+def test_closed_forms_of_new_patterns(nests, number):
+    names, oracle = ORACLES[number]
+    compiled = LatticeCounter().compile(nests[number])
+    for values in itertools.product(range(0, 7), repeat=len(names)):
+        params = dict(zip(names, values))
+        # полоса задана радиусом не больше размера
+        if number in (5, 6) and values[1] > values[0]:
+            continue
+        assert compiled(params) == oracle(*values), params
+
+
+def test_count_hybrid_uses_summation_without_pattern():
+    n, i, j = (AffineExpr.symbol(name) for name in ('n', 'i', 'j'))
+    tetrahedron = LoopStructure(bounds=[LoopBound(0, n, 1, 'i'), LoopBound(0, i, 1, 'j'),
+                                        LoopBound(0, j + 1, 1, 'l')], nesting_depth=3)
+    counter = LatticeCounter()
+    assert counter.compile(tetrahedron) is None
+    assert counter.count_hybrid(tetrahedron, {'n': 10}) == 165
+    assert counter.summation(tetrahedron) is counter.summation(tetrahedron)
+
+
+def _clipped() -> LoopStructure:
+    """for i < n; for j = max(0, i - 2) .. n: не аффинное гнездо без формулы паттерна"""
+    inner = LoopBound(sp.Max(0, sp.Symbol('i') - 2), AffineExpr.symbol('n'), 1, 'j')
+    return LoopStructure(bounds=[LoopBound(0, AffineExpr.symbol('n'), 1, 'i'), inner], nesting_depth=2)
+
+
+def test_count_picks_cheapest_tier(counter, nests):
+    n, i, j = (AffineExpr.symbol(name) for name in ('n', 'i', 'j'))
+    tetrahedron = LoopStructure(bounds=[LoopBound(0, n, 1, 'i'), LoopBound(0, i, 1, 'j'),
+                                        LoopBound(0, j + 1, 1, 'l')], nesting_depth=3)
+
+    result = counter.count(nests[5], {'n': 10, 'k': 2})
+    assert (result.value, result.tier) == (ORACLES[5][1](10, 2), "formula")
+    assert result.elapsed_ms >= 0
+    result = counter.count(tetrahedron, {'n': 10})
+    assert (result.value, result.tier) == (165, "summation")
+    result = counter.count(_clipped(), {'n': 10})
+    assert (result.value, result.tier) == (sum(10 - max(0, a - 2) for a in range(10)), "enumeration")
+
+
+def test_count_raises_when_every_tier_fails(nests):
+    cost_model = CostModel(enumeration_ns=1.0, barvinok_ms=math.inf, enumeration_overhead_ms=0.0,
+                           max_enumeration_points=3)
+    counter = LatticeCounter(iscc_mode="spawn", cost_model=cost_model)
+    with pytest.raises(RuntimeError, match="enumeration: over cost-model budget"):
+        counter.count(_clipped(), {'n': 100})
+
+
+@pytest.mark.parametrize("number, params, expected", [
+    (5, {'n': 5, 'k': 9}, 15),
+    (5, {'n': 5, 'k': 6}, 15),
+    (5, {'n': -3, 'k': 1}, 0),
+    (5, {'n': 4, 'k': -1}, 0),
+    (1, {'n': -3}, 0),
+    (2, {'n': -3}, 0),
+    (3, {'T': 4, 'n': 5, 'k': -2}, 0),
+    (3, {'T': -1, 'n': 5, 'k': 2}, 0),
+    (4, {'n': -2, 'm': 5}, 0),
+    (4, {'n': 5, 'm': -1}, 0),
+])
+def test_count_outside_formula_domain(counter, nests, number, params, expected):
+    result = counter.count(nests[number], params)
+    assert result.value == expected == count_points(nests[number], params)
+    assert result.tier != "formula"
+
+
+@pytest.mark.parametrize("number, params", [
+    (5, {'n': 5, 'k': 5}),
+    (5, {'n': 0, 'k': 0}),
+    (1, {'n': 0}),
+    (4, {'n': 3, 'm': 0}),
+])
+def test_count_uses_formula_on_domain_boundary(counter, nests, number, params):
+    result = counter.count(nests[number], params)
+    assert result.tier == "formula"
+    assert result.value == count_points(nests[number], params)
+
+
+def test_compiled_formula_rejects_arguments_outside_domain(counter, nests):
+    compiled = counter.compile(nests[5])
+    assert compiled({'n': 5, 'k': 5}) == 15
+    with pytest.raises(ValueError):
+        compiled({'n': 5, 'k': 9})
+
+
+def test_count_many_falls_back_outside_domain(counter, nests):
+    n = np.array([5, 5, -3, 10, 0])
+    k = np.array([9, 2, 1, 3, 4])
+    result = counter.count_many(nests[5], {'n': n, 'k': k})
+    expected = [count_points(nests[5], {'n': int(a), 'k': int(b)}) for a, b in zip(n, k)]
+    assert result.tolist() == expected
+
+
+def test_elapsed_includes_failed_tiers(nests):
+    class SlowCostModel(CostModel):
+        def calibrate(self, pool=None, repeats=5, backend=None):
+            time.sleep(0.05)
+            self.enumeration_ns, self.enumeration_overhead_ms, self.barvinok_ms = 1.0, 0.0, math.inf
+            return self
+
+    # калибровка и неудачный уровень формулы входят во время результата
+    result = LatticeCounter(cost_model=SlowCostModel()).count(nests[5], {'n': 5, 'k': 9})
+    assert result.tier == "enumeration"
+    assert result.elapsed_ms >= 50
+
+
+def test_count_hybrid_raises_on_missing_parameter(counter, nests):
+    assert counter.count_hybrid(nests[3], {'T': 6, 'n': 5, 'k': 1}) == count_points(nests[3], {'T': 6, 'n': 5, 'k': 1})
+    with pytest.raises(ValueError, match=r"Missing parameter\(s\) T"):
+        counter.count_hybrid(nests[3], {'n': 5, 'k': 1})
+
+
+@pytest.mark.parametrize("number", sorted(ORACLES))
+def test_formula_tier_on_its_domain(counter, nests, number):
+    compiled = counter.compile(nests[number])
+    used = 0
+    for params, expected in grid(number):
+        try:
+            value = compiled(params)
+        except ValueError:
+            continue
+        used += 1
+        assert value == expected, params
+    # формула применима хотя бы на части сетки
+    assert used
+
+
+@pytest.mark.parametrize("number", sorted(ORACLES))
+def test_count_tiers_agree_with_brute_force(counter, nests, number):
+    for params, expected in grid(number):
+        assert counter.count(nests[number], params).value == expected, params
+
+
+@pytest.mark.parametrize("number", sorted(ORACLES))
+def test_count_many_on_degenerate_parameters(counter, nests, number):
+    rows = list(grid(number))
+    columns = {name: np.array([params[name] for params, _ in rows]) for name in ORACLES[number][0]}
+    assert counter.count_many(nests[number], columns).tolist() == [expected for _, expected in rows]
+
+
+@pytest.mark.parametrize("number, params, missing", [
+    (4, {'n': 1000, 'k': 3, 'T': 1000}, "m"),
+    (6, {'n': 1000, 'b': 3}, "bandwidth"),
+    (3, {'n': 5}, "T, k"),
+])
+def test_missing_source_parameters_are_reported(counter, nests, number, params, missing):
+    # параметры задаются именами символов исходника, а не именами аргументов формулы
+    with pytest.raises(ValueError, match=rf"^Missing parameter\(s\) {missing}$"):
+        counter.count(nests[number], params)
+    with pytest.raises(ValueError, match=rf"^Missing parameter\(s\) {missing}$"):
+        counter.compile(nests[number])(params)
+
+
+def test_count_many_takes_the_same_names_as_count(counter, nests):
+    n, width = np.array([4, 10, 20]), np.array([1, 3, 2])
+    result = counter.count_many(nests[6], {'n': n, 'bandwidth': width})
+    assert result.tolist() == [counter.count(nests[6], {'n': int(a), 'bandwidth': int(b)}).value
+                               for a, b in zip(n, width)]
+    with pytest.raises(ValueError, match=r"Missing parameter\(s\) bandwidth"):
+        counter.count_many(nests[6], {'n': n, 'b': width})
+
+
+def test_count_many_broadcasts_scalar_columns(counter, nests):
+    oracle = ORACLES[5][1]
+    result = counter.count_many(nests[5], {'n': np.array([5, 10, 20]), 'k': 3})
+    assert result.tolist() == [oracle(5, 3), oracle(10, 3), oracle(20, 3)]
+    assert counter.count_many(nests[5], {'n': np.int64(10), 'k': np.array(3)}).tolist() == [oracle(10, 3)]
+    with pytest.raises(ValueError, match="one-dimensional"):
+        counter.count_many(nests[5], {'n': np.ones((2, 2), dtype=int), 'k': 1})
+
+
+def test_count_many_rejects_non_integral_values(counter, nests):
+    assert counter.count_many(nests[1], {'n': np.array([5.0, 10.0])}).tolist() == [10, 45]
+    for values in (np.array([5.5]), [5, 2.5], np.array([np.nan])):
+        with pytest.raises(ValueError, match="must be an integer"):
+            counter.count_many(nests[1], {'n': values})
+
+
+def test_count_many_promotes_before_large_fallback_rows(counter, nests, monkeypatch):
+    # строка вне области формулы, чей точный подсчет не помещается в int64
+    monkeypatch.setattr(counter, "count", lambda loop_structure, params: CountResult(2 ** 70, "enumeration", 0.0))
+    result = counter.count_many(nests[1], {'n': np.array([10, -1])})
+    assert result.dtype == object
+    assert result.tolist() == [45, 2 ** 70]
+
+
+def test_count_barvinok_propagates_iscc_errors(nests, monkeypatch):
+    counter = LatticeCounter(iscc_mode="spawn")
+
+    def failing_iscc(isl_str, pool=None):
+        raise RuntimeError("iscc failed")
+
+    monkeypatch.setattr(counter_module, "count_integer_points", failing_iscc)
+    with pytest.raises(RuntimeError, match="iscc failed"):
+        counter.count_barvinok(nests[1], {'n': 10})
+
+    monkeypatch.setattr(counter_module, "count_integer_points", lambda isl_str, pool=None: (45, 1.5))
+    assert counter.count_barvinok(nests[1], {'n': 10}) == [45, 1.5]
@@ -0,0 +1,39 @@
+import itertools
+
+import pytest
+
+from loop_analyzer.core.affine import AffineExpr
+from loop_analyzer.core.enumerator import EnumerationBudgetExceeded, Enumerator, count_points
+from loop_analyzer.core.loop import LoopBound, LoopStructure
+
+from conftest import ORACLES
+
+n, i = AffineExpr.symbol('n'), AffineExpr.symbol('i')
+
+
+@pytest.mark.parametrize("number", sorted(ORACLES))
+def test_data_patterns_match_brute_force(nests, number):
+    names, oracle = ORACLES[number]
+    enumerator = Enumerator(nests[number])
+    for values in itertools.product((-2, 0, 1, 3, 8), repeat=len(names)):
+        assert enumerator.count(dict(zip(names, values))) == oracle(*values), values
+
+
+def test_chunking_does_not_change_result(nests):
+    params = {'n': 300, 'k': 7}
+    assert count_points(nests[5], params, chunk_size=17) == count_points(nests[5], params) == ORACLES[5][1](300, 7)
+
+
+def test_strided_and_descending_levels():
+    strided = LoopStructure(bounds=[LoopBound(0, n, 2, 'i'), LoopBound(i, n, 3, 'j')], nesting_depth=2)
+    descending = LoopStructure(bounds=[LoopBound(n, 0, -1, 'i'), LoopBound(0, i, 1, 'j')], nesting_depth=2)
+    for value in range(-1, 12):
+        assert count_points(strided, {'n': value}) == sum(len(range(a, value, 3)) for a in range(0, value, 2))
+        assert count_points(descending, {'n': value}) == sum(range(value, 0, -1))
+
+
+def test_budget_limits_expanded_points():
+    triangle = LoopStructure(bounds=[LoopBound(0, n, 1, 'i'), LoopBound(0, i, 1, 'j')], nesting_depth=2)
+    assert count_points(triangle, {'n': 100}, max_points=100) == 4950
+    with pytest.raises(EnumerationBudgetExceeded):
+        count_points(triangle, {'n': 101}, max_points=100)
@@ -0,0 +1,67 @@
+import os
+import shutil
+
+from loop_analyzer.core.extraction_cache import ExtractionCache
+from loop_analyzer.core.loop_extractor import CppLoopExtractor
+
+from conftest import DATA
+
+
+def _no_parse(filepath):
+    raise AssertionError(f"libclang called for {filepath}")
+
+
+def test_unchanged_file_is_served_from_cache(tmp_path, monkeypatch):
+    source = tmp_path / "pattern5.cpp"
+    shutil.copy(DATA / "pattern5.cpp", source)
+    cache_dir = str(tmp_path / "cache")
+
+    loops = CppLoopExtractor(cache_dir=cache_dir).extract_loops_from_file(str(source))
+    extractor = CppLoopExtractor(cache_dir=cache_dir)
+    monkeypatch.setattr(extractor, "parse_file", _no_parse)
+    cached = extractor.extract_loops_from_file(str(source))
+    assert [loop.structure_key() for loop in cached] == [loop.structure_key() for loop in loops]
+
+
+def test_changed_file_is_parsed_again(tmp_path):
+    source = tmp_path / "edited.cpp"
+    source.write_text("void f(int n) { for (int i = 0; i < n; i++) {} }\n")
+    extractor = CppLoopExtractor(cache_dir=str(tmp_path / "cache"))
+    assert str(extractor.extract_loops_from_file(str(source))[0].bounds[0].end) == 'n'
+
+    source.write_text("void f(int m) { for (int i = 0; i < m; i++) {} }\n")
+    assert str(extractor.extract_loops_from_file(str(source))[0].bounds[0].end) == 'm'
+
+    extractor.clear_cache()
+    assert os.listdir(tmp_path / "cache") == []
+
+
+def test_key_covers_arguments_and_version(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+    key = cache.key(b"int x;", ['-std=c++17'], "1")
+    assert key == cache.key(b"int x;", ['-std=c++17'], "1")
+    assert key != cache.key(b"int x;", ['-std=c++20'], "1")
+    assert key != cache.key(b"int x;", ['-std=c++17'], "2")
+    assert key != cache.key(b"int y;", ['-std=c++17'], "1")
+
+
+def test_corrupted_entry_is_dropped(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+    (tmp_path / "broken.pkl").write_bytes(b"not a pickle")
+    assert cache.get("broken") is None
+    assert not (tmp_path / "broken.pkl").exists()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ExtractionCache(str(tmp_path), max_bytes=10 ** 6)
+    for name in ("a", "b", "c"):
+        cache.put(name, [name * 1000])
+    os.utime(tmp_path / "a.pkl", (1, 1))
+    os.utime(tmp_path / "b.pkl", (2, 2))
+    os.utime(tmp_path / "c.pkl", (3, 3))
+    cache.get("a")
+
+    cache.max_bytes = 2500
+    cache.evict()
+    assert cache.get("b") is None
+    assert cache.get("a") == ["a" * 1000] and cache.get("c") == ["c" * 1000]
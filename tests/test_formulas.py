@@ -0,0 +1,48 @@
+import numpy as np
+import sympy as sp
+
+from loop_analyzer.core.loop import PatternType
+from loop_analyzer.patterns.formulas import INT64_SAFE_LIMIT, OptimizedFormulas
+from loop_analyzer.utils.parameter_selection import get_parameters
+
+
+def test_scalar_arguments_stay_python_int():
+    result = OptimizedFormulas.pattern_5_parallelogram(1000, 3, 3)
+    assert type(result) is int and result == 1000 * 7 - 12
+    assert type(OptimizedFormulas.pattern_5_parallelogram(np.int64(1000), 3, 0)) is int
+    assert type(OptimizedFormulas.pattern_1_lower_triangle(sp.Integer(7))) is int
+    big = 10 ** 20
+    assert OptimizedFormulas.pattern_2_upper_triangle(big) == big * (big + 1) // 2
+
+
+def test_array_arguments_fall_back_to_bigint_on_overflow():
+    n = np.array([10, INT64_SAFE_LIMIT, 2 ** 40], dtype=np.int64)
+    result = OptimizedFormulas.pattern_1_lower_triangle(n)
+    assert result.tolist() == [int(value) * (int(value) - 1) // 2 for value in n]
+    assert result.dtype == object
+
+    small = OptimizedFormulas.pattern_4_diagonal(np.array([3, 4]), [5, 6])
+    assert small.dtype == np.int64 and small.tolist() == [15, 24]
+
+
+def test_symbolic_arguments_pass_through():
+    n = sp.Symbol('n')
+    assert sp.expand(OptimizedFormulas.pattern_1_lower_triangle(n) - n * (n - 1) / 2) == 0
+
+
+def test_triangle_parameters_are_exact_for_huge_sizes():
+    size = 2 ** 50
+    n = get_parameters(size, PatternType.LOWER_TRIANGLE)['n']
+    assert n * (n - 1) // 2 <= size < (n + 1) * n // 2
+    n = get_parameters(size, PatternType.UPPER_TRIANGLE)['n']
+    assert n * (n + 1) // 2 <= size < (n + 1) * (n + 2) // 2
+
+
+def test_plain_ints_skip_normalization(monkeypatch):
+    from loop_analyzer.patterns import formulas
+
+    def fail(value):
+        raise AssertionError("normalization on the scalar path")
+
+    monkeypatch.setattr(formulas, "_normalize", fail)
+    assert OptimizedFormulas.pattern_4_diagonal(3, 5) == 15
@@ -0,0 +1,65 @@
+import pytest
+
+from loop_analyzer.core.loop_extractor import CppLoopExtractor
+from loop_analyzer.core.pattern_recognizer import PatternRecognizer
+from loop_analyzer.utils import instrumentation as metrics
+
+from conftest import DATA
+
+
+@pytest.fixture
+def enabled():
+    was_enabled = metrics.is_enabled()
+    metrics.reset()
+    metrics.enable()
+    yield
+    metrics.reset()
+    if not was_enabled:
+        metrics.disable()
+
+
+def test_disabled_metrics_record_nothing():
+    metrics.disable()
+    metrics.reset()
+    metrics.inc("calls_total")
+    metrics.observe("latency_ms", 1.0)
+    assert metrics.clock() == 0
+    assert metrics.snapshot() == {"counters": {}, "histograms": {}}
+    assert metrics.to_prometheus() == ""
+
+
+def test_histogram_buckets_are_cumulative(enabled):
+    for value in (0.02, 0.3, 0.3, 7000.0):
+        metrics.observe("latency_ms", value, labels=(("mode", "pool"),))
+    histogram = metrics.snapshot()["histograms"]['latency_ms{mode="pool"}']
+    assert histogram["count"] == 4 and histogram["sum"] == pytest.approx(7000.62)
+    assert histogram["buckets"]["0.01"] == 0
+    assert histogram["buckets"]["0.05"] == 1
+    assert histogram["buckets"]["0.5"] == 3
+    assert histogram["buckets"]["+Inf"] == 4
+
+
+def test_prometheus_exposition(enabled):
+    metrics.inc("calls_total", labels=(("mode", "spawn"),))
+    metrics.inc("calls_total", 2, labels=(("mode", "spawn"),))
+    metrics.observe("latency_ms", 0.2)
+    text = metrics.to_prometheus().splitlines()
+    assert "# TYPE loop_analyzer_calls_total counter" in text
+    assert 'loop_analyzer_calls_total{mode="spawn"} 3' in text
+    assert "# TYPE loop_analyzer_latency_ms histogram" in text
+    assert 'loop_analyzer_latency_ms_bucket{le="0.1"} 0' in text
+    assert 'loop_analyzer_latency_ms_bucket{le="+Inf"} 1' in text
+    assert "loop_analyzer_latency_ms_count 1" in text
+
+
+def test_hot_paths_are_instrumented(enabled):
+    loops = CppLoopExtractor().extract_loops_from_file(str(DATA / "pattern1.cpp"))
+    recognizer = PatternRecognizer()
+    recognizer.recognize_pattern(loops[-1])
+    recognizer.recognize_pattern(loops[-1])
+
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"]["extractor_loops_total"] == 2
+    assert snapshot["counters"]['recognizer_cache_total{result="hit"}'] == 1
+    assert snapshot["counters"]['recognizer_patterns_total{pattern="LOWER_TRIANGLE"}'] == 1
+    assert snapshot["histograms"]['extractor_parse_ms{mode="parse"}']["count"] == 1
@@ -0,0 +1,29 @@
+import copy
+
+from loop_analyzer.core.affine import AffineExpr
+from loop_analyzer.core.loop import LoopBound, LoopStructure
+
+
+def _triangle():
+    n = AffineExpr.symbol('n')
+    return LoopStructure(bounds=[LoopBound(0, n, 1, 'i'), LoopBound(0, AffineExpr.symbol('i'), 1, 'j')],
+                         nesting_depth=2)
+
+
+def test_structure_key_is_memoized(nests):
+    loop_structure = nests[5]
+    key = loop_structure.structure_key()
+    assert loop_structure.structure_key() is key
+    assert copy.deepcopy(loop_structure).structure_key() == key
+
+
+def test_structure_key_follows_bound_changes():
+    loop_structure = _triangle()
+    key = loop_structure.structure_key()
+
+    loop_structure.bounds[1].end = AffineExpr.symbol('i') + 1
+    changed = loop_structure.structure_key()
+    assert changed != key
+
+    loop_structure.bounds.append(LoopBound(0, 4, 1, 'k'))
+    assert loop_structure.structure_key()[0][-1] == ('k', '0', '4', '1')
@@ -0,0 +1,164 @@
+import gc
+import os
+import shutil
+
+import clang.cindex
+import pytest
+
+from loop_analyzer.core import loop_extractor
+from loop_analyzer.core.loop_extractor import CppLoopExtractor
+
+from conftest import DATA
+
+_extract_loops = loop_extractor._extract_loops_in_worker
+
+
+def test_bounds_of_data_patterns():
+    extractor = CppLoopExtractor()
+    loops = extractor.extract_loops_from_file(str(DATA / "pattern3.cpp"))
+    assert [str(bound.end) for bound in loops[-1].bounds] == ['T', 'Min(n, k + t + 1)']
+
+
+@pytest.mark.parametrize("newline", ("\n", "\r\n"))
+def test_expression_text_after_multibyte_and_across_lines(tmp_path, newline):
+    source = tmp_path / "utf8.cpp"
+    text = ("void f(int n, int m) {\n"
+            "    /* ширина */ for (int i = 0; i < n +\n"
+            "                             m; i++) {\n"
+            "        /* ё */ for (int j = i; j < 2 * n; j++) {}\n"
+            "    }\n"
+            "}\n")
+    source.write_bytes(text.replace("\n", newline).encode("utf-8"))
+    extractor = CppLoopExtractor()
+    loops = extractor.extract_loops_from_file(str(source))
+    assert [str(bound.end) for bound in loops[-1].bounds] == ['m + n', '2*n']
+    # тот же текст из буфера редактора
+    loops = extractor.extract_loops_from_file(str(source), unsaved_content=text.replace("\n", newline))
+    assert [str(bound.end) for bound in loops[-1].bounds] == ['m + n', '2*n']
+
+
+def test_source_is_read_once_per_parse(monkeypatch):
+    buffers = []
+    original = loop_extractor._SourceBuffer
+
+    def counting_buffer(data):
+        buffers.append(data)
+        return original(data)
+
+    monkeypatch.setattr(loop_extractor, "_SourceBuffer", counting_buffer)
+    CppLoopExtractor().extract_loops_from_file(str(DATA / "pattern5.cpp"))
+    assert len(buffers) == 1
+
+
+def _copy_data(directory):
+    for source in sorted(DATA.glob("pattern*.cpp")):
+        shutil.copy(source, directory / source.name)
+
+
+def _keys(results):
+    return {os.path.basename(path): [loop.structure_key() for loop in loops] for path, loops in results.items()}
+
+
+def test_process_directory_parallel_matches_sequential(tmp_path):
+    _copy_data(tmp_path)
+    extractor = CppLoopExtractor()
+    sequential = extractor.process_directory(str(tmp_path))
+    parallel = extractor.process_directory(str(tmp_path), jobs=3)
+    assert list(parallel) == sorted(parallel)
+    assert _keys(parallel) == _keys(sequential)
+    assert len(parallel) == 6
+
+
+def test_process_directory_skips_failing_file(tmp_path, capfd):
+    _copy_data(tmp_path)
+    os.symlink(tmp_path / "missing.cpp", tmp_path / "dangling.cpp")
+    results = CppLoopExtractor().process_directory(str(tmp_path), jobs=2)
+    assert sorted(_keys(results)) == [f"pattern{number}.cpp" for number in range(1, 7)]
+    assert "dangling.cpp" in capfd.readouterr().err
+
+
+def _crashing_extract(filepath):
+    # имитация segfault libclang в процессе-исполнителе
+    if filepath.endswith("crash.cpp"):
+        os._exit(1)
+    return _extract_loops(filepath)
+
+
+def test_process_directory_survives_worker_crash(tmp_path, monkeypatch, capfd):
+    _copy_data(tmp_path)
+    (tmp_path / "crash.cpp").write_text("void f(int n) { for (int i = 0; i < n; i++) {} }\n")
+    monkeypatch.setattr(loop_extractor, "_extract_loops_in_worker", _crashing_extract)
+
+    results = CppLoopExtractor().process_directory(str(tmp_path), jobs=2)
+    assert sorted(_keys(results)) == [f"pattern{number}.cpp" for number in range(1, 7)]
+    assert "crash.cpp" in capfd.readouterr().err
+
+
+def test_incremental_reparse_sees_unsaved_edits(tmp_path):
+    filepath = str(tmp_path / "edited.cpp")
+    (tmp_path / "edited.cpp").write_text("void f(int n) { for (int i = 0; i < n; i++) {} }\n")
+    extractor = CppLoopExtractor(incremental=True)
+
+    loops = extractor.extract_loops_from_file(filepath)
+    assert [str(bound.end) for bound in loops[0].bounds] == ['n']
+    tu = extractor._translation_units[filepath]
+
+    edited = (DATA / "pattern1.cpp").read_text()
+    loops = extractor.extract_loops_from_file(filepath, unsaved_content=edited)
+    assert [str(bound.end) for bound in loops[-1].bounds] == ['n', 'i']
+    assert extractor._translation_units[filepath] is tu
+
+    # без unsaved_content снова разбирается файл на диске
+    assert len(extractor.extract_loops_from_file(filepath)) == 1
+    extractor.release_translation_units(filepath)
+    assert extractor._translation_units == {}
+
+
+def test_preamble_bodies_are_skipped_only_with_known_flag(monkeypatch):
+    skip = (clang.cindex.TranslationUnit.PARSE_SKIP_FUNCTION_BODIES
+            | loop_extractor.CXTranslationUnit_LimitSkipFunctionBodiesToPreamble)
+    assert loop_extractor.libclang_version() >= loop_extractor.LIMIT_SKIP_FUNCTION_BODIES_MIN_VERSION
+    assert CppLoopExtractor(incremental=True).parse_options & skip == skip
+
+    # без флага libclang пропустила бы и тела функций самого файла
+    for version in ((5, 0), None):
+        monkeypatch.setattr(loop_extractor, "libclang_version", lambda: version)
+        assert CppLoopExtractor(incremental=True).parse_options & skip == 0
+
+
+def test_iter_loops_parallel_matches_sequential(tmp_path):
+    _copy_data(tmp_path)
+    extractor = CppLoopExtractor()
+    sequential = [(os.path.basename(path), loop.structure_key()) for path, loop in extractor.iter_loops(str(tmp_path))]
+    parallel = [(os.path.basename(path), loop.structure_key())
+                for path, loop in extractor.iter_loops(str(tmp_path), jobs=3)]
+    assert parallel == sequential
+    assert len(sequential) == 12
+
+
+def test_iter_loops_releases_translation_unit(tmp_path):
+    source = str(DATA / "pattern4.cpp")
+    extractor = CppLoopExtractor()
+    stream = extractor.iter_loops(source)
+    assert next(stream)[0] == source
+    assert len(extractor._source_buffers) == 1
+    assert [path for path, _ in stream] == [source]
+    gc.collect()
+    assert len(extractor._source_buffers) == 0
+
+
+def test_unsaved_content_is_not_retained(tmp_path):
+    filepath = str(tmp_path / "edited.cpp")
+    (tmp_path / "edited.cpp").write_text("void f(int n) {}\n")
+    source = (DATA / "pattern1.cpp").read_text()
+
+    extractor = CppLoopExtractor()
+    loops = extractor.extract_loops_from_file(filepath, unsaved_content=source)
+    assert [loop.nesting_depth for loop in loops] == [1, 2]
+    assert [str(bound.end) for bound in loops[1].bounds] == ['n', 'i']
+    assert extractor._unsaved_contents == {}
+
+    incremental = CppLoopExtractor(incremental=True)
+    assert len(incremental.extract_loops_from_file(filepath, unsaved_content=source)) == 2
+    incremental.release_translation_units(filepath)
+    assert incremental._unsaved_contents == {}
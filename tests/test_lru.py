@@ -0,0 +1,22 @@
+import pytest
+
+from loop_analyzer.utils.lru import LRUCache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LRUCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert 'b' not in cache and 'a' in cache and 'c' in cache
+    assert cache.get('b', 'missing') == 'missing'
+    assert cache.info() == (1, 1, 2, 2)
+
+    cache.clear()
+    assert len(cache) == 0 and cache.info() == (0, 0, 2, 0)
+
+
+def test_rejects_non_positive_size():
+    with pytest.raises(ValueError):
+        LRUCache(maxsize=0)
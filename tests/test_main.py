@@ -0,0 +1,90 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from loop_analyzer.main import main
+
+from conftest import DATA, ROOT
+
+
+def test_records_are_json_lines(capsys):
+    assert main([str(DATA / "pattern1.cpp"), "--params", "n=10"]) == 0
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert records[-1]["pattern"] == "LOWER_TRIANGLE"
+    assert records[-1]["count"] == 45 and records[-1]["tier"] == "formula"
+    assert [record["index"] for record in records] == list(range(len(records)))
+
+
+def test_extract_only_skips_recognition(tmp_path, capsys):
+    output = tmp_path / "loops.jsonl"
+    assert main([str(DATA / "pattern1.cpp"), "--extract-only", "--output", str(output)]) == 0
+    assert capsys.readouterr().out == ""
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert records and all("pattern" not in record for record in records)
+    assert [bound["variable"] for bound in records[-1]["bounds"]] == ["i", "j"]
+
+
+@pytest.mark.parametrize("arguments", [["--params", "n"], ["--params", "n=x"],
+                                       ["--params", "n=1", "--extract-only"], ["--jobs", "0"]])
+def test_bad_arguments_are_usage_errors(arguments, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main([str(DATA / "pattern1.cpp")] + arguments)
+    assert exit_info.value.code == 2
+    assert "usage" in capsys.readouterr().err
+
+
+def test_output_is_json_lines_despite_broken_files(tmp_path, capsys):
+    shutil.copy(DATA / "pattern5.cpp", tmp_path / "pattern5.cpp")
+    os.symlink(tmp_path / "missing.cpp", tmp_path / "dangling.cpp")
+
+    assert main([str(tmp_path), "--params", "n=5,k=9"]) == 0
+    captured = capsys.readouterr()
+    records = [json.loads(line) for line in captured.out.splitlines()]
+    assert [record["pattern"] for record in records] == [None, "PARALLELOGRAM"]
+    assert records[1]["count"] == 15 and records[1]["tier"] != "formula"
+    assert "dangling.cpp" in captured.err
+
+
+def test_missing_path_is_an_error(tmp_path, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main([str(tmp_path / "nonexistent")])
+    assert exit_info.value.code != 0
+    assert "nonexistent" in capsys.readouterr().err
+
+
+def test_readme_example_counts_every_data_nest(capsys):
+    assert main([str(DATA), "--params", "n=1000,k=3,T=1000,m=500,bandwidth=3", "--jobs", "2"]) == 0
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert len(records) == 12
+    assert all(record["count"] is not None and "error" not in record for record in records)
+    assert {record["pattern"]: record["count"] for record in records}["DIAGONAL"] == 1000 * 500
+
+
+def test_missing_parameter_is_a_usage_error_and_keeps_output(tmp_path, capsys):
+    output = tmp_path / "loops.jsonl"
+    output.write_text("previous run\n")
+    with pytest.raises(SystemExit) as exit_info:
+        main([str(DATA / "pattern4.cpp"), "--params", "n=10", "--output", str(output)])
+    assert exit_info.value.code == 2
+    assert "Missing parameter(s) m" in capsys.readouterr().err
+    assert output.read_text() == "previous run\n"
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["loops.jsonl"]
+
+    assert main([str(DATA / "pattern4.cpp"), "--params", "n=10,m=3", "--output", str(output)]) == 0
+    assert json.loads(output.read_text().splitlines()[-1])["count"] == 30
+
+
+def test_extract_only_does_not_load_recognition_or_counting():
+    code = ("import sys\n"
+            "from loop_analyzer.main import main\n"
+            f"main([{str(DATA / 'pattern1.cpp')!r}, '--extract-only'])\n"
+            "loaded = {'numpy', 'sympy', 'loop_analyzer.core.pattern_recognizer', 'loop_analyzer.core.counter'}\n"
+            "print(sorted(loaded & set(sys.modules)), file=sys.stderr)\n")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            env={**os.environ, "PYTHONPATH": str(ROOT / "src")})
+    assert result.returncode == 0, result.stderr
+    assert result.stderr.strip().splitlines()[-1] == "[]"
@@ -0,0 +1,127 @@
+import pytest
+import sympy as sp
+
+from loop_analyzer.core.affine import AffineExpr
+from loop_analyzer.core.loop import LoopBound, LoopStructure, PatternType
+from loop_analyzer.core.pattern_recognizer import PatternRecognizer, loop_signature, structural_fingerprint
+
+
+def _triangle(outer: str, inner: str, size: str) -> LoopStructure:
+    """for outer < size; for inner < outer"""
+    return LoopStructure(bounds=[LoopBound(0, AffineExpr.symbol(size), 1, outer),
+                                 LoopBound(0, AffineExpr.symbol(outer), 1, inner)], nesting_depth=2)
+
+
+def test_renamed_nests_share_fingerprint():
+    key, renaming = structural_fingerprint(_triangle('i', 'j', 'n'))
+    assert structural_fingerprint(_triangle('r', 'c', 'rows'))[0] == key
+    assert renaming == {'i': '$v0', 'j': '$v1', 'n': '$p0'}
+    assert structural_fingerprint(_triangle('i', 'i', 'n')) is None
+
+
+def test_cached_parameters_use_caller_names():
+    recognizer = PatternRecognizer()
+    assert recognizer.recognize_pattern(_triangle('i', 'j', 'n')) == PatternType.LOWER_TRIANGLE
+    renamed = _triangle('r', 'c', 'rows')
+    assert recognizer.recognize_pattern(renamed) == PatternType.LOWER_TRIANGLE
+    assert str(renamed.parameters['n']) == 'rows'
+    assert renamed.pattern_type == PatternType.LOWER_TRIANGLE
+    info = recognizer.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+
+
+def test_data_patterns(nests):
+    recognizer = PatternRecognizer()
+    assert recognizer.recognize_pattern(nests[1]) == PatternType.LOWER_TRIANGLE
+    assert recognizer.recognize_pattern(nests[2]) == PatternType.UPPER_TRIANGLE
+
+
+def test_new_data_patterns(nests):
+    recognizer = PatternRecognizer()
+    assert recognizer.recognize_pattern(nests[3]) == PatternType.TRAPEZOID
+    assert recognizer.recognize_pattern(nests[4]) == PatternType.DIAGONAL
+    assert recognizer.recognize_pattern(nests[5]) == PatternType.PARALLELOGRAM
+    assert recognizer.recognize_pattern(nests[6]) == PatternType.BAND_MATRIX
+    assert str(nests[6].parameters['b']) == 'bandwidth'
+    assert {name: str(value) for name, value in nests[5].parameters.items()} == {'n': 'n', 'p': 'k', 'q': '0'}
+    assert {name: str(value) for name, value in nests[3].parameters.items()} == {'n': 'n', 'k': 'k', 'T': 'T'}
+    assert {name: str(value) for name, value in nests[4].parameters.items()} == {'n': 'n', 'm': 'm'}
+
+
+def _band(below, above=None) -> LoopStructure:
+    """for i < n; for j = max(0, i - below) .. min(n, i + above + 1), по умолчанию above = below"""
+    i, below = sp.Symbol('i'), sp.sympify(below)
+    above = below if above is None else sp.sympify(above)
+    inner = LoopBound(sp.Max(0, i - below), sp.Min(sp.Symbol('n'), i + above + 1), 1, 'j')
+    return LoopStructure(bounds=[LoopBound(0, AffineExpr.symbol('n'), 1, 'i'), inner], nesting_depth=2)
+
+
+def test_constant_band_width_is_band_matrix():
+    band = _band(2)
+    assert PatternRecognizer().recognize_pattern(band) == PatternType.BAND_MATRIX
+    assert band.parameters['b'] == 2
+
+
+@pytest.mark.parametrize("below, above, pattern", [
+    ('bandwidth', None, PatternType.BAND_MATRIX),
+    ('k', None, PatternType.BAND_MATRIX),
+    ('husband', None, PatternType.BAND_MATRIX),
+    ('k', 0, PatternType.PARALLELOGRAM),
+    (0, 'k', PatternType.PARALLELOGRAM),
+    ('k', 'l', PatternType.PARALLELOGRAM),
+    (2, 3, PatternType.PARALLELOGRAM),
+])
+def test_band_or_parallelogram_by_window_shape(below, above, pattern):
+    # симметричное окно - лента, сдвинутое - параллелограмм; имена символов не важны
+    assert PatternRecognizer().recognize_pattern(_band(below, above)) == pattern
+
+
+def test_skewed_window_parameters():
+    skewed = _band('k', 'l')
+    PatternRecognizer().recognize_pattern(skewed)
+    assert {name: str(value) for name, value in skewed.parameters.items()} == {'n': 'n', 'p': 'k', 'q': 'l'}
+
+
+def test_classification_is_renaming_invariant():
+    recognizer = PatternRecognizer()
+    assert recognizer.recognize_pattern(_band('k')) == PatternType.BAND_MATRIX
+    renamed = _band('husband')
+    assert recognizer.recognize_pattern(renamed) == PatternType.BAND_MATRIX
+    assert str(renamed.parameters['b']) == 'husband'
+    assert recognizer.cache_info().hits == 1
+
+
+def test_signature_dispatch_runs_only_matching_checkers(nests):
+    recognizer = PatternRecognizer()
+    assert recognizer.recognize_pattern(nests[1]) == PatternType.LOWER_TRIANGLE
+    timings = recognizer.checker_timings()
+    assert timings[PatternType.LOWER_TRIANGLE]['matches'] == 1
+    assert sum(timing['calls'] for timing in timings.values()) == 1
+
+    assert loop_signature(nests[5]) == (2, ((0b1, 0b1, 'Max', 'Min'),), True)
+    assert recognizer.recognize_pattern(nests[5]) == PatternType.PARALLELOGRAM
+    assert recognizer.checker_timings()[PatternType.LOWER_TRIANGLE]['calls'] == 1
+
+
+def test_dependent_start_is_not_a_lower_triangle():
+    # for i < n; for j = i + 1 .. i + 5: начало внутреннего цикла зависит от i
+    i, n = AffineExpr.symbol('i'), AffineExpr.symbol('n')
+    shifted = LoopStructure(bounds=[LoopBound(0, n, 1, 'i'), LoopBound(i + 1, i + 5, 1, 'j')], nesting_depth=2)
+    assert PatternRecognizer().recognize_pattern(shifted) is None
+
+
+def test_strided_and_shifted_triangles_are_not_recognized(counter):
+    # формулы треугольников выведены для начала 0 и шага 1
+    i, n = AffineExpr.symbol('i'), AffineExpr.symbol('n')
+    nests = {
+        1225: [LoopBound(0, n, 2, 'i'), LoopBound(0, i, 2, 'j')],
+        1683: [LoopBound(0, n, 1, 'i'), LoopBound(0, i, 3, 'j')],
+        4947: [LoopBound(3, n, 1, 'i'), LoopBound(0, i, 1, 'j')],
+        2550: [LoopBound(0, n, 1, 'i'), LoopBound(i, n, 2, 'j')],
+    }
+    recognizer = PatternRecognizer()
+    for expected, bounds in nests.items():
+        loop_structure = LoopStructure(bounds=bounds, nesting_depth=2)
+        assert loop_signature(loop_structure)[2] == (bounds[0].step == bounds[1].step == 1)
+        assert recognizer.recognize_pattern(loop_structure) is None, bounds
+        assert counter.count(loop_structure, {'n': 100}).value == expected, bounds
@@ -0,0 +1,90 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from loop_analyzer.core.affine import AffineExpr
+from loop_analyzer.core.enumerator import count_points
+from loop_analyzer.core.loop import LoopBound, LoopStructure
+from loop_analyzer.core.polyhedron_utils import (IslTemplate, build_constraint_batch, clear_isl_template_cache,
+                                                 constraint_batch_to_isl_strings, isl_template_cache_info,
+                                                 loop_structure_to_constraints, loop_structure_to_parametric_isl_string,
+                                                 parametric_isl_template, polyhedron_to_isl_string)
+
+from conftest import ORACLES
+
+isl = pytest.importorskip("islpy")
+
+
+@pytest.mark.parametrize("number", sorted(ORACLES))
+def test_parametric_set_matches_brute_force(nests, number):
+    names, oracle = ORACLES[number]
+    parametric = isl.Set(loop_structure_to_parametric_isl_string(nests[number]))
+    for values in itertools.product((0, 1, 3, 7), repeat=len(names)):
+        fixed = ' and '.join(f"{name} = {value}" for name, value in zip(names, values))
+        params = isl.Set(f"[{', '.join(names)}] -> {{ : {fixed} }}")
+        assert parametric.intersect_params(params).count_val().to_python() == oracle(*values), values
+
+
+def _strided():
+    n, i = AffineExpr.symbol('n'), AffineExpr.symbol('i')
+    return LoopStructure(bounds=[LoopBound(0, n, 2, 'i'), LoopBound(i, n, 3, 'j')], nesting_depth=2)
+
+
+def test_constraint_batch_describes_the_same_sets(nests):
+    structures = [nests[number] for number in sorted(nests)] + [_strided()]
+    batch = build_constraint_batch(structures)
+    assert len(batch) == len(structures)
+    assert batch.coefficients.dtype == np.int64
+    assert batch.offsets[-1] == batch.coefficients.shape[0]
+
+    for loop_structure, batch_str in zip(structures, constraint_batch_to_isl_strings(batch)):
+        expected = isl.Set(loop_structure_to_parametric_isl_string(loop_structure))
+        assert isl.Set(batch_str).is_equal(expected), batch_str
+
+
+def test_polyhedron_to_isl_string_format():
+    A = np.array([[-1, 0], [1, 0], [0, -1], [1, -2], [0, 0]])
+    b = np.array([0, 9, 0.5, 3, 7])
+    assert polyhedron_to_isl_string(A, b, ['i', 'j']) == \
+        "{[i, j]: -i <= 0 and i <= 9 and -j <= 0.5 and i -2*j <= 3}"
+    assert polyhedron_to_isl_string(np.zeros((1, 1)), np.zeros(1)) == "{[x0]}"
+
+
+@pytest.mark.parametrize("number", sorted(ORACLES))
+def test_template_binds_concrete_sets(nests, number):
+    names, oracle = ORACLES[number]
+    template = parametric_isl_template(nests[number])
+    assert template.parameters == sorted(names)
+    for values in itertools.product((-1, 0, 2, 5), repeat=len(names)):
+        isl_str = template.bind(dict(zip(names, values)))
+        assert isl.Set(isl_str).count_val().to_python() == oracle(*values), isl_str
+
+
+def test_template_is_cached_per_structure(nests):
+    clear_isl_template_cache()
+    template = parametric_isl_template(nests[5])
+    assert parametric_isl_template(nests[5]) is template
+    assert isl_template_cache_info().hits == 1
+    with pytest.raises(KeyError):
+        template.bind({'n': 5})
+
+
+def test_non_affine_step_has_no_template():
+    n = AffineExpr.symbol('n')
+    loop_structure = LoopStructure(bounds=[LoopBound(0, n, n, 'i')], nesting_depth=1)
+    assert parametric_isl_template(loop_structure) is None
+
+
+@pytest.mark.parametrize("parameter, variable", [('n', 'j'), ('q0', 'j'), ('n', 'q0'), ('q1', '_q1')])
+def test_existential_names_do_not_collide(parameter, variable):
+    # шаг 2 на первом уровне и 3 на втором дает вспомогательные переменные q0 и q1
+    loop_structure = LoopStructure(bounds=[LoopBound(0, AffineExpr.symbol(parameter), 2, 'i'),
+                                           LoopBound(0, AffineExpr.symbol('i') + 5, 3, variable)],
+                                   nesting_depth=2)
+    params = {parameter: 11}
+    isl_str = IslTemplate(loop_structure_to_parametric_isl_string(loop_structure)).bind(params)
+    assert isl.Set(isl_str).count_val().to_python() == count_points(loop_structure, params)
+
+    constraints = loop_structure_to_constraints(loop_structure)
+    assert not set(constraints.existentials) & set(constraints.variables + constraints.parameters)
@@ -0,0 +1,39 @@
+import pickle
+
+import pytest
+
+from loop_analyzer.wrappers.qpolynomial import parse_piecewise_qpolynomial
+
+
+def test_polynomial_piece():
+    card = parse_piecewise_qpolynomial("[n] -> { (-1/2 * n + 1/2 * n^2) : n >= 1 }")
+    assert [card({'n': n}) for n in range(-2, 6)] == [0, 0, 0, 0, 1, 3, 6, 10]
+
+
+def test_quasi_polynomial_with_floor_and_existential():
+    text = "[n, k] -> { (n + floor((k)/2)) : exists (e0 = floor((n)/2): 2e0 = n) and k >= 0; 0 : n < 0 }"
+    card = parse_piecewise_qpolynomial(text)
+    # куски проверяются по порядку, вне всех кусков значение равно нулю
+    for n in range(-3, 7):
+        for k in range(-2, 5):
+            expected = n + k // 2 if n % 2 == 0 and k >= 0 else 0
+            assert card({'n': n, 'k': k}) == expected, (n, k)
+
+
+def test_ceil_mod_and_nested_conditions():
+    text = "[n, m] -> { (ceil((n)/3) + n mod 4 - 2m) : (0 <= n < 10 or n = 20) and m >= 0; 7 : false }"
+    card = pickle.loads(pickle.dumps(parse_piecewise_qpolynomial(text)))
+    for n in range(-2, 23):
+        for m in range(-1, 3):
+            expected = -(-n // 3) + n % 4 - 2 * m if (0 <= n < 10 or n == 20) and m >= 0 else 0
+            assert card({'n': n, 'm': m}) == expected, (n, m)
+
+
+def test_identifiers_are_not_evaluated():
+    with pytest.raises(ValueError, match="Unknown identifier"):
+        parse_piecewise_qpolynomial("[n] -> { __import__ : n >= 0 }")
+
+
+def test_rejects_garbage():
+    with pytest.raises(ValueError):
+        parse_piecewise_qpolynomial("[n] -> { n ? 1 }")
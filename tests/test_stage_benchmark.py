@@ -0,0 +1,49 @@
+import json
+
+from benchmarks.stage_benchmark import compare, main
+
+from conftest import DATA
+
+
+def _result(**p50):
+    return {"stages": {stage: {"p50": value} for stage, value in p50.items()}}
+
+
+def test_compare_reports_only_regressions_over_threshold():
+    baseline = _result(parse=1.0, formula=0.01, recognize=0.0)
+    result = _result(parse=1.1, formula=0.02, recognize=0.5, isl_bind=0.3)
+    assert compare(result, baseline, threshold=0.2) == [("formula", 0.01, 0.02, 2.0)]
+
+
+def test_json_output_and_baseline_exit_code(tmp_path, capsys):
+    output = tmp_path / "stages.json"
+    argv = ["--data", str(DATA / "pattern5.cpp"), "--repeats", "2", "--no-iscc"]
+    assert main(argv + ["--output", str(output)]) == 0
+    result = json.loads(output.read_text())
+    assert {"parse", "extract", "recognize", "formula"} <= set(result["stages"])
+    assert set(result["stages"]["parse"]) >= {"p50", "p90", "p99", "samples"}
+
+    # базовая линия с почти нулевыми временами дает регрессию и код выхода 1
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(_result(**{stage: 1e-9 for stage in result["stages"]})))
+    assert main(argv + ["--baseline", str(baseline)]) == 1
+    assert "REGRESSION parse" in capsys.readouterr().out
+
+
+def test_compare_uses_pattern_percentiles_when_both_runs_have_them():
+    baseline = _result(formula=0.01)
+    baseline["by_pattern"] = {"formula": {"PARALLELOGRAM": {"p50": 0.01}, "DIAGONAL": {"p50": 0.01}}}
+    result = _result(formula=0.01)
+    result["by_pattern"] = {"formula": {"PARALLELOGRAM": {"p50": 0.05}, "DIAGONAL": {"p50": 0.01}}}
+    assert compare(result, baseline, threshold=0.2) == [("formula/PARALLELOGRAM", 0.01, 0.05, 5.0)]
+    # без разбивки в базовой линии сравниваются общие процентили
+    del baseline["by_pattern"]
+    assert compare(result, baseline, threshold=0.2) == []
+
+
+def test_json_output_has_per_pattern_percentiles(tmp_path):
+    output = tmp_path / "stages.json"
+    assert main(["--data", str(DATA / "pattern5.cpp"), "--repeats", "1", "--no-iscc", "--output", str(output)]) == 0
+    result = json.loads(output.read_text())
+    assert "simplify" in result["stages"]
+    assert "PARALLELOGRAM" in result["by_pattern"]["formula"]
@@ -0,0 +1,83 @@
+import pickle
+
+import pytest
+import sympy as sp
+
+from loop_analyzer.core.affine import AffineExpr
+from loop_analyzer.core.loop import LoopBound, LoopStructure
+from loop_analyzer.core.summation import SummationEngine, build_summation
+
+from conftest import ORACLES
+
+n, i, j = (AffineExpr.symbol(name) for name in ('n', 'i', 'j'))
+
+
+def _brute_force(loop_structure, params, level=0):
+    if level == len(loop_structure.bounds):
+        return 1
+    bound = loop_structure.bounds[level]
+    values = dict(params)
+    start, end = (expr if isinstance(expr, int) else expr.evaluate(params) for expr in (bound.start, bound.end))
+    total = 0
+    for value in range(start, end, bound.step):
+        values[bound.variable] = value
+        total += _brute_force(loop_structure, values, level + 1)
+    return total
+
+
+def test_deep_and_strided_nests():
+    # тетраэдр i < n, j < i, l <= j и полоса с шагом 3 по константной длине
+    tetrahedron = LoopStructure(bounds=[LoopBound(0, n, 1, 'i'), LoopBound(0, i, 1, 'j'),
+                                        LoopBound(0, j + 1, 1, 'l')], nesting_depth=3)
+    strided = LoopStructure(bounds=[LoopBound(0, n, 1, 'i'), LoopBound(i, i + 10, 3, 'j')], nesting_depth=2)
+    descending = LoopStructure(bounds=[LoopBound(n, 0, -1, 'i'), LoopBound(0, i * 2, 1, 'j')], nesting_depth=2)
+    for loop_structure in (tetrahedron, strided, descending):
+        formula = build_summation(loop_structure)
+        for value in range(0, 12):
+            assert formula({'n': value}) == _brute_force(loop_structure, {'n': value}), value
+
+
+@pytest.mark.parametrize("number", (1, 2))
+def test_data_triangles(nests, number):
+    formula = build_summation(nests[number])
+    oracle = ORACLES[number][1]
+    assert [formula({'n': value}) for value in range(10)] == [oracle(value) for value in range(10)]
+
+
+def test_multivariate_polynomial_with_big_parameters():
+    # прямоугольник под треугольником: степени разных параметров и значения за пределами int64
+    m = AffineExpr.symbol('m')
+    loop_structure = LoopStructure(bounds=[LoopBound(0, n, 1, 'i'), LoopBound(0, i + m, 1, 'j'),
+                                           LoopBound(0, m, 1, 'l')], nesting_depth=3)
+    formula = pickle.loads(pickle.dumps(build_summation(loop_structure)))
+    for values in ({'n': 0, 'm': 5}, {'n': 4, 'm': 3}, {'n': 7, 'm': 0}):
+        assert formula(values) == _brute_force(loop_structure, values), values
+    big_n, big_m = 10 ** 12, 10 ** 9
+    expected = big_m * (big_n * (big_n - 1) // 2 + big_n * big_m)
+    assert expected > 2 ** 63
+    assert formula({'n': big_n, 'm': big_m}) == expected
+
+
+def test_negative_range_is_rejected(nests):
+    formula = build_summation(nests[2])
+    with pytest.raises(ValueError):
+        formula({'n': -3})
+
+
+def test_non_affine_nests_have_no_polynomial(nests):
+    assert build_summation(nests[5]) is None
+    symbolic_step = LoopStructure(bounds=[LoopBound(0, n, 2, 'i'), LoopBound(0, i, 2, 'j')], nesting_depth=2)
+    assert build_summation(symbolic_step) is None
+
+
+def test_engine_reuses_formula_for_renamed_nest():
+    engine = SummationEngine()
+    triangle = LoopStructure(bounds=[LoopBound(0, n, 1, 'i'), LoopBound(0, i, 1, 'j')], nesting_depth=2)
+    renamed = LoopStructure(bounds=[LoopBound(0, AffineExpr.symbol('rows'), 1, 'r'),
+                                    LoopBound(0, AffineExpr.symbol('r'), 1, 'c')], nesting_depth=2)
+    assert engine.formula(triangle)({'n': 10}) == 45
+    formula = engine.formula(renamed)
+    assert formula.parameters == ['rows']
+    assert formula({'rows': 10}) == 45
+    assert engine.cache_info().hits == 1
+    assert sp.sympify(str(formula).replace('^', '**')) == sp.sympify('rows**2/2 - rows/2')